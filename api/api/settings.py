@@ -141,6 +141,52 @@ STATIC_URL = 'static/'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Prebuilt recommender artifacts (keyword index, ...) are written here by management commands
+RECOMMENDER_DATA_DIR = BASE_DIR / 'recommender_data'
+
+# Bayesian rating score: (prior_weight * prior_mean + sum of ratings) / (prior_weight + number of ratings)
+RATING_PRIOR_MEAN = 3.0
+RATING_PRIOR_WEIGHT = 10
+
+# Top charts served by /recommendations/rating/: movies kept per chart
+CHARTS_SIZE = 500
+
+# Async /recommendations/async/* endpoints: threads running the scoring, and per endpoint
+# (concurrent requests before answering 503, seconds before answering 504)
+RECOMMENDATION_WORKERS = 4
+RECOMMENDATION_LIMITS = {
+    'apriori': (2, 10.0),
+    'genre': (4, 5.0),
+    'rating': (8, 2.0),
+    'similarity': (2, 5.0),
+    'item-cf': (4, 5.0),
+    'personal': (4, 5.0),
+}
+
+# Background jobs run by the runworker command: seconds a model rebuild waits so a burst of
+# changes coalesces into one run, first retry delay (doubled per attempt), attempts and retention
+JOB_REBUILD_DELAY = 300
+JOB_RETRY_DELAY = 30
+JOB_MAX_ATTEMPTS = 3
+JOB_RETENTION_DAYS = 7
+# Seconds between two heartbeats of a running job, seconds without one after which the job
+# is presumed lost with its worker and requeued, and seconds between two prunes of finished jobs
+JOB_HEARTBEAT_INTERVAL = 30
+JOB_LEASE = 300
+JOB_PRUNE_INTERVAL = 3600
+
+# In-process LRU cache for catalog responses; LocMemCache evicts the least recently used entries
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'TIMEOUT': 3600,
+        'OPTIONS': {'MAX_ENTRIES': 10000, 'CULL_FREQUENCY': 10},
+    }
+}
+
+# How long a process trusts its copy of the catalog version before re-reading it
+CATALOG_VERSION_TTL = 5
+
 CORS_ALLOW_ALL_ORIGINS = True
 CORS_ALLOW_CREDENTIALS = True
 
@@ -7,9 +7,14 @@ from movie.views import (
     UserViewSet, WatchedListViewSet, logout, CustomTokenObtainPairView, 
     CustomTokenRefreshView, MovieDetailView, AddToWatchedListView, 
     RemoveFromWatchedListView, AverageRatingView, PasswordResetView,
-    FavoriteMovieViewSet
+    FavoriteMovieViewSet, BulkAddToWatchedListView, BulkRemoveFromWatchedListView,
+    CatalogCacheStatsView
 )
-from movie.apriori import AprioriRecommendationView, GenreRecommendationView, RatingRecommendationView, SimilarityRecommendationView
+from movie.apriori import (
+    AprioriRecommendationView, GenreRecommendationView, RatingRecommendationView,
+    SimilarityRecommendationView, ItemCFRecommendationView, PersonalRecommendationView
+)
+from movie import async_views
 
 # Create a router and register viewsets
 router = DefaultRouter()
@@ -28,14 +33,25 @@ urlpatterns = [
     path('api/token/', CustomTokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('api/token/refresh/', CustomTokenRefreshView.as_view(), name='token_refresh'),
     path('movies/<int:pk>/', MovieDetailView.as_view(), name='movie-detail'),
+    path('catalog-cache/stats/', CatalogCacheStatsView.as_view(), name='catalog-cache-stats'),
     path('password-reset/', PasswordResetView.as_view(), name='password_reset'),
     path('password-reset/done/', auth_views.PasswordResetDoneView.as_view(), name='password_reset_done'),
     path('reset/<uidb64>/<token>/', auth_views.PasswordResetConfirmView.as_view(), name='password_reset_confirm'),
     path('reset/done/', auth_views.PasswordResetCompleteView.as_view(), name='password_reset_complete'),
     path('recommendations/apriori/', AprioriRecommendationView.as_view(), name='apriori_recommendations'),
+    path('recommendations/apriori/<int:movie_id>/', AprioriRecommendationView.as_view(), name='apriori_movie_recommendations'),
     path('recommendations/genre/', GenreRecommendationView.as_view(), name='genre_recommendations'),
     path('recommendations/rating/', RatingRecommendationView.as_view(), name='rating_recommendations'),
     path('recommendations/similarity/<int:movie_id>/', SimilarityRecommendationView.as_view(), name='similarity_recommendations'),
+    path('recommendations/item-cf/', ItemCFRecommendationView.as_view(), name='item_cf_recommendations'),
+    path('recommendations/personal/', PersonalRecommendationView.as_view(), name='personal_recommendations'),
+    path('recommendations/async/apriori/', async_views.apriori_recommendations, name='async_apriori_recommendations'),
+    path('recommendations/async/apriori/<int:movie_id>/', async_views.apriori_recommendations, name='async_apriori_movie_recommendations'),
+    path('recommendations/async/genre/', async_views.genre_recommendations, name='async_genre_recommendations'),
+    path('recommendations/async/rating/', async_views.rating_recommendations, name='async_rating_recommendations'),
+    path('recommendations/async/similarity/<int:movie_id>/', async_views.similarity_recommendations, name='async_similarity_recommendations'),
+    path('recommendations/async/item-cf/', async_views.item_cf_recommendations, name='async_item_cf_recommendations'),
+    path('recommendations/async/personal/', async_views.personal_recommendations, name='async_personal_recommendations'),
     path('users/<int:pk>/add-favorite-genre/', UserViewSet.as_view({'post': 'add_favorite_genre'}), name='add_favorite_genre'),
     path('users/<int:pk>/remove-favorite-genre/', UserViewSet.as_view({'post': 'remove_favorite_genre'}), name='remove_favorite_genre'),
     path('users/<int:pk>/change-username/', UserViewSet.as_view({'post': 'change_username'}), name='change_username'),
@@ -43,5 +59,7 @@ urlpatterns = [
     path('movies/<int:movie_id>/user-rating/', RatingViewSet.as_view({'get': 'user_rating'}), name='user-movie-rating'),
     path('watched-list/add/', AddToWatchedListView.as_view(), name='add-to-watched-list'),
     path('watched-list/remove/', RemoveFromWatchedListView.as_view(), name='remove-from-watched-list'),
+    path('watched-list/bulk-add/', BulkAddToWatchedListView.as_view(), name='bulk-add-to-watched-list'),
+    path('watched-list/bulk-remove/', BulkRemoveFromWatchedListView.as_view(), name='bulk-remove-from-watched-list'),
     path('', include(router.urls)),  # Includes all routes registered with the router
 ]
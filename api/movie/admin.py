@@ -1,3 +1,45 @@
 from django.contrib import admin
 
-# Register your models here.
+from .catalog_cache import bump_catalog
+from .jobs import enqueue
+from .models import Genre, Job, Movie
+
+
+class CatalogAdmin(admin.ModelAdmin):
+    # Edits made here invalidate the cached catalog responses
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        bump_catalog()
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        bump_catalog()
+
+    def delete_queryset(self, request, queryset):
+        super().delete_queryset(request, queryset)
+        bump_catalog()
+
+
+@admin.register(Movie)
+class MovieAdmin(CatalogAdmin):
+    list_display = ('id', 'title', 'release_date', 'status')
+    search_fields = ('title',)
+    filter_horizontal = ('genres',)
+
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        # Watchers' genre profiles count this movie under its old genres
+        if change and 'genres' in form.changed_data:
+            enqueue('rebuild_genre_profiles', movie_ids=[form.instance.pk])
+
+
+@admin.register(Genre)
+class GenreAdmin(CatalogAdmin):
+    search_fields = ('name',)
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'name', 'status', 'attempts', 'run_at', 'finished_at')
+    list_filter = ('status', 'name')
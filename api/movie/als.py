@@ -0,0 +1,112 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from scipy.sparse import csr_matrix
+from threadpoolctl import threadpool_limits
+
+from .artifacts import load_arrays, save_arrays
+from .models import Rating, WatchedList
+from .snapshot import rating_triples, watched_pairs
+
+MODEL_NAME = 'als'
+
+
+def interaction_matrix(alpha, snapshot=None):
+    """
+    Users x movies confidence matrix for implicit ALS.
+
+    A watched movie counts 1 and a rating adds rating / 5, so confidence = 1 + alpha * strength.
+    The interactions are read from snapshot (a CatalogSnapshot) when one is given.
+    """
+    watched_users, watched_movies = watched_pairs(snapshot)
+    rating_users, rating_movies, ratings = rating_triples(snapshot)
+
+    users = np.concatenate([watched_users, rating_users])
+    movies = np.concatenate([watched_movies, rating_movies])
+    strength = np.concatenate([np.ones(len(watched_users)), np.asarray(ratings, dtype=np.float64) / 5.0])
+
+    user_ids, rows = np.unique(users, return_inverse=True)
+    movie_ids, columns = np.unique(movies, return_inverse=True)
+    matrix = csr_matrix((strength, (rows, columns)), shape=(len(user_ids), len(movie_ids)))
+    matrix.sum_duplicates()
+    matrix.data = 1.0 + alpha * matrix.data
+    return matrix, user_ids, movie_ids
+
+
+def _solve_rows(confidence, fixed, gram, regularization, rows):
+    """Least-squares update for each of rows given the other side's factors (Hu, Koren & Volinsky)."""
+    factors = np.empty((len(rows), fixed.shape[1]), dtype=fixed.dtype)
+    identity = regularization * np.eye(fixed.shape[1], dtype=fixed.dtype)
+    for i, row in enumerate(rows):
+        start, end = confidence.indptr[row], confidence.indptr[row + 1]
+        observed = fixed[confidence.indices[start:end]]
+        weights = confidence.data[start:end]
+        # Unobserved entries have confidence 1 and preference 0, so only observed rows adjust the Gram matrix
+        a = gram + (observed.T * (weights - 1)) @ observed + identity
+        b = observed.T @ weights
+        factors[i] = np.linalg.solve(a, b)
+    return factors
+
+
+def _half_step(confidence, fixed, regularization, pool, chunk_size):
+    gram = fixed.T @ fixed
+    chunks = [range(start, min(start + chunk_size, confidence.shape[0])) for start in range(0, confidence.shape[0], chunk_size)]
+    results = pool.map(lambda rows: _solve_rows(confidence, fixed, gram, regularization, rows), chunks)
+    return np.vstack(list(results)) if chunks else np.zeros((0, fixed.shape[1]), dtype=fixed.dtype)
+
+
+def train_als(factors=32, regularization=0.1, alpha=10.0, iterations=10, workers=None, chunk_size=512, seed=0, snapshot=None):
+    confidence, user_ids, movie_ids = interaction_matrix(alpha, snapshot)
+    confidence_t = confidence.T.tocsr()
+
+    rng = np.random.default_rng(seed)
+    user_factors = rng.normal(scale=0.01, size=(len(user_ids), factors))
+    item_factors = rng.normal(scale=0.01, size=(len(movie_ids), factors))
+
+    workers = workers or os.cpu_count()
+    # Each thread runs small single-threaded LAPACK solves; nested BLAS threads would oversubscribe the cores
+    with threadpool_limits(limits=1), ThreadPoolExecutor(max_workers=workers) as pool:
+        for _ in range(iterations):
+            user_factors = _half_step(confidence, item_factors, regularization, pool, chunk_size)
+            item_factors = _half_step(confidence_t, user_factors, regularization, pool, chunk_size)
+
+    save_arrays(MODEL_NAME, {
+        'user_ids': user_ids,
+        'movie_ids': movie_ids,
+        'user_factors': user_factors.astype(np.float32),
+        'item_factors': item_factors.astype(np.float32),
+    }, meta={'factors': factors, 'iterations': iterations, 'interactions': int(confidence.nnz)})
+    return len(user_ids), len(movie_ids), confidence.nnz
+
+
+def recommend_for_user(user, limit=20):
+    """
+    Return [(movie_id, score), ...] for user, excluding movies they watched or rated.
+
+    Returns None if the model has not been trained, [] for users unseen at training time.
+    """
+    arrays, _ = load_arrays(MODEL_NAME)
+    if arrays is None:
+        return None
+
+    user_ids = arrays['user_ids']
+    row = int(np.searchsorted(user_ids, user.id))
+    if row >= len(user_ids) or user_ids[row] != user.id:
+        return []
+
+    scores = arrays['item_factors'] @ arrays['user_factors'][row]
+
+    movie_ids = arrays['movie_ids']
+    seen = set(WatchedList.objects.filter(user=user).values_list('movie_id', flat=True))
+    seen.update(Rating.objects.filter(user=user).values_list('movie_id', flat=True))
+    seen_rows = np.searchsorted(movie_ids, np.fromiter(seen, dtype=np.int64, count=len(seen)))
+    seen_rows = seen_rows[seen_rows < len(movie_ids)]
+    scores[seen_rows[np.isin(movie_ids[seen_rows], list(seen))]] = -np.inf
+
+    limit = min(limit, int(np.isfinite(scores).sum()))
+    if limit <= 0:
+        return []
+    top = np.argpartition(-scores, limit - 1)[:limit]
+    top = top[np.argsort(-scores[top])]
+    return [(int(movie_ids[i]), float(scores[i])) for i in top]
@@ -3,4 +3,13 @@ from django.apps import AppConfig
 
 class MovieConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'movie'
\ No newline at end of file
+    name = 'movie'
+
+    def ready(self):
+        from django.db.models.signals import pre_delete
+
+        from .models import User
+        from .rating_stats import discount_user_ratings
+
+        # Ratings deleted by cascade skip the views that keep the aggregates in sync
+        pre_delete.connect(discount_user_ratings, sender=User, dispatch_uid='discount_user_ratings')
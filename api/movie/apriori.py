@@ -1,52 +1,60 @@
-from mlxtend.frequent_patterns import apriori, association_rules
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, permissions
 from rest_framework_simplejwt.authentication import JWTAuthentication
-from django.db.models import Count, Avg
-from .models import Movie, WatchedList, Rating
-import pandas as pd
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+from django.db.models import Case, F, FloatField, Sum, Value, When, Window
+from django.db.models.functions import RowNumber
+from .models import Movie, MovieKeyword, Rating, SimilarMovie, AssociationRule, WatchedList
 from movie.serializers import MovieSerializer
-from collections import Counter
+from movie.keyword_index import load_keyword_index
+from movie.association_rules import active_rule_set
+from movie.genre_profiles import genre_weights
+from movie.charts import CHART_KINDS, chart_key, get_chart
+from movie.item_cf import recommend_for_user
+from movie.als import recommend_for_user as recommend_personal
+from movie.snapshot import load_catalog_snapshot
 
 class AprioriRecommendationView(APIView):
-    def get(self, request):
+    def get(self, request, movie_id=None):
+        # ?limit= rules per movie, most confident first
         try:
-            # Retrieve watched movies data for all users
-            watched_movies_data = WatchedList.objects.all().values_list('user_id', 'movie_id')
-
-            # Create a dictionary to track watched movies for each user
-            user_watched_movies = {}
-            for user_id, movie_id in watched_movies_data:
-                if user_id not in user_watched_movies:
-                    user_watched_movies[user_id] = set()
-                user_watched_movies[user_id].add(movie_id)
-
-            # Prepare the data for Apriori algorithm
-            transactions = [{f'Movie_{movie_id}'} for movie_id in user_watched_movies]
-
-            # Convert the data to a DataFrame
-            df = pd.DataFrame(transactions)
+            limit = max(1, min(int(request.query_params.get('limit', 20)), 100))
+        except ValueError:
+            return Response({'error': 'limit must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
 
-            # Run the Apriori algorithm
-            frequent_itemsets = apriori(df, min_support=0.1, use_colnames=True)
+        try:
+            # Rules are mined offline by the mine_association_rules command
+            rule_set = active_rule_set()
+            if rule_set is None:
+                return Response({'error': 'Association rules have not been mined yet'}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+            rules = AssociationRule.objects.filter(rule_set=rule_set)
+            if movie_id is not None:
+                rules = rules.filter(antecedent_id=movie_id).order_by('-confidence', 'consequent_id')[:limit]
+            else:
+                # The top rules of every antecedent, not the whole rule set
+                rules = rules.annotate(position=Window(
+                    RowNumber(), partition_by=[F('antecedent_id')], order_by=[F('confidence').desc(), F('consequent_id').asc()],
+                )).filter(position__lte=limit).order_by('antecedent_id', '-confidence', 'consequent_id')
 
-            # Generate recommendations
-            rules = association_rules(frequent_itemsets, metric="lift", min_threshold=1)
             apriori_recommendations = {}
-            for idx, row in rules.iterrows():
-                if len(row['antecedents']) == 1:
-                    movie_id = row['antecedents'].pop()
-                    consequent = row['consequents'].pop()
-                    support = row['support']
-                    confidence = row['confidence']
-                    if movie_id not in apriori_recommendations:
-                        apriori_recommendations[movie_id] = []
-                    apriori_recommendations[movie_id].append({'movie_id': consequent, 'support': support, 'confidence': confidence})
-
-            return Response(apriori_recommendations, status=status.HTTP_200_OK)
+            for antecedent, consequent, support, confidence, lift in rules.values_list(
+                'antecedent_id', 'consequent_id', 'support', 'confidence', 'lift'
+            ):
+                if antecedent not in apriori_recommendations:
+                    apriori_recommendations[antecedent] = []
+                apriori_recommendations[antecedent].append({'movie_id': consequent, 'support': support, 'confidence': confidence, 'lift': lift})
+
+            response = {
+                'version': rule_set.pk,
+                'built_at': rule_set.built_at,
+            }
+            if movie_id is not None:
+                response['movie_id'] = movie_id
+                response['recommendations'] = apriori_recommendations.get(movie_id, [])
+            else:
+                response['recommendations'] = apriori_recommendations
+            return Response(response, status=status.HTTP_200_OK)
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
@@ -56,30 +64,42 @@ class GenreRecommendationView(APIView):
 
     def get(self, request):
         try:
-            # Get the user's watched list
-            watched_list = WatchedList.objects.filter(user=request.user)
-            watched_movies = [entry.movie for entry in watched_list]
-            
-            # Calculate the frequency of each genre in the watched list
-            genre_counter = Counter()
-            for movie in watched_movies:
-                for genre in movie.genres.all():
-                    genre_counter[genre] += 1
-            
-            # Get the user's favorite genres
-            favorite_genres = request.user.favorite_genres.all()
-            
-            # Combine favorite genres and frequently watched genres, sorted by frequency
-            combined_genres = sorted(favorite_genres, key=lambda g: genre_counter.get(g, 0), reverse=True)
-            
-            # Find movies belonging to the combined genres that the user hasn't watched
-            recommended_movies = (
-                Movie.objects
-                .filter(genres__in=combined_genres)
-                .exclude(watchedlist__user=request.user)
-                .annotate(avg_rating=Avg('rating__rating'))
-                .order_by('-avg_rating')[:20]  # Limit the queryset to the top 20 movies
-            )
+            # Genre weights from the watched list, maintained incrementally (see genre_profiles)
+            watched_weights = genre_weights(request.user)
+            total_watched = sum(watched_weights.values()) or 1
+            affinity = {genre_id: weight / total_watched for genre_id, weight in watched_weights.items()}
+
+            # Favorite genres always outrank genres that are only watched
+            for genre_id in request.user.favorite_genres.values_list('id', flat=True):
+                affinity[genre_id] = affinity.get(genre_id, 0) + 1.0
+
+            if not affinity:
+                return Response([], status=status.HTTP_200_OK)
+
+            # Rank unwatched movies by the summed affinity of their genres, then by rating
+            snapshot = load_catalog_snapshot()
+            if snapshot is not None and snapshot.is_current(ratings=False):
+                # Scored over the memory-mapped snapshot (its scores may lag the latest ratings);
+                # only the top 20 movies are loaded
+                watched = WatchedList.objects.filter(user=request.user).values_list('movie_id', flat=True)
+                movie_ids = snapshot.rank_by_genres(affinity, exclude=list(watched), limit=20)
+                movies = Movie.objects.prefetch_related('genres').in_bulk(movie_ids)
+                recommended_movies = [movies[movie_id] for movie_id in movie_ids if movie_id in movies]
+            else:
+                recommended_movies = (
+                    Movie.objects
+                    .filter(genres__in=list(affinity))
+                    .exclude(watchedlist__user=request.user)
+                    .annotate(
+                        affinity=Sum(Case(
+                            *[When(genres__id=genre_id, then=Value(weight)) for genre_id, weight in affinity.items()],
+                            default=Value(0.0),
+                            output_field=FloatField(),
+                        )),
+                    )
+                    .order_by('-affinity', F('rating_stats__bayesian_score').desc(nulls_last=True))
+                    .prefetch_related('genres')[:20]  # Limit the queryset to the top 20 movies
+                )
 
             # Serialize the recommended movies
             serializer = MovieSerializer(recommended_movies, many=True)
@@ -90,60 +110,136 @@ class GenreRecommendationView(APIView):
 
 
 class RatingRecommendationView(APIView):
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [permissions.IsAuthenticated]
+
     def get(self, request):
         try:
-            highest_rated_movies = Rating.objects.values('movie').annotate(avg_rating=Avg('rating')).order_by('-avg_rating')[:10]
-
-            # Exclude movies the user has already watched
-            recommended_movies = Movie.objects.exclude(rating__user=request.user, id__in=[movie['movie'] for movie in highest_rated_movies])
+            # ?chart=overall|genre|decade|language with &value=drama, 1990, en...
+            kind = request.query_params.get('chart', 'overall')
+            if kind not in CHART_KINDS:
+                return Response({'error': f'chart must be one of {", ".join(CHART_KINDS)}'}, status=status.HTTP_400_BAD_REQUEST)
+            value = request.query_params.get('value')
+            if kind != 'overall' and not value:
+                return Response({'error': 'value is required for this chart'}, status=status.HTTP_400_BAD_REQUEST)
+            limit = max(1, min(int(request.query_params.get('limit', 20)), 100))
+
+            chart = get_chart(chart_key(kind, value)) or ()
+
+            # Exclude movies the user has already rated
+            rated = set(Rating.objects.filter(user=request.user).values_list('movie_id', flat=True))
+            movie_ids = [movie_id for movie_id in chart if movie_id not in rated][:limit]
+
+            movies = Movie.objects.in_bulk(movie_ids)
+            recommended_movies = [
+                {
+                    'id': movie.id,
+                    'title': movie.title,
+                    'description': movie.description,
+                    'release_date': movie.release_date,
+                    'poster_url': movie.poster_url,
+                }
+                for movie in (movies.get(movie_id) for movie_id in movie_ids) if movie is not None
+            ]
 
-            return Response(recommended_movies.values('id', 'title', 'description', 'release_date', 'poster_url'), status=status.HTTP_200_OK)
+            return Response(recommended_movies, status=status.HTTP_200_OK)
+        except ValueError:
+            return Response({'error': 'limit must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 class SimilarityRecommendationView(APIView):
     def get(self, request, movie_id):
         try:
-            # Fetch the target movie
-            target_movie = Movie.objects.get(id=movie_id)
-            target_keywords = target_movie.keywords.split('-')
-
-            # Collect all movies data (id, title, poster_url, keywords) except for the target movie
-            all_movies = Movie.objects.exclude(id=movie_id)
-            movie_data = []
-            for movie in all_movies:
-                keywords = movie.keywords.split('-')
-                movie_data.append({
+            # Precomputed neighbors are a single indexed lookup
+            neighbors = (
+                SimilarMovie.objects
+                .filter(movie_id=movie_id)
+                .select_related('similar')
+                .order_by('rank')[:10]
+            )
+            recommendations = [{
+                'id': neighbor.similar.id,
+                'title': neighbor.similar.title,
+                'poster_url': neighbor.similar.poster_url,
+                'similarity_score': neighbor.score,
+            } for neighbor in neighbors]
+            if recommendations:
+                return Response(recommendations, status=status.HTTP_200_OK)
+
+            index = load_keyword_index()
+            if index is None:
+                return Response({'error': 'Keyword index has not been built yet'}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+            if index.row_for(movie_id) is not None:
+                # Indexed, and the build found no movie sharing a keyword with it
+                return Response([], status=status.HTTP_200_OK)
+
+            # Movies added since the build are scored against the index from their keywords
+            if not Movie.objects.filter(pk=movie_id).exists():
+                return Response({'error': 'Movie not found'}, status=status.HTTP_404_NOT_FOUND)
+            keyword_ids = list(MovieKeyword.objects.filter(movie_id=movie_id).values_list('keyword_id', flat=True))
+            similar = index.similar_to_keywords(keyword_ids, limit=10)
+
+            movies = Movie.objects.only('id', 'title', 'poster_url').in_bulk([similar_id for similar_id, _ in similar])
+            recommendations = []
+            for similar_id, score in similar:
+                movie = movies.get(similar_id)
+                if movie is None:
+                    # Deleted since the index was built
+                    continue
+                recommendations.append({
                     'id': movie.id,
                     'title': movie.title,
                     'poster_url': movie.poster_url,
-                    'keywords': " ".join(keywords),
+                    'similarity_score': score,
                 })
 
-            # Prepare TF-IDF vectors for each movie
-            documents = [movie['keywords'] for movie in movie_data]
-            tfidf_vectorizer = TfidfVectorizer(tokenizer=lambda text: text.split(), lowercase=False)
-            tfidf_matrix = tfidf_vectorizer.fit_transform(documents)
-            target_document = " ".join(target_keywords)
-            target_vector = tfidf_vectorizer.transform([target_document])
+            return Response(recommendations, status=status.HTTP_200_OK)
+        except Exception as e:
+            return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-            # Calculate cosine similarity between the target movie and all other movies
-            similarity_scores = cosine_similarity(target_vector, tfidf_matrix)
+class ItemCFRecommendationView(APIView):
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [permissions.IsAuthenticated]
 
-            # Sort movies by similarity score
-            sorted_indices = similarity_scores.argsort(axis=1).flatten()[::-1]
-            recommendations = []
-            for index in sorted_indices:
-                movie = movie_data[index]
-                recommendations.append({
-                    'id': movie['id'],
-                    'title': movie['title'],
-                    'poster_url': movie['poster_url'],
-                    'similarity_score': similarity_scores[0, index],
-                })
+    def get(self, request):
+        try:
+            # Neighborhoods are built offline by the build_item_cf command
+            predictions = recommend_for_user(request.user, limit=20)
+            if predictions is None:
+                return Response({'error': 'Item-based model has not been built yet'}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+            movies = Movie.objects.only('id', 'title', 'poster_url').in_bulk([movie_id for movie_id, _ in predictions])
+            recommendations = [{
+                'id': movie_id,
+                'title': movies[movie_id].title,
+                'poster_url': movies[movie_id].poster_url,
+                'predicted_rating': predicted,
+            } for movie_id, predicted in predictions if movie_id in movies]
+
+            return Response(recommendations, status=status.HTTP_200_OK)
+        except Exception as e:
+            return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+class PersonalRecommendationView(APIView):
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [permissions.IsAuthenticated]
 
-            return Response(recommendations[:10], status=status.HTTP_200_OK)
-        except Movie.DoesNotExist:
-            return Response({'error': 'Movie not found'}, status=status.HTTP_404_NOT_FOUND)
+    def get(self, request):
+        try:
+            # Factors are trained offline by the train_als command
+            scored = recommend_personal(request.user, limit=20)
+            if scored is None:
+                return Response({'error': 'Personal model has not been trained yet'}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+            movies = Movie.objects.only('id', 'title', 'poster_url').in_bulk([movie_id for movie_id, _ in scored])
+            recommendations = [{
+                'id': movie_id,
+                'title': movies[movie_id].title,
+                'poster_url': movies[movie_id].poster_url,
+                'score': score,
+            } for movie_id, score in scored if movie_id in movies]
+
+            return Response(recommendations, status=status.HTTP_200_OK)
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
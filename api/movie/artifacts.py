@@ -0,0 +1,72 @@
+import json
+import os
+import shutil
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+
+MANIFEST_NAME = 'manifest.json'
+
+# Loaded artifacts, keyed by name -> (manifest mtime, arrays, meta)
+_loaded = {}
+
+
+def artifact_dir(name):
+    return Path(settings.RECOMMENDER_DATA_DIR) / name
+
+
+def save_arrays(name, arrays, meta=None):
+    """Write a set of named arrays as .npy files plus a manifest, replacing any previous build."""
+    target = artifact_dir(name)
+    staging = target.with_name(f'{target.name}.new')
+    previous = target.with_name(f'{target.name}.old')
+    shutil.rmtree(staging, ignore_errors=True)
+    staging.mkdir(parents=True)
+
+    for key, array in arrays.items():
+        np.save(staging / f'{key}.npy', np.ascontiguousarray(array))
+
+    manifest = {
+        'arrays': sorted(arrays),
+        'built_at': datetime.now(timezone.utc).isoformat(),
+        'meta': meta or {},
+    }
+    with open(staging / MANIFEST_NAME, 'w') as f:
+        json.dump(manifest, f)
+
+    # Swap the new build in; readers that already mapped the old files keep their pages
+    shutil.rmtree(previous, ignore_errors=True)
+    if target.exists():
+        os.rename(target, previous)
+    os.rename(staging, target)
+    shutil.rmtree(previous, ignore_errors=True)
+    _loaded.pop(name, None)
+    return target
+
+
+def load_arrays(name):
+    """Return (arrays, manifest) memory-mapped from disk, or (None, None) if never built."""
+    manifest_path = artifact_dir(name) / MANIFEST_NAME
+    try:
+        mtime = manifest_path.stat().st_mtime_ns
+    except FileNotFoundError:
+        return None, None
+
+    cached = _loaded.get(name)
+    if cached and cached[0] == mtime:
+        return cached[1], cached[2]
+
+    arrays, manifest = read_arrays(manifest_path.parent)
+    _loaded[name] = (mtime, arrays, manifest)
+    return arrays, manifest
+
+
+def read_arrays(path):
+    """Memory-map every array of the build at path; usable from worker processes without Django."""
+    path = Path(path)
+    with open(path / MANIFEST_NAME) as f:
+        manifest = json.load(f)
+    arrays = {key: np.load(path / f'{key}.npy', mmap_mode='r') for key in manifest['arrays']}
+    return arrays, manifest
@@ -0,0 +1,51 @@
+import numpy as np
+from django.db import transaction
+
+from .itemsets import frequent_itemsets, single_consequent_rules, user_movie_matrix
+from .models import AssociationRule, RuleSet
+from .snapshot import watched_pairs
+
+
+def mine_association_rules(min_support=0.1, min_confidence=0.1, min_lift=1.0, chunk_size=10000, snapshot=None):
+    """Mine single movie -> movie rules from the watched lists (or snapshot) and make them the active rule set."""
+    # One transaction (row of watched movies) per user
+    matrix, user_ids, movie_ids = user_movie_matrix(np.column_stack(watched_pairs(snapshot)))
+    n_users = len(user_ids)
+
+    rules = []
+    if n_users:
+        # The rule table stores single-movie antecedents, so only pairs are needed
+        itemsets = frequent_itemsets(matrix, min_support, max_len=2, chunk_size=chunk_size)
+        rules = [
+            AssociationRule(
+                antecedent_id=int(movie_ids[antecedent[0]]),
+                consequent_id=int(movie_ids[consequent]),
+                support=support,
+                confidence=confidence,
+                lift=lift,
+            )
+            for antecedent, consequent, support, confidence, lift in single_consequent_rules(
+                itemsets, n_users, min_confidence=min_confidence, min_lift=min_lift,
+            )
+        ]
+
+    with transaction.atomic():
+        rule_set = RuleSet.objects.create(
+            transactions=n_users,
+            min_support=min_support,
+            min_confidence=min_confidence,
+        )
+        for rule in rules:
+            rule.rule_set = rule_set
+        AssociationRule.objects.bulk_create(rules, batch_size=5000)
+
+        # Swap the new rules in and drop the previous sets
+        RuleSet.objects.exclude(pk=rule_set.pk).delete()
+        rule_set.is_active = True
+        rule_set.save(update_fields=['is_active'])
+
+    return rule_set, len(rules)
+
+
+def active_rule_set():
+    return RuleSet.objects.filter(is_active=True).order_by('-pk').first()
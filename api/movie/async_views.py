@@ -0,0 +1,77 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+
+from movie.apriori import (
+    AprioriRecommendationView, GenreRecommendationView, RatingRecommendationView,
+    SimilarityRecommendationView, ItemCFRecommendationView, PersonalRecommendationView
+)
+
+# Shared by every async recommendation endpoint; created on first use
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _executor():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=settings.RECOMMENDATION_WORKERS, thread_name_prefix='recommendations')
+    return _pool
+
+
+def _run(view, request, kwargs):
+    # Pool threads outlive requests, so drop connections the way the request handler would
+    close_old_connections()
+    try:
+        response = view(request, **kwargs)
+        # Render in the pool too, so serializing a large response does not block the event loop
+        if hasattr(response, 'render'):
+            response.render()
+        return response
+    finally:
+        close_old_connections()
+
+
+def async_recommendation_view(view_class, endpoint):
+    """
+    Serve a sync recommendation view from the event loop without blocking it.
+
+    The view runs in the recommendation thread pool. At most `concurrency` requests of the
+    endpoint run at once (503 beyond that) and a request waits at most `timeout` seconds
+    for its result (504); both come from settings.RECOMMENDATION_LIMITS.
+    """
+    view = view_class.as_view()
+    concurrency, timeout = settings.RECOMMENDATION_LIMITS[endpoint]
+    # A threading semaphore, as it is released from the pool thread when the view finishes
+    slots = threading.BoundedSemaphore(concurrency)
+
+    @csrf_exempt
+    async def async_view(request, **kwargs):
+        if not slots.acquire(blocking=False):
+            response = JsonResponse({'error': f'Too many concurrent {endpoint} recommendation requests'}, status=503)
+            response['Retry-After'] = '1'
+            return response
+
+        future = _executor().submit(_run, view, request, kwargs)
+        # The slot stays taken until the view really finishes, even after a timeout
+        future.add_done_callback(lambda _: slots.release())
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+        except asyncio.TimeoutError:
+            return JsonResponse({'error': f'{endpoint} recommendations timed out'}, status=504)
+
+    return async_view
+
+
+apriori_recommendations = async_recommendation_view(AprioriRecommendationView, 'apriori')
+genre_recommendations = async_recommendation_view(GenreRecommendationView, 'genre')
+rating_recommendations = async_recommendation_view(RatingRecommendationView, 'rating')
+similarity_recommendations = async_recommendation_view(SimilarityRecommendationView, 'similarity')
+item_cf_recommendations = async_recommendation_view(ItemCFRecommendationView, 'item-cf')
+personal_recommendations = async_recommendation_view(PersonalRecommendationView, 'personal')
@@ -0,0 +1,77 @@
+from django.db import connection
+from django.db.models.constants import OnConflict
+
+
+# Field types whose Python values the database driver takes as they are
+PLAIN_TYPES = {
+    'CharField', 'TextField', 'URLField', 'IntegerField', 'PositiveIntegerField', 'BigIntegerField',
+    'PositiveBigIntegerField', 'ForeignKey', 'FloatField',
+}
+
+
+def _preparers(model_fields):
+    # Only values that need adapting (dates, decimals, ...) go through the field
+    return [None if field.get_internal_type() in PLAIN_TYPES else field for field in model_fields]
+
+
+def insert_rows(model, fields, rows, returning=None, ignore_conflicts=False):
+    """
+    Insert plain value tuples with multi-row INSERTs.
+
+    This is bulk_create without building a model instance and running pre_save for every
+    value, which dominates the cost of large imports. rows follow the order of fields.
+    With returning='id' the new ids are returned in row order (not with ignore_conflicts).
+    """
+    opts = model._meta
+    model_fields = [opts.get_field(name) for name in fields]
+    quote = connection.ops.quote_name
+    on_conflict = OnConflict.IGNORE if ignore_conflicts else None
+    statement = (
+        f'{connection.ops.insert_statement(on_conflict=on_conflict)} {quote(opts.db_table)} '
+        f'({", ".join(quote(field.column) for field in model_fields)}) VALUES '
+    )
+    suffix = connection.ops.on_conflict_suffix_sql(model_fields, on_conflict, None, None)
+    if returning:
+        suffix += f' RETURNING {quote(opts.get_field(returning).column)}'
+
+    prepare = _preparers(model_fields)
+    rows = list(rows)
+    row_sql = f'({", ".join(["%s"] * len(fields))})'
+    batch_size = connection.ops.bulk_batch_size(model_fields, rows) or len(rows)
+    returned = []
+    with connection.cursor() as cursor:
+        for start in range(0, len(rows), batch_size):
+            batch = rows[start:start + batch_size]
+            params = []
+            for row in batch:
+                params.extend(
+                    value if field is None else field.get_db_prep_save(value, connection)
+                    for value, field in zip(row, prepare)
+                )
+            cursor.execute(statement + ', '.join([row_sql] * len(batch)) + suffix, params)
+            if returning:
+                returned.extend(value for value, in cursor.fetchall())
+    return returned
+
+
+def update_rows(model, fields, rows):
+    """
+    Update rows of (primary key, *values in the order of fields) with one executemany.
+
+    bulk_update builds a CASE WHEN per field and batch, whose compilation cost grows
+    with both; a prepared UPDATE ... WHERE pk = %s stays linear.
+    """
+    opts = model._meta
+    model_fields = [opts.get_field(name) for name in fields]
+    quote = connection.ops.quote_name
+    assignments = ', '.join(f'{quote(field.column)} = %s' for field in model_fields)
+    statement = f'UPDATE {quote(opts.db_table)} SET {assignments} WHERE {quote(opts.pk.column)} = %s'
+
+    prepare = _preparers(model_fields)
+    params = [
+        [value if field is None else field.get_db_prep_save(value, connection) for value, field in zip(values, prepare)] + [pk]
+        for pk, *values in rows
+    ]
+    if params:
+        with connection.cursor() as cursor:
+            cursor.executemany(statement, params)
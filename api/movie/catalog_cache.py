@@ -0,0 +1,89 @@
+import hashlib
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework.response import Response
+
+from .jobs import enqueue_rebuilds
+from .versioning import CATALOG, bump_version, get_version
+
+# (checked_at, catalog version) for this process
+_version = None
+
+# Lookup counters, shared by every process using the cache and never expired
+HITS_KEY = 'catalog-cache:hits'
+MISSES_KEY = 'catalog-cache:misses'
+
+
+def catalog_version():
+    """Return the catalog version, re-reading it at most every CATALOG_VERSION_TTL seconds."""
+    global _version
+    now = time.monotonic()
+    if _version is None or now - _version[0] > settings.CATALOG_VERSION_TTL:
+        _version = (now, get_version(CATALOG))
+    return _version[1]
+
+
+def bump_catalog():
+    """
+    Invalidate every cached catalog entry; call inside the transaction that changes the catalog.
+
+    The catalog snapshot is rebuilt after JOB_REBUILD_DELAY, so the recommenders reading
+    it are back on it once a burst of changes is over.
+    """
+    bump_version(CATALOG)
+    enqueue_rebuilds(['build_catalog_snapshot'])
+    transaction.on_commit(_forget_version)
+
+
+def _forget_version():
+    global _version
+    _version = None
+
+
+def catalog_key(kind, params=''):
+    """Cache key of a catalog entry; params is a detail pk or a QueryDict."""
+    if hasattr(params, 'lists'):
+        params = hashlib.md5(urlencode(sorted(params.lists()), doseq=True).encode()).hexdigest()
+    return f'catalog:{catalog_version()}:{kind}:{params}'
+
+
+def record_lookup(hit):
+    """Count a catalog cache hit or miss."""
+    key = HITS_KEY if hit else MISSES_KEY
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Evicted between the add and the incr; losing one count is fine
+        pass
+
+
+def cache_stats():
+    """Return the hit and miss counts and the hit rate (None before the first lookup)."""
+    hits, misses = cache.get(HITS_KEY, 0), cache.get(MISSES_KEY, 0)
+    total = hits + misses
+    return {'hits': hits, 'misses': misses, 'hit_rate': hits / total if total else None}
+
+
+def cached_response(key, build):
+    """
+    Serve the data cached under key, or call build() for a Response and cache its data.
+
+    Only 200 responses are stored. X-Cache tells whether the entry was a HIT or a MISS.
+    """
+    data = cache.get(key)
+    record_lookup(data is not None)
+    if data is not None:
+        response = Response(data)
+        response['X-Cache'] = 'HIT'
+        return response
+
+    response = build()
+    if response.status_code == 200:
+        cache.set(key, response.data)
+    response['X-Cache'] = 'MISS'
+    return response
@@ -0,0 +1,117 @@
+import threading
+
+import numpy as np
+from django.conf import settings
+
+from .artifacts import load_arrays, save_arrays
+from .models import Movie, MovieRatingStats
+from .snapshot import load_catalog_snapshot
+from .versioning import RATINGS, get_version
+
+CHART_KINDS = ('overall', 'genre', 'decade', 'language')
+ARTIFACT = 'charts'
+
+# Held while a process without any charts builds the first ones
+_build_lock = threading.Lock()
+
+
+def chart_key(kind, value=None):
+    """'overall', 'genre:drama', 'decade:1990', 'language:en'."""
+    if kind == 'overall':
+        return kind
+    return f'{kind}:{str(value).strip().lower()}'
+
+
+def build_charts(size=None):
+    """Rank rated movies by Bayesian score into overall, per genre, per decade and per language charts."""
+    size = size or settings.CHARTS_SIZE
+    snapshot = load_catalog_snapshot()
+    if snapshot is not None and snapshot.is_current():
+        return _charts_from_snapshot(snapshot, size)
+
+    ranked = (
+        MovieRatingStats.objects
+        .filter(bayesian_score__isnull=False)
+        .order_by('-bayesian_score', 'movie_id')
+        .values_list('movie_id', 'movie__release_date', 'movie__original_language')
+    )
+    genre_names = {}
+    for movie_id, name in Movie.genres.through.objects.filter(movie__rating_stats__rating_count__gt=0).values_list('movie_id', 'genre__name'):
+        genre_names.setdefault(movie_id, []).append(name)
+
+    charts = {}
+    for movie_id, release_date, language in ranked.iterator(chunk_size=10000):
+        keys = [chart_key('overall')]
+        keys += [chart_key('genre', name) for name in genre_names.get(movie_id, ())]
+        if release_date:
+            keys.append(chart_key('decade', release_date.year // 10 * 10))
+        if language:
+            keys.append(chart_key('language', language))
+        for key in keys:
+            chart = charts.setdefault(key, [])
+            if len(chart) < size:
+                chart.append(movie_id)
+
+    return {key: tuple(chart) for key, chart in charts.items()}
+
+
+def _charts_from_snapshot(snapshot, size):
+    # Same ranking as build_charts, read from the memory-mapped columns instead of the database
+    scores = snapshot['bayesian_score']
+    rated = np.flatnonzero(~np.isnan(scores))
+    rated = rated[np.lexsort((snapshot.movie_ids[rated], -scores[rated]))]
+    genre_indptr, genre_ids = snapshot['genre_indptr'], snapshot['genre_ids']
+    genre_names = snapshot.meta['genres']
+    languages = snapshot.meta['languages']
+
+    charts = {}
+    for row, movie_id, year, language in zip(
+        rated.tolist(), snapshot.movie_ids[rated].tolist(),
+        snapshot['release_year'][rated].tolist(), snapshot['language'][rated].tolist(),
+    ):
+        keys = [chart_key('overall')]
+        keys += [chart_key('genre', genre_names[str(genre_id)]) for genre_id in genre_ids[genre_indptr[row]:genre_indptr[row + 1]].tolist()]
+        if year >= 0:
+            keys.append(chart_key('decade', year // 10 * 10))
+        if language >= 0:
+            keys.append(chart_key('language', languages[language]))
+        for key in keys:
+            chart = charts.setdefault(key, [])
+            if len(chart) < size:
+                chart.append(movie_id)
+
+    return {key: tuple(chart) for key, chart in charts.items()}
+
+
+def save_charts(size=None):
+    """Build the charts and store them as one id array, sliced per chart by indptr."""
+    version = get_version(RATINGS)
+    charts = build_charts(size)
+    keys = sorted(charts)
+    indptr = np.zeros(len(keys) + 1, dtype=np.int64)
+    indptr[1:] = np.cumsum([len(charts[key]) for key in keys])
+    movie_ids = np.fromiter((movie_id for key in keys for movie_id in charts[key]), dtype=np.int64, count=indptr[-1])
+    save_arrays(ARTIFACT, {'indptr': indptr, 'movie_ids': movie_ids}, meta={'keys': keys, 'ratings_version': version})
+
+
+def get_chart(key):
+    """
+    Return the movie ids of a chart from the last build, or None if there is no such chart.
+
+    Requests never rebuild stale charts: rating changes enqueue the build_charts job. Only
+    a process finding no build at all builds one, a single request at a time.
+    """
+    arrays, manifest = load_arrays(ARTIFACT)
+    if arrays is None:
+        with _build_lock:
+            arrays, manifest = load_arrays(ARTIFACT)
+            if arrays is None:
+                save_charts()
+                arrays, manifest = load_arrays(ARTIFACT)
+
+    keys = manifest['meta']['keys']
+    try:
+        index = keys.index(key)
+    except ValueError:
+        return None
+    return tuple(arrays['movie_ids'][arrays['indptr'][index]:arrays['indptr'][index + 1]].tolist())
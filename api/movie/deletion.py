@@ -0,0 +1,54 @@
+from collections import Counter
+
+from django.db import models, transaction
+
+from .catalog_cache import bump_catalog
+from .genre_profiles import rebuild_genre_profiles
+from .models import Movie, Rating, WatchedList
+from .search import deferred_search_index
+from .versioning import RATINGS, bump_version
+
+
+def movie_dependents():
+    """Every relation pointing at Movie, including the through tables and the hidden '+' ones."""
+    return [
+        field for field in Movie._meta.get_fields(include_hidden=True)
+        if field.auto_created and not field.concrete and (field.one_to_many or field.one_to_one)
+    ]
+
+
+def delete_movie_batch(movie_ids):
+    """
+    Delete movie_ids and everything that references them, one table at a time.
+
+    Each dependent table is deleted before the movies, so Django can fast-delete it with a
+    single DELETE (none of them has delete signal receivers or cascades of its own) instead
+    of loading the rows to emulate the cascades on Movie. Genre profiles of the users who
+    had these movies watched are rebuilt, and the ratings and catalog versions are bumped.
+    Returns {model label: rows deleted}.
+    """
+    counts = Counter()
+    with transaction.atomic():
+        users = list(WatchedList.objects.filter(movie_id__in=movie_ids).values_list('user_id', flat=True).distinct())
+        had_ratings = Rating.objects.filter(movie_id__in=movie_ids).exists()
+
+        # Deleted movies drop out of the search index in one pass instead of a trigger per link
+        with deferred_search_index() as indexed:
+            for relation in movie_dependents():
+                dependents = relation.related_model._base_manager.filter(**{f'{relation.field.name}__in': movie_ids})
+                if relation.on_delete is models.SET_NULL:
+                    dependents.update(**{relation.field.name: None})
+                elif relation.on_delete is models.CASCADE:
+                    counts.update(dependents.delete()[1])
+                else:
+                    raise ValueError(f'Cannot bulk delete movies referenced by {relation.related_model._meta.label}')
+            # Nothing references the movies any more; only their ids are loaded
+            counts.update(Movie._base_manager.filter(id__in=movie_ids).only('id').delete()[1])
+            indexed.update(movie_ids)
+
+        if users:
+            rebuild_genre_profiles(users=users)
+        if had_ratings:
+            bump_version(RATINGS)
+        bump_catalog()
+    return dict(counts)
@@ -0,0 +1,55 @@
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Count, F
+from django.db.models.functions import Greatest
+
+from .models import Movie, UserGenreProfile, WatchedList
+
+
+def genre_weights(user):
+    """Return {genre_id: weight} for user in a single query."""
+    return dict(UserGenreProfile.objects.filter(user=user, weight__gt=0).values_list('genre_id', 'weight'))
+
+
+def adjust_genre_profile(user, movie_ids, delta):
+    """Add delta to the user's weight of every genre of movie_ids (+1 on watch, -1 on removal)."""
+    genre_counts = Counter(dict(
+        Movie.genres.through.objects
+        .filter(movie_id__in=movie_ids)
+        .values('genre_id')
+        .annotate(movies=Count('movie_id'))
+        .values_list('genre_id', 'movies')
+    ))
+    if not genre_counts:
+        return
+
+    with transaction.atomic():
+        UserGenreProfile.objects.bulk_create(
+            [UserGenreProfile(user=user, genre_id=genre_id) for genre_id in genre_counts],
+            ignore_conflicts=True,
+        )
+        for genre_id, movies in genre_counts.items():
+            UserGenreProfile.objects.filter(user=user, genre_id=genre_id).update(
+                weight=Greatest(F('weight') + delta * movies, 0)
+            )
+
+
+def rebuild_genre_profiles(users=None):
+    """Recompute profiles from the watched lists with one aggregate query; returns the rows written."""
+    watched = WatchedList.objects.filter(movie__genres__isnull=False)
+    if users is not None:
+        watched = watched.filter(user__in=users)
+    counts = watched.values('user_id', 'movie__genres').annotate(weight=Count('id'))
+
+    profiles = [
+        UserGenreProfile(user_id=row['user_id'], genre_id=row['movie__genres'], weight=row['weight'])
+        for row in counts.iterator(chunk_size=10000)
+    ]
+    with transaction.atomic():
+        existing = UserGenreProfile.objects.all()
+        if users is not None:
+            existing = existing.filter(user__in=users)
+        existing.delete()
+        UserGenreProfile.objects.bulk_create(profiles, batch_size=5000)
+    return len(profiles)
@@ -0,0 +1,186 @@
+from django.db import transaction
+
+from .bulk import insert_rows, update_rows
+from .jobs import enqueue
+from .models import Genre, Movie
+from .parsing import MOVIE_FIELDS, SOURCE_INDEX
+from .terms import TERM_FIELDS, link_movie_terms
+
+# Positions of the dash-joined columns normalized by movie/terms.py
+TERM_INDEXES = [MOVIE_FIELDS.index(column) for column in TERM_FIELDS]
+TITLE_INDEX = MOVIE_FIELDS.index('title')
+RELEASE_DATE_INDEX = MOVIE_FIELDS.index('release_date')
+
+# Keep IN (...) lists well under SQLite's bound parameter limit
+QUERY_CHUNK = 5000
+
+
+class MovieWriter:
+    """Insert or upsert parsed rows, resolving genre names through an id map loaded once."""
+
+    def __init__(self):
+        self.genre_ids = dict(Genre.objects.values_list('name', 'id'))
+        # Ids of every movie inserted or changed so far, and of the changed ones alone
+        self.movie_ids = []
+        self.changed_ids = []
+        self.inserted = 0
+        self.updated = 0
+        self.skipped = 0
+
+    def resolve_genres(self, names):
+        missing = set(names) - set(self.genre_ids)
+        if missing:
+            Genre.objects.bulk_create([Genre(name=name) for name in missing], ignore_conflicts=True)
+            self.genre_ids.update(Genre.objects.filter(name__in=missing).values_list('name', 'id'))
+
+    def write(self, rows):
+        """
+        Insert a parsed chunk with its genre and term links; returns the new movie ids.
+
+        Rows whose source_id is already stored, or repeated in the file, are skipped: a
+        plain import only appends movies it has not seen (upsert refreshes them).
+        """
+        with transaction.atomic():
+            rows = self._unseen(rows)
+            movie_ids = self._insert(rows)
+        self.movie_ids.extend(movie_ids)
+        return movie_ids
+
+    def _unseen(self, rows):
+        source_ids = list({values[SOURCE_INDEX] for values, _ in rows} - {None})
+        seen = set()
+        for start in range(0, len(source_ids), QUERY_CHUNK):
+            chunk = source_ids[start:start + QUERY_CHUNK]
+            seen.update(Movie.objects.filter(source_id__in=chunk).values_list('source_id', flat=True))
+
+        # Rows without a source id are always new
+        unseen = []
+        for row in rows:
+            source_id = row[0][SOURCE_INDEX]
+            if source_id is not None:
+                if source_id in seen:
+                    continue
+                seen.add(source_id)
+            unseen.append(row)
+        self.skipped += len(rows) - len(unseen)
+        return unseen
+
+    def upsert(self, rows):
+        """
+        Insert the rows whose source_id is new and update the ones that differ from the stored movie.
+
+        Genre links are reconciled and term links rebuilt only for the movies that changed,
+        so re-importing an unchanged file writes nothing. Movies imported before source ids
+        were stored are matched on (title, release_date) and get their source_id on update.
+        Returns the inserted and changed ids.
+        """
+        # The last row wins when the file repeats a source id
+        by_source = {}
+        new_rows = []
+        for row in rows:
+            source_id = row[0][SOURCE_INDEX]
+            if source_id is None:
+                new_rows.append(row)
+            else:
+                by_source[source_id] = row
+
+        with transaction.atomic():
+            existing = {}
+            source_ids = list(by_source)
+            for start in range(0, len(source_ids), QUERY_CHUNK):
+                chunk = source_ids[start:start + QUERY_CHUNK]
+                for movie_id, *values in Movie.objects.filter(source_id__in=chunk).values_list('id', *MOVIE_FIELDS):
+                    existing[values[SOURCE_INDEX]] = (movie_id, tuple(values))
+            existing.update(self._legacy_matches(
+                {source_id: row for source_id, row in by_source.items() if source_id not in existing}
+            ))
+            new_rows += [row for source_id, row in by_source.items() if source_id not in existing]
+
+            movie_ids = self._insert(new_rows)
+            changed_ids = self._update([
+                (existing[source_id], row) for source_id, row in by_source.items() if source_id in existing
+            ])
+
+        movie_ids += changed_ids
+        self.movie_ids.extend(movie_ids)
+        self.changed_ids.extend(changed_ids)
+        return movie_ids
+
+    def _legacy_matches(self, rows_by_source):
+        """Return {source_id: (movie_id, stored values)} for rows matching a movie without a source_id."""
+        titles = list({values[TITLE_INDEX] for values, _ in rows_by_source.values()})
+        candidates = {}
+        for start in range(0, len(titles), QUERY_CHUNK):
+            chunk = titles[start:start + QUERY_CHUNK]
+            legacy = Movie.objects.filter(source_id__isnull=True, title__in=chunk).order_by('id')
+            for movie_id, *values in legacy.values_list('id', *MOVIE_FIELDS):
+                candidates.setdefault((values[TITLE_INDEX], values[RELEASE_DATE_INDEX]), []).append((movie_id, tuple(values)))
+
+        # Each stored movie is matched at most once, oldest first
+        matches = {}
+        for source_id, (values, _) in rows_by_source.items():
+            stored = candidates.get((values[TITLE_INDEX], values[RELEASE_DATE_INDEX]))
+            if stored:
+                matches[source_id] = stored.pop(0)
+        return matches
+
+    def _insert(self, rows):
+        movie_ids = insert_rows(Movie, MOVIE_FIELDS, [values for values, _ in rows], returning='id')
+        self.resolve_genres({name for _, names in rows for name in names})
+        insert_rows(Movie.genres.through, ('movie', 'genre'), [
+            (movie_id, self.genre_ids[name])
+            for movie_id, (_, names) in zip(movie_ids, rows)
+            for name in names
+        ])
+        link_movie_terms(
+            Movie(id=movie_id, **dict(zip(MOVIE_FIELDS, values)))
+            for movie_id, (values, _) in zip(movie_ids, rows)
+        )
+        self.inserted += len(movie_ids)
+        return movie_ids
+
+    def _update(self, pairs):
+        """pairs is [((movie_id, stored values), (parsed values, genre names))]; returns the changed ids."""
+        self.resolve_genres({name for _, (_, names) in pairs for name in names})
+        movie_ids = [movie_id for (movie_id, _), _ in pairs]
+
+        links = {}
+        for start in range(0, len(movie_ids), QUERY_CHUNK):
+            chunk = movie_ids[start:start + QUERY_CHUNK]
+            for link_id, movie_id, genre_id in Movie.genres.through.objects.filter(movie_id__in=chunk).values_list('id', 'movie_id', 'genre_id'):
+                links.setdefault(movie_id, {})[genre_id] = link_id
+
+        updated_movies = []
+        retermed_movies = []
+        regenred_ids = []
+        changed_ids = []
+        stale_links = []
+        new_links = []
+        for (movie_id, stored), (values, names) in pairs:
+            if stored != values:
+                movie = Movie(id=movie_id, **dict(zip(MOVIE_FIELDS, values)))
+                updated_movies.append((movie, values))
+                if any(stored[index] != values[index] for index in TERM_INDEXES):
+                    retermed_movies.append(movie)
+
+            current = links.get(movie_id, {})
+            wanted = {self.genre_ids[name] for name in names}
+            stale_links += [link_id for genre_id, link_id in current.items() if genre_id not in wanted]
+            new_links += [(movie_id, genre_id) for genre_id in wanted if genre_id not in current]
+            if wanted != set(current):
+                regenred_ids.append(movie_id)
+            if stored != values or wanted != set(current):
+                changed_ids.append(movie_id)
+
+        update_rows(Movie, MOVIE_FIELDS, [(movie.id, *values) for movie, values in updated_movies])
+        for start in range(0, len(stale_links), QUERY_CHUNK):
+            Movie.genres.through.objects.filter(id__in=stale_links[start:start + QUERY_CHUNK]).delete()
+        insert_rows(Movie.genres.through, ('movie', 'genre'), new_links)
+        if retermed_movies:
+            link_movie_terms(retermed_movies, replace=True)
+        if regenred_ids:
+            # Watchers' genre profiles count these movies under their old genres
+            enqueue('rebuild_genre_profiles', movie_ids=regenred_ids)
+
+        self.updated += len(changed_ids)
+        return changed_ids
@@ -0,0 +1,93 @@
+import numpy as np
+from scipy.sparse import csr_matrix
+
+from .artifacts import load_arrays, save_arrays
+from .models import Rating
+from .neighbors import block_neighbors
+from .snapshot import rating_triples
+
+MODEL_NAME = 'item_cf'
+
+
+def build_item_cf(top_k=50, block_size=256, snapshot=None):
+    """
+    Build truncated item-item neighborhoods from the ratings.
+
+    Ratings are centred on each user's mean and item columns are L2-normalised, so the
+    product of two columns is the adjusted cosine similarity. Only the top_k positive
+    neighbors of each movie are kept, padded with -1 to a dense movies x top_k array.
+    The ratings are read from snapshot (a CatalogSnapshot) when one is given.
+    """
+    users, movies, values = rating_triples(snapshot)
+    user_ids, rows = np.unique(users, return_inverse=True)
+    movie_ids, columns = np.unique(movies, return_inverse=True)
+    values = np.asarray(values, dtype=np.float64)
+
+    user_means = np.bincount(rows, weights=values, minlength=len(user_ids)) / np.maximum(np.bincount(rows, minlength=len(user_ids)), 1)
+    centred = values - user_means[rows]
+    norms = np.sqrt(np.bincount(columns, weights=centred ** 2, minlength=len(movie_ids)))
+    normalised = np.divide(centred, norms[columns], out=np.zeros_like(centred), where=norms[columns] > 0)
+
+    # Movies x users, so row products are item-item similarities
+    item_matrix = csr_matrix((normalised.astype(np.float32), (columns, rows)), shape=(len(movie_ids), len(user_ids)))
+
+    neighbors = np.full((len(movie_ids), top_k), -1, dtype=np.int32)
+    similarities = np.zeros((len(movie_ids), top_k), dtype=np.float32)
+    for start in range(0, len(movie_ids), block_size):
+        block = list(range(start, min(start + block_size, len(movie_ids))))
+        for row, row_neighbors in block_neighbors(item_matrix, block, top_k):
+            for rank, (neighbor, similarity) in enumerate(row_neighbors):
+                neighbors[row, rank] = neighbor
+                similarities[row, rank] = similarity
+
+    save_arrays(MODEL_NAME, {
+        'movie_ids': movie_ids,
+        'neighbors': neighbors,
+        'similarities': similarities,
+    }, meta={'ratings': len(values), 'users': len(user_ids), 'top_k': top_k})
+    return len(movie_ids), len(values)
+
+
+def recommend_for_user(user, limit=20):
+    """
+    Return [(movie_id, predicted_rating), ...] for user from their own ratings, best first.
+
+    Returns None if the model has not been built.
+    """
+    arrays, _ = load_arrays(MODEL_NAME)
+    if arrays is None:
+        return None
+
+    rated = list(Rating.objects.filter(user=user, rating__isnull=False).values_list('movie_id', 'rating'))
+    if not rated:
+        return []
+
+    movie_ids = arrays['movie_ids']
+    rated_ids = np.array([movie_id for movie_id, _ in rated], dtype=np.int64)
+    rated_values = np.array([rating for _, rating in rated], dtype=np.float64)
+    user_mean = rated_values.mean()
+
+    rows = np.searchsorted(movie_ids, rated_ids)
+    known = (rows < len(movie_ids)) & (movie_ids[np.minimum(rows, len(movie_ids) - 1)] == rated_ids)
+    rows, centred = rows[known], rated_values[known] - user_mean
+    if not len(rows):
+        return []
+
+    # Weighted sum of the user's centred ratings over each candidate's rated neighbors
+    neighbors = np.asarray(arrays['neighbors'][rows])
+    similarities = np.asarray(arrays['similarities'][rows])
+    valid = neighbors >= 0
+    candidates, inverse = np.unique(neighbors[valid], return_inverse=True)
+    weights = similarities[valid]
+    numerator = np.bincount(inverse, weights=weights * np.broadcast_to(centred[:, None], neighbors.shape)[valid])
+    denominator = np.bincount(inverse, weights=np.abs(weights))
+
+    keep = ~np.isin(candidates, rows) & (denominator > 0)
+    candidates, numerator, denominator = candidates[keep], numerator[keep], denominator[keep]
+    if not len(candidates):
+        return []
+
+    predicted = user_mean + numerator / denominator
+    # Best predicted rating first, better-supported predictions breaking ties
+    order = np.lexsort((-denominator, -predicted))[:limit]
+    return [(int(movie_ids[candidates[i]]), float(predicted[i])) for i in order]
@@ -0,0 +1,103 @@
+import math
+from itertools import chain
+
+import numpy as np
+from scipy.sparse import csr_matrix, triu
+
+
+def user_movie_matrix(pairs):
+    """
+    Build a binary users x movies CSR matrix from (user_id, movie_id) pairs.
+
+    pairs is an (n, 2) array or an iterable of pairs. Returns (matrix, user_ids, movie_ids)
+    where the id arrays map rows and columns back to ids.
+    """
+    if isinstance(pairs, np.ndarray):
+        pairs = pairs.astype(np.int64, copy=False).reshape(-1, 2)
+    else:
+        # Flatten straight into an int64 buffer rather than holding a list of tuples
+        pairs = np.fromiter(chain.from_iterable(pairs), dtype=np.int64).reshape(-1, 2)
+    user_ids, rows = np.unique(pairs[:, 0], return_inverse=True)
+    movie_ids, columns = np.unique(pairs[:, 1], return_inverse=True)
+
+    matrix = csr_matrix(
+        (np.ones(len(pairs), dtype=np.int32), (rows, columns)),
+        shape=(len(user_ids), len(movie_ids)),
+    )
+    # Duplicate watched entries are summed by the constructor; a transaction is a set
+    matrix.data[:] = 1
+    return matrix, user_ids, movie_ids
+
+
+def frequent_itemsets(matrix, min_support, max_len=None, chunk_size=10000):
+    """
+    Eclat-style frequent itemset mining over a binary users x items CSR matrix.
+
+    Returns {itemset (sorted tuple of column indexes): number of users containing it}.
+    Item and pair counts are accumulated over chunks of chunk_size users, so peak memory
+    is bounded by the chunk and the frequent-pair matrix; max_len=2 stops there. Longer
+    itemsets are grown depth-first by intersecting the user lists of frequent pairs.
+    """
+    n_users = matrix.shape[0]
+    min_count = max(1, math.ceil(min_support * n_users))
+
+    item_counts = np.zeros(matrix.shape[1], dtype=np.int64)
+    for start in range(0, n_users, chunk_size):
+        item_counts += np.asarray(matrix[start:start + chunk_size].sum(axis=0)).ravel()
+
+    items = np.flatnonzero(item_counts >= min_count)
+    itemsets = {(int(item),): int(item_counts[item]) for item in items}
+    if max_len == 1 or len(items) < 2:
+        return itemsets
+
+    # Co-occurrence counts restricted to the frequent items
+    restricted = matrix[:, items].tocsr()
+    pair_counts = None
+    for start in range(0, n_users, chunk_size):
+        chunk = restricted[start:start + chunk_size]
+        product = chunk.T @ chunk
+        pair_counts = product if pair_counts is None else pair_counts + product
+    pair_counts = triu(pair_counts, k=1).tocoo()
+
+    keep = pair_counts.data >= min_count
+    first, second, counts = pair_counts.row[keep], pair_counts.col[keep], pair_counts.data[keep]
+    for a, b, count in zip(first, second, counts):
+        itemsets[(int(items[a]), int(items[b]))] = int(count)
+    if max_len == 2 or not len(counts):
+        return itemsets
+
+    # Depth-first growth: extend each prefix with later items that form a frequent pair with its last item
+    users_of = restricted.tocsc()
+    extensions = {}
+    for a, b in zip(first, second):
+        extensions.setdefault(int(a), []).append(int(b))
+
+    def grow(prefix, prefix_users):
+        for candidate in extensions.get(prefix[-1], ()):
+            candidate_users = users_of.indices[users_of.indptr[candidate]:users_of.indptr[candidate + 1]]
+            common = np.intersect1d(prefix_users, candidate_users, assume_unique=True)
+            if len(common) < min_count:
+                continue
+            itemset = prefix + (candidate,)
+            if len(itemset) > 2:
+                itemsets[tuple(int(items[i]) for i in itemset)] = len(common)
+            if max_len is None or len(itemset) < max_len:
+                grow(itemset, common)
+
+    for item in extensions:
+        grow((item,), users_of.indices[users_of.indptr[item]:users_of.indptr[item + 1]])
+    return itemsets
+
+
+def single_consequent_rules(itemsets, n_users, min_confidence=0.0, min_lift=0.0):
+    """Yield (antecedent, consequent, support, confidence, lift) for every rule with one consequent."""
+    for itemset, count in itemsets.items():
+        if len(itemset) < 2:
+            continue
+        support = count / n_users
+        for i, consequent in enumerate(itemset):
+            antecedent = itemset[:i] + itemset[i + 1:]
+            confidence = count / itemsets[antecedent]
+            lift = confidence / (itemsets[(consequent,)] / n_users)
+            if confidence >= min_confidence and lift >= min_lift:
+                yield antecedent, consequent, support, confidence, lift
@@ -0,0 +1,245 @@
+import hashlib
+import json
+import threading
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, IntegrityError, connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .als import train_als
+from .association_rules import mine_association_rules
+from .charts import save_charts
+from .genre_profiles import rebuild_genre_profiles
+from .item_cf import build_item_cf
+from .keyword_index import build_keyword_index
+from .models import Job, Movie, WatchedList
+from .rating_stats import rebuild_rating_stats
+from .similar_movies import refresh_similar_movies
+from .snapshot import build_catalog_snapshot
+
+# name -> function, filled by the @job decorator below
+registry = {}
+
+# Rebuilds to schedule when ratings or watched lists change
+RATING_MODELS = ('build_item_cf', 'train_als', 'build_charts')
+WATCHED_MODELS = ('mine_association_rules', 'train_als')
+
+
+def job(name):
+    """Register a function as a job; it is called with the enqueued kwargs."""
+    def register(func):
+        registry[name] = func
+        return func
+    return register
+
+
+def job_key(name, kwargs):
+    return hashlib.md5(json.dumps([name, kwargs], sort_keys=True).encode()).hexdigest()
+
+
+def enqueue(name, delay=0, max_attempts=None, **kwargs):
+    """
+    Schedule a registered job to run in delay seconds.
+
+    Nothing is added while an identical job (same name and kwargs) is pending, so repeated
+    changes collapse into one run. Call inside the transaction making the change and the
+    job commits or rolls back with it.
+    """
+    if name not in registry:
+        raise ValueError(f'Unknown job: {name}')
+    Job.objects.bulk_create([Job(
+        name=name,
+        kwargs=kwargs,
+        key=job_key(name, kwargs),
+        max_attempts=max_attempts or settings.JOB_MAX_ATTEMPTS,
+        run_at=timezone.now() + timedelta(seconds=delay),
+    )], ignore_conflicts=True)
+
+
+def enqueue_rebuilds(names):
+    """Schedule model rebuilds after JOB_REBUILD_DELAY, so a burst of changes triggers one rebuild."""
+    for name in names:
+        enqueue(name, delay=settings.JOB_REBUILD_DELAY)
+
+
+def claim_jobs(batch_size):
+    """Mark up to batch_size due jobs as running and return them, oldest first."""
+    now = timezone.now()
+    due = (
+        Job.objects
+        .filter(status=Job.PENDING, run_at__lte=now)
+        .order_by('run_at', 'id')
+        .values_list('id', flat=True)[:batch_size]
+    )
+    claimed = []
+    for job_id in due:
+        # Conditional on still being pending, so two workers never claim the same job
+        if Job.objects.filter(id=job_id, status=Job.PENDING).update(status=Job.RUNNING, started_at=now, heartbeat_at=now, attempts=F('attempts') + 1):
+            claimed.append(job_id)
+    return list(Job.objects.filter(id__in=claimed).order_by('run_at', 'id'))
+
+
+class Heartbeat:
+    """
+    Renew a running job's heartbeat every JOB_HEARTBEAT_INTERVAL seconds from a thread.
+
+    Used as a context manager around the job function, so a job is only presumed lost
+    when its worker stops beating, however long the job itself takes.
+    """
+
+    def __init__(self, job):
+        self.job_id = job.id
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, name=f'job-{job.id}-heartbeat', daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stopped.set()
+        self.thread.join()
+
+    def run(self):
+        try:
+            while not self.stopped.wait(settings.JOB_HEARTBEAT_INTERVAL):
+                self.beat()
+        finally:
+            # The thread's own connection
+            connection.close()
+
+    def beat(self):
+        try:
+            Job.objects.filter(id=self.job_id, status=Job.RUNNING).update(heartbeat_at=timezone.now())
+        except DatabaseError:
+            # e.g. SQLite busy while the job holds the write lock; the next beat retries
+            pass
+
+
+def requeue_stale_jobs(lease=None):
+    """
+    Return running jobs without a heartbeat for JOB_LEASE seconds to pending; returns how many.
+
+    Their worker died. They are retried at once while attempts remain, and failed
+    otherwise or when an identical job is already pending.
+    """
+    lease = settings.JOB_LEASE if lease is None else lease
+    now = timezone.now()
+    cutoff = now - timedelta(seconds=lease)
+    error = f'No heartbeat for {lease}s; presumed lost with its worker'
+    requeued = 0
+    # Jobs claimed before heartbeats were recorded have none
+    expired = Q(heartbeat_at__lt=cutoff) | Q(heartbeat_at__isnull=True, started_at__lt=cutoff)
+    for job in Job.objects.filter(expired, status=Job.RUNNING):
+        # Conditional on still running without a newer beat, in case the worker is back
+        stale = Job.objects.filter(id=job.id, status=Job.RUNNING, heartbeat_at=job.heartbeat_at)
+        if job.attempts < job.max_attempts:
+            try:
+                with transaction.atomic():
+                    requeued += stale.update(status=Job.PENDING, run_at=now, last_error=error)
+                continue
+            except IntegrityError:
+                pass
+        stale.update(status=Job.FAILED, finished_at=now, last_error=error)
+    return requeued
+
+
+def run_job(job):
+    """Run a claimed job; failures are retried with exponential backoff until max_attempts."""
+    func = registry.get(job.name)
+    try:
+        if func is None:
+            raise LookupError(f'Unknown job: {job.name}')
+        with Heartbeat(job):
+            func(**job.kwargs)
+    except Exception:
+        job.last_error = traceback.format_exc()
+        job.finished_at = timezone.now()
+        if func is not None and job.attempts < job.max_attempts:
+            job.status = Job.PENDING
+            job.run_at = job.finished_at + timedelta(seconds=settings.JOB_RETRY_DELAY * 2 ** (job.attempts - 1))
+            try:
+                with transaction.atomic():
+                    job.save(update_fields=['status', 'run_at', 'finished_at', 'last_error'])
+                return False
+            except IntegrityError:
+                # An identical job was enqueued meanwhile and will do the work
+                pass
+        job.status = Job.FAILED
+        job.save(update_fields=['status', 'finished_at', 'last_error'])
+        return False
+
+    job.status = Job.DONE
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'finished_at'])
+    return True
+
+
+def run_jobs(batch_size=10):
+    """Claim and run one batch of due jobs, after requeueing stale ones; returns (jobs run, jobs succeeded)."""
+    requeue_stale_jobs()
+    jobs = claim_jobs(batch_size)
+    return len(jobs), sum(run_job(job) for job in jobs)
+
+
+def prune_jobs(days=None):
+    """Delete finished jobs older than JOB_RETENTION_DAYS; returns the number deleted."""
+    cutoff = timezone.now() - timedelta(days=settings.JOB_RETENTION_DAYS if days is None else days)
+    deleted, _ = Job.objects.filter(status__in=[Job.DONE, Job.FAILED], finished_at__lt=cutoff).delete()
+    return deleted
+
+
+@job('build_keyword_index')
+def build_keyword_index_job():
+    build_keyword_index()
+
+
+@job('refresh_similar_movies')
+def refresh_similar_movies_job(movie_ids=None, after_id=None):
+    # after_id: also every movie inserted after that id (import_data's marker for new movies)
+    if after_id is not None:
+        movie_ids = list(movie_ids or ()) + list(Movie.objects.filter(id__gt=after_id).values_list('id', flat=True))
+    # The neighbors are scored against the index, so it must include the new movies
+    build_keyword_index()
+    refresh_similar_movies(movie_ids=movie_ids)
+
+
+@job('build_item_cf')
+def build_item_cf_job():
+    build_item_cf()
+
+
+@job('train_als')
+def train_als_job():
+    train_als()
+
+
+@job('mine_association_rules')
+def mine_association_rules_job():
+    mine_association_rules()
+
+
+@job('build_charts')
+def build_charts_job():
+    save_charts()
+
+
+@job('rebuild_rating_stats')
+def rebuild_rating_stats_job():
+    rebuild_rating_stats()
+
+
+@job('rebuild_genre_profiles')
+def rebuild_genre_profiles_job(user_ids=None, movie_ids=None):
+    # movie_ids: rebuild the users who watched movies whose genres changed
+    if movie_ids is not None:
+        user_ids = WatchedList.objects.filter(movie_id__in=movie_ids).values('user_id')
+    rebuild_genre_profiles(user_ids)
+
+
+@job('build_catalog_snapshot')
+def build_catalog_snapshot_job():
+    build_catalog_snapshot()
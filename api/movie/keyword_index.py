@@ -0,0 +1,118 @@
+import numpy as np
+from scipy.sparse import csr_matrix
+from sklearn.feature_extraction.text import TfidfTransformer
+
+from .artifacts import load_arrays, save_arrays
+from .neighbors import index_matrix
+from .snapshot import keyword_links
+
+INDEX_NAME = 'keyword_index'
+
+# (manifest, KeywordIndex) for the most recently loaded build
+_current = None
+
+
+class KeywordIndex:
+    """L2-normalised TF-IDF vectors over keyword ids, one row per movie, ordered by movie id."""
+
+    def __init__(self, matrix, movie_ids, terms, idf=None):
+        self.matrix = matrix
+        self.movie_ids = movie_ids
+        self.terms = terms
+        # Inverse document frequency per term; builds predating it weigh every term alike
+        self.idf = idf
+
+    def row_for(self, movie_id):
+        row = int(np.searchsorted(self.movie_ids, movie_id))
+        if row < len(self.movie_ids) and self.movie_ids[row] == movie_id:
+            return row
+        return None
+
+    def scores_for_rows(self, rows):
+        # Rows are unit length, so the sparse product is the cosine similarity
+        return (self.matrix[rows] @ self.matrix.T).toarray()
+
+    def vector_for(self, keyword_ids):
+        """TF-IDF row of a movie the index has not seen, from its keyword ids."""
+        terms = np.asarray(self.terms, dtype=np.int64)
+        keyword_ids = np.asarray(keyword_ids, dtype=np.int64)
+        # Keywords first linked after the build have no column
+        columns = np.searchsorted(terms, np.unique(keyword_ids[np.isin(keyword_ids, terms)]))
+        if self.idf is None:
+            weights = np.ones(len(columns), dtype=np.float32)
+        else:
+            weights = np.asarray(self.idf[columns], dtype=np.float32)
+        norm = np.linalg.norm(weights)
+        if norm:
+            weights /= norm
+        return csr_matrix((weights, columns, [0, len(columns)]), shape=(1, len(terms)))
+
+    def similar(self, movie_id, limit=10):
+        """Return [(movie_id, score), ...] for the movies closest to movie_id, or None if it is not indexed."""
+        row = self.row_for(movie_id)
+        if row is None:
+            return None
+        scores = self.scores_for_rows([row])[0]
+        scores[row] = 0
+        return self._top(scores, limit)
+
+    def similar_to_keywords(self, keyword_ids, limit=10):
+        """Return [(movie_id, score), ...] for the movies closest to a movie with these keywords."""
+        scores = (self.vector_for(keyword_ids) @ self.matrix.T).toarray()[0]
+        return self._top(scores, limit)
+
+    def _top(self, scores, limit):
+        # Movies sharing no keyword score 0 and are not neighbors, as in the stored table
+        candidates = np.flatnonzero(scores > 0)
+        if len(candidates) > limit:
+            candidates = candidates[np.argpartition(-scores[candidates], limit - 1)[:limit]]
+        top = candidates[np.argsort(-scores[candidates], kind='stable')]
+        return [(int(self.movie_ids[i]), float(scores[i])) for i in top]
+
+
+def build_keyword_index(snapshot=None):
+    """Build the index from the database, or from a CatalogSnapshot when one is given."""
+    # Keyword ids come from the normalized MovieKeyword links, so nothing is re-tokenized
+    movie_ids, link_movies, link_keywords = keyword_links(snapshot)
+    # Skip links of movies created after the id snapshot
+    known = np.isin(link_movies, movie_ids)
+    link_movies, link_keywords = link_movies[known], link_keywords[known]
+
+    keyword_ids, columns = np.unique(link_keywords, return_inverse=True)
+    rows = np.searchsorted(movie_ids, link_movies)
+    counts = csr_matrix(
+        (np.ones(len(rows), dtype=np.float32), (rows, columns)),
+        shape=(len(movie_ids), len(keyword_ids)),
+    )
+    # TfidfTransformer rejects a matrix without columns (no keywords linked yet)
+    if counts.shape[1]:
+        transformer = TfidfTransformer()
+        matrix = transformer.fit_transform(counts)
+        idf = transformer.idf_
+    else:
+        matrix, idf = counts, np.zeros(0)
+    matrix = matrix.astype(np.float32).tocsr()
+    matrix.sort_indices()
+
+    save_arrays(INDEX_NAME, {
+        'data': matrix.data.astype(np.float32),
+        'indices': matrix.indices.astype(np.int32),
+        'indptr': matrix.indptr.astype(np.int64),
+        'movie_ids': np.asarray(movie_ids, dtype=np.int64),
+        'idf': idf.astype(np.float32),
+    }, meta={'terms': keyword_ids.tolist()})
+    return matrix.shape
+
+
+def load_keyword_index():
+    """Return the memory-mapped KeywordIndex, or None if build_keyword_index has not run."""
+    global _current
+    arrays, manifest = load_arrays(INDEX_NAME)
+    if arrays is None:
+        return None
+    if _current and _current[0] is manifest:
+        return _current[1]
+
+    index = KeywordIndex(index_matrix(arrays, manifest), arrays['movie_ids'], manifest['meta']['terms'], arrays.get('idf'))
+    _current = (manifest, index)
+    return _current[1]
@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from movie.models import Movie
+from movie.terms import link_movie_terms
+
+
+class Command(BaseCommand):
+    help = 'Populate the Person, Company and Keyword links from the dash-joined movie columns'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000, help='Movies processed per transaction')
+
+    def handle(self, *args, **kwargs):
+        batch_size = kwargs['batch_size']
+        started = time.monotonic()
+        last_id = 0
+        processed = 0
+
+        while True:
+            batch = list(
+                Movie.objects
+                .filter(id__gt=last_id)
+                .order_by('id')
+                .only('id', 'credit', 'production_companies', 'keywords')[:batch_size]
+            )
+            if not batch:
+                break
+            link_movie_terms(batch, replace=True)
+            last_id = batch[-1].id
+            processed += len(batch)
+            self.stdout.write(f'Linked {processed} movies')
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(f'Backfilled terms for {processed} movies in {elapsed:.1f}s'))
@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from movie.importer import MovieWriter
+from movie.parsing import parsed_chunks
+from movie.search import deferred_search_index
+
+
+class Command(BaseCommand):
+    help = 'Measure import_data throughput by parser worker count; the writes are rolled back, so run it on a catalog without the file\'s movies'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--file', required=True, help='Path of the TMDB CSV export')
+        parser.add_argument('--workers', default='1,2,4', help='Comma-separated worker counts to compare')
+        parser.add_argument('--chunk-size', type=int, default=5000, help='Rows read, parsed and inserted at a time')
+        parser.add_argument('--parse-only', action='store_true', help='Only read and parse, without writing')
+
+    def handle(self, *args, **kwargs):
+        for workers in [int(value) for value in kwargs['workers'].split(',')]:
+            started = time.monotonic()
+            rows = self.run(kwargs['file'], kwargs['chunk_size'], workers, kwargs['parse_only'])
+            elapsed = time.monotonic() - started
+            self.stdout.write(f'workers={workers}: {rows} rows in {elapsed:.1f}s ({rows / elapsed:.0f} rows/s)')
+
+    def run(self, path, chunk_size, workers, parse_only):
+        processed = 0
+        with transaction.atomic():
+            writer = MovieWriter()
+            with deferred_search_index() as indexed:
+                for rows, parsed in parsed_chunks(path, chunk_size, workers):
+                    if not parse_only:
+                        indexed.update(writer.write(parsed))
+                    processed += rows
+            # Leave the catalog as it was
+            transaction.set_rollback(True)
+        return processed
@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from movie.item_cf import build_item_cf
+from movie.snapshot import load_catalog_snapshot
+
+
+class Command(BaseCommand):
+    help = 'Build the item-item collaborative filtering neighborhoods from the ratings'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top-k', type=int, default=50, help='Neighbors kept per movie')
+        parser.add_argument('--block-size', type=int, default=256, help='Movies scored per sparse matrix product')
+        parser.add_argument('--snapshot', action='store_true', help='Read from the catalog snapshot (build_catalog_snapshot) instead of the database')
+
+    def handle(self, *args, **kwargs):
+        snapshot = None
+        if kwargs['snapshot']:
+            snapshot = load_catalog_snapshot()
+            if snapshot is None:
+                raise CommandError('No catalog snapshot; run build_catalog_snapshot first')
+            if not snapshot.is_current():
+                self.stdout.write(self.style.WARNING('The catalog snapshot is older than the latest catalog or rating change'))
+
+        started = time.monotonic()
+        movies, ratings = build_item_cf(top_k=kwargs['top_k'], block_size=kwargs['block_size'], snapshot=snapshot)
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(f'Built neighborhoods for {movies} movies from {ratings} ratings in {elapsed:.1f}s'))
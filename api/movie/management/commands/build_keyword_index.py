@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from movie.keyword_index import build_keyword_index
+from movie.snapshot import load_catalog_snapshot
+
+
+class Command(BaseCommand):
+    help = 'Build the TF-IDF keyword index used by the similarity recommendations'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--snapshot', action='store_true', help='Read from the catalog snapshot (build_catalog_snapshot) instead of the database')
+
+    def handle(self, *args, **kwargs):
+        snapshot = None
+        if kwargs['snapshot']:
+            snapshot = load_catalog_snapshot()
+            if snapshot is None:
+                raise CommandError('No catalog snapshot; run build_catalog_snapshot first')
+            if not snapshot.is_current():
+                self.stdout.write(self.style.WARNING('The catalog snapshot is older than the latest catalog or rating change'))
+
+        started = time.monotonic()
+        movies, terms = build_keyword_index(snapshot=snapshot)
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(f'Indexed {movies} movies over {terms} keywords in {elapsed:.1f}s'))
@@ -0,0 +1,35 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand
+
+from movie.keyword_index import build_keyword_index
+from movie.similar_movies import DEFAULT_TOP_K, refresh_similar_movies
+
+
+class Command(BaseCommand):
+    help = 'Precompute the top-K similar movies table from the keyword index'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--movies', type=int, nargs='+', help='Only refresh rows affected by these (new or edited) movie ids')
+        parser.add_argument('--top-k', type=int, default=DEFAULT_TOP_K, help='Number of neighbors stored per movie')
+        parser.add_argument('--block-size', type=int, default=256, help='Rows scored per sparse matrix product')
+        parser.add_argument('--workers', type=int, default=os.cpu_count(), help='Size of the process pool')
+        parser.add_argument('--skip-index', action='store_true', help='Reuse the existing keyword index instead of rebuilding it')
+
+    def handle(self, *args, **kwargs):
+        started = time.monotonic()
+
+        if not kwargs['skip_index']:
+            movies, terms = build_keyword_index()
+            self.stdout.write(f'Rebuilt keyword index: {movies} movies, {terms} keywords')
+
+        written = refresh_similar_movies(
+            movie_ids=kwargs['movies'],
+            top_k=kwargs['top_k'],
+            block_size=kwargs['block_size'],
+            workers=kwargs['workers'],
+        )
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(f'Refreshed similar movies for {written} movies in {elapsed:.1f}s'))
@@ -1,18 +1,76 @@
-from django.core.management.base import BaseCommand
-from django.db import models
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+from movie.deletion import delete_movie_batch
 from movie.models import Movie, Genre
 
+# --filter shorthands; anything else is read as field=value
+FILTERS = {
+    'missing-poster': Q(poster_url__isnull=True) | Q(poster_url=''),
+    'missing-release-date': Q(release_date__isnull=True),
+}
+
 class Command(BaseCommand):
-    help = 'Delete all movies from the database and clean up genres with no associated movies'
+    help = 'Delete movies (all of them by default) in id batches and clean up genres with no associated movies'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--filter', action='append', default=[],
+            help="Only delete matching movies: 'missing-poster', 'missing-release-date' or field=value (e.g. status=Rumored); repeat to combine",
+        )
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Movies deleted per transaction')
 
     def handle(self, *args, **kwargs):
-        # Delete all movies and capture the count
-        movie_count, _ = Movie.objects.all().delete()
-        
+        movies = Movie.objects.filter(self.build_filter(kwargs['filter']))
+        started = time.monotonic()
+        movie_count = 0
+        last_id = 0
+
+        # Each batch commits on its own, so an interrupted run keeps what it already deleted
+        while True:
+            batch_started = time.monotonic()
+            movie_ids = list(movies.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:kwargs['chunk_size']])
+            if not movie_ids:
+                break
+            counts = delete_movie_batch(movie_ids)
+            last_id = movie_ids[-1]
+            movie_count += len(movie_ids)
+            dependents = sum(counts.values()) - len(movie_ids)
+            self.stdout.write(
+                f'Deleted {len(movie_ids)} movies and {dependents} dependent rows '
+                f'in {time.monotonic() - batch_started:.2f}s ({movie_count} so far)'
+            )
+
         # Find and delete genres that have no associated movies
-        genres_to_delete = Genre.objects.annotate(num_movies=models.Count('movies')).filter(num_movies=0)
+        genres_to_delete = Genre.objects.filter(movie__isnull=True)
         genre_count = genres_to_delete.count()
         genres_to_delete.delete()
         
-        self.stdout.write(self.style.SUCCESS(f'Successfully deleted {movie_count} movies'))
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(f'Successfully deleted {movie_count} movies in {elapsed:.1f}s'))
         self.stdout.write(self.style.SUCCESS(f'Successfully deleted {genre_count} genres with no associated movies'))
+
+    def build_filter(self, filters):
+        query = Q()
+        for movie_filter in filters:
+            if movie_filter in FILTERS:
+                query &= FILTERS[movie_filter]
+                continue
+            name, sep, value = movie_filter.partition('=')
+            try:
+                field = Movie._meta.get_field(name)
+            except FieldDoesNotExist:
+                sep = ''
+            if not sep:
+                raise CommandError(f'Unknown filter: {movie_filter}')
+            # Relations (genres=Drama) would need a lookup on the related model's fields
+            if field.is_relation or not field.concrete:
+                raise CommandError(f'Cannot filter on {name}: only plain movie columns are supported')
+            try:
+                field.to_python(value)
+            except ValidationError:
+                raise CommandError(f'Invalid value for {name}: {value}')
+            query &= Q(**{name: value})
+        return query
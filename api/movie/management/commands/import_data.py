@@ -1,105 +1,64 @@
+import time
+
 from django.core.management.base import BaseCommand
 from django.db import transaction
-import pandas as pd
-from movie.models import Movie, Genre
-from datetime import datetime
+from django.db.models import Max
+from movie.catalog_cache import bump_catalog
+from movie.importer import MovieWriter
+from movie.jobs import enqueue
+from movie.models import Movie
+from movie.parsing import parsed_chunks
+from movie.keyword_index import build_keyword_index
+from movie.search import deferred_search_index
+from movie.similar_movies import refresh_similar_movies
 
 class Command(BaseCommand):
     help = 'Import data from CSV file'
 
-    def handle(self, *args, **kwargs):
-        # Read the CSV file into a DataFrame
-        file_path = r'C:\Users\lucas\Downloads\filtered_file.csv'
-        df = pd.read_csv(file_path)
+    def add_arguments(self, parser):
+        parser.add_argument('--file', required=True, help='Path of the TMDB CSV export')
+        parser.add_argument('--chunk-size', type=int, default=5000, help='Rows read, parsed and inserted at a time')
+        parser.add_argument('--workers', type=int, default=1, help='Processes parsing chunks while this one writes them')
+        parser.add_argument('--upsert', action='store_true', help='Match rows on their source id: update changed movies, insert new ones')
+        parser.add_argument('--refresh-similar', action='store_true', help='Refresh the similar movies rows affected by the imported movies now instead of in a background job')
 
-        batch_size = 5000  # You can adjust the batch size based on your requirements
-        movies_to_create = []
-        genres_to_add = {}
+    def handle(self, *args, **kwargs):
+        writer = MovieWriter()
+        write = writer.upsert if kwargs['upsert'] else writer.write
+        started = time.monotonic()
+        processed = 0
 
         try:
+            # All or nothing: a failing chunk rolls back the whole import
             with transaction.atomic():
-                for index, row in df.iterrows():
-                    title = row['title']
-                    description = row['overview']
-
-                    try:
-                        release_date = datetime.strptime(row['release_date'], '%Y-%m-%d').date()
-                    except (ValueError, TypeError):
-                        release_date = None  # Handle invalid or missing date
-
-                    poster_url = row['poster_path']
-                    original_language = row['original_language']
-                    production_companies = row['production_companies']
-                    
-                    try:
-                        runtime = int(row['runtime'])
-                    
-                    except (ValueError, TypeError):
-                        runtime = 1
-
-                    status = row['status']
-                    tagline = row['tagline']
-                    credit = row['credits']
-                    keywords = row['keywords']
-                    backdrop_path = row['backdrop_path']
-
-                    movie = Movie(
-                        title=title,
-                        description=description,
-                        release_date=release_date,
-                        poster_url=poster_url,
-                        original_language=original_language,
-                        runtime=runtime,
-                        status=status,
-                        tagline=tagline,
-                        backdrop_path=backdrop_path,
-                        production_companies=production_companies,
-                        credit = credit,
-                        keywords = keywords
-                    )
-
-
-                    movies_to_create.append(movie)
-
-                    genres = row['genres']
-                    if isinstance(genres, str):
-                        genres = genres.split('-')
-                        for genre_name in genres:
-                            genre_name = genre_name.strip()
-                            if genre_name not in genres_to_add:
-                                genres_to_add[genre_name] = []
-                            genres_to_add[genre_name].append(movie)
-
-                    # Batch insert movies
-                    if len(movies_to_create) >= batch_size:
-                        self._bulk_create_movies(movies_to_create, genres_to_add)
-                        movies_to_create = []
-                        genres_to_add = {}
-
-                # Insert any remaining movies
-                if movies_to_create:
-                    self._bulk_create_movies(movies_to_create, genres_to_add)
-
+                # New movies get ids above this one, so the similar movies job can find them by range
+                last_id = Movie.objects.aggregate(last_id=Max('id'))['last_id'] or 0
+                # The search index is written once at the end instead of by a trigger per row
+                with deferred_search_index() as indexed:
+                    for rows, parsed in parsed_chunks(kwargs['file'], kwargs['chunk_size'], kwargs['workers']):
+                        indexed.update(write(parsed))
+                        processed += rows
+                        elapsed = time.monotonic() - started
+                        self.stdout.write(f'Processed {processed} rows ({processed / elapsed:.0f} rows/s)')
+
+                if writer.movie_ids:
+                    bump_catalog()
+                    if not kwargs['refresh_similar']:
+                        # Leave the similar movies to the runworker command
+                        enqueue('refresh_similar_movies', after_id=last_id, movie_ids=writer.changed_ids)
                 self.stdout.write(self.style.SUCCESS('Data imported successfully'))
 
         except Exception as e:
             self.stdout.write(self.style.ERROR(f'An error occurred: {str(e)}'))
-            # Rollback the transaction
-            transaction.set_rollback(True)
-
-    def _bulk_create_movies(self, movies_to_create, genres_to_add):
-        # Bulk create movies
-        created_movies = Movie.objects.bulk_create(movies_to_create)
-        
-        # Create genre associations in bulk
-        movie_genre_relations = []
-        for movie in created_movies:
-            for genre_name, movies in genres_to_add.items():
-                if movie in movies:
-                    genre, _ = Genre.objects.get_or_create(name=genre_name)
-                    movie_genre_relations.append(Movie.genres.through(movie_id=movie.id, genre_id=genre.id))
-
-        # Bulk create movie-genre relations
-        Movie.genres.through.objects.bulk_create(movie_genre_relations)
-
-        self.stdout.write(self.style.SUCCESS('Batch imported successfully'))
+            return
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Processed {processed} rows in {elapsed:.1f}s: {writer.inserted} movies inserted, {writer.updated} updated, '
+            f'{writer.skipped} skipped as already imported'
+        ))
+
+        if kwargs['refresh_similar'] and writer.movie_ids:
+            build_keyword_index()
+            refreshed = refresh_similar_movies(movie_ids=writer.movie_ids)
+            self.stdout.write(self.style.SUCCESS(f'Refreshed similar movies for {refreshed} movies'))
@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from movie.association_rules import mine_association_rules
+from movie.snapshot import load_catalog_snapshot
+
+
+class Command(BaseCommand):
+    help = 'Mine association rules from the watched lists (run on a schedule, e.g. nightly cron)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--min-support', type=float, default=0.1, help='Minimum fraction of users who watched both movies')
+        parser.add_argument('--min-confidence', type=float, default=0.1, help='Minimum confidence of a stored rule')
+        parser.add_argument('--min-lift', type=float, default=1.0, help='Minimum lift of a stored rule')
+        parser.add_argument('--chunk-size', type=int, default=10000, help='Users counted per chunk; bounds peak memory')
+        parser.add_argument('--snapshot', action='store_true', help='Read from the catalog snapshot (build_catalog_snapshot) instead of the database')
+
+    def handle(self, *args, **kwargs):
+        snapshot = None
+        if kwargs['snapshot']:
+            snapshot = load_catalog_snapshot()
+            if snapshot is None:
+                raise CommandError('No catalog snapshot; run build_catalog_snapshot first')
+            if not snapshot.is_current():
+                self.stdout.write(self.style.WARNING('The catalog snapshot is older than the latest catalog or rating change'))
+
+        started = time.monotonic()
+        rule_set, rule_count = mine_association_rules(
+            min_support=kwargs['min_support'],
+            min_confidence=kwargs['min_confidence'],
+            min_lift=kwargs['min_lift'],
+            chunk_size=kwargs['chunk_size'],
+            snapshot=snapshot,
+        )
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Rule set {rule_set.pk}: {rule_count} rules from {rule_set.transactions} users in {elapsed:.1f}s'
+        ))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from movie.genre_profiles import rebuild_genre_profiles
+
+
+class Command(BaseCommand):
+    help = 'Recompute every user genre profile from the watched lists'
+
+    def handle(self, *args, **kwargs):
+        rows = rebuild_genre_profiles()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {rows} user genre weights'))
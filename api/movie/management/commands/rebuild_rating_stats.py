@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from movie.rating_stats import rebuild_rating_stats
+
+
+class Command(BaseCommand):
+    help = 'Recompute the per-movie rating aggregates from the Rating table'
+
+    def handle(self, *args, **kwargs):
+        movies = rebuild_rating_stats()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt rating aggregates for {movies} movies'))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from movie.search import rebuild_search_index, search_available
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index over the movie catalog'
+
+    def handle(self, *args, **kwargs):
+        if not search_available():
+            self.stdout.write(self.style.ERROR('Full-text search requires SQLite FTS5'))
+            return
+
+        with transaction.atomic():
+            movies = rebuild_search_index()
+        self.stdout.write(self.style.SUCCESS(f'Indexed {movies} movies'))
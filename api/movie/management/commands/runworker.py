@@ -0,0 +1,39 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from movie.jobs import prune_jobs, run_jobs
+
+
+class Command(BaseCommand):
+    help = 'Run background jobs (model rebuilds, ...) from the job table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=10, help='Jobs claimed per poll')
+        parser.add_argument('--poll-interval', type=float, default=5.0, help='Seconds to sleep when no job is due')
+        parser.add_argument('--once', action='store_true', help='Run the jobs that are due, then exit')
+
+    def handle(self, *args, **kwargs):
+        total = succeeded = 0
+        last_pruned = None
+        while True:
+            close_old_connections()
+            started = time.monotonic()
+            # On a timer rather than when idle, so the table stays bounded under steady load
+            if last_pruned is None or started - last_pruned >= settings.JOB_PRUNE_INTERVAL:
+                prune_jobs()
+                last_pruned = started
+            ran, ok = run_jobs(kwargs['batch_size'])
+            if ran:
+                total += ran
+                succeeded += ok
+                elapsed = time.monotonic() - started
+                self.stdout.write(f'Ran {ran} jobs ({ok} succeeded) in {elapsed:.1f}s')
+                continue
+
+            if kwargs['once']:
+                break
+            time.sleep(kwargs['poll_interval'])
+
+        self.stdout.write(self.style.SUCCESS(f'Ran {total} jobs, {succeeded} succeeded'))
@@ -0,0 +1,43 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from movie.als import train_als
+from movie.snapshot import load_catalog_snapshot
+
+
+class Command(BaseCommand):
+    help = 'Train the implicit-feedback ALS model from ratings and watched lists'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--factors', type=int, default=32, help='Latent factors per user and movie')
+        parser.add_argument('--iterations', type=int, default=10, help='Alternating least squares sweeps')
+        parser.add_argument('--regularization', type=float, default=0.1, help='L2 regularization weight')
+        parser.add_argument('--alpha', type=float, default=10.0, help='Confidence scaling of the interactions')
+        parser.add_argument('--workers', type=int, default=os.cpu_count(), help='Threads solving user/movie blocks')
+        parser.add_argument('--snapshot', action='store_true', help='Read from the catalog snapshot (build_catalog_snapshot) instead of the database')
+
+    def handle(self, *args, **kwargs):
+        snapshot = None
+        if kwargs['snapshot']:
+            snapshot = load_catalog_snapshot()
+            if snapshot is None:
+                raise CommandError('No catalog snapshot; run build_catalog_snapshot first')
+            if not snapshot.is_current():
+                self.stdout.write(self.style.WARNING('The catalog snapshot is older than the latest catalog or rating change'))
+
+        started = time.monotonic()
+        users, movies, interactions = train_als(
+            factors=kwargs['factors'],
+            regularization=kwargs['regularization'],
+            alpha=kwargs['alpha'],
+            iterations=kwargs['iterations'],
+            workers=kwargs['workers'],
+            snapshot=snapshot,
+        )
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Trained factors for {users} users and {movies} movies from {interactions} interactions in {elapsed:.1f}s'
+        ))
@@ -0,0 +1,28 @@
+# Generated by Django 5.0.4 on 2026-10-18 20:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movie', '0010_favoritemovie_favoritemovie_unique_user_movie'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SimilarMovie',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField()),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('movie', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='similar_movies', to='movie.movie')),
+                ('similar', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='movie.movie')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='similarmovie',
+            constraint=models.UniqueConstraint(fields=('movie', 'rank'), name='unique_similar_movie_rank'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.0.4 on 2026-10-18 20:09
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movie', '0011_similarmovie_similarmovie_unique_similar_movie_rank'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RuleSet',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('built_at', models.DateTimeField(auto_now_add=True)),
+                ('transactions', models.PositiveIntegerField(default=0)),
+                ('min_support', models.FloatField()),
+                ('min_confidence', models.FloatField()),
+                ('is_active', models.BooleanField(db_index=True, default=False)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='AssociationRule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('support', models.FloatField()),
+                ('confidence', models.FloatField()),
+                ('lift', models.FloatField()),
+                ('antecedent', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='movie.movie')),
+                ('consequent', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='movie.movie')),
+                ('rule_set', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rules', to='movie.ruleset')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['rule_set', 'antecedent', '-confidence'], name='rule_antecedent_idx')],
+            },
+        ),
+    ]
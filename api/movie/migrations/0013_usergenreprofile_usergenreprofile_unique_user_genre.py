@@ -0,0 +1,46 @@
+# Generated by Django 5.0.4 on 2026-10-18 20:12
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def fill_genre_profiles(apps, schema_editor):
+    # The profiles are kept up to date incrementally from here on, so count what exists
+    WatchedList = apps.get_model('movie', 'WatchedList')
+    UserGenreProfile = apps.get_model('movie', 'UserGenreProfile')
+    counts = (
+        WatchedList.objects
+        .filter(movie__genres__isnull=False)
+        .values('user_id', 'movie__genres')
+        .annotate(weight=Count('id'))
+    )
+    UserGenreProfile.objects.bulk_create([
+        UserGenreProfile(user_id=row['user_id'], genre_id=row['movie__genres'], weight=row['weight'])
+        for row in counts.iterator(chunk_size=10000)
+    ], batch_size=5000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movie', '0012_ruleset_associationrule'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserGenreProfile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('weight', models.PositiveIntegerField(default=0)),
+                ('genre', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='movie.genre')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='genre_profile', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='usergenreprofile',
+            constraint=models.UniqueConstraint(fields=('user', 'genre'), name='unique_user_genre'),
+        ),
+        migrations.RunPython(fill_genre_profiles, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.0.4 on 2026-10-18 20:13
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def fill_rating_stats(apps, schema_editor):
+    # Ratings are folded in incrementally from here on, so start from what exists;
+    # the scores are computed as in movie.rating_stats
+    Rating = apps.get_model('movie', 'Rating')
+    MovieRatingStats = apps.get_model('movie', 'MovieRatingStats')
+    totals = (
+        Rating.objects
+        .filter(rating__isnull=False)
+        .values('movie_id')
+        .annotate(rating_sum=Sum('rating'), rating_count=Count('id'))
+    )
+    prior_weight, prior_mean = settings.RATING_PRIOR_WEIGHT, settings.RATING_PRIOR_MEAN
+    MovieRatingStats.objects.bulk_create([
+        MovieRatingStats(
+            movie_id=row['movie_id'],
+            rating_sum=row['rating_sum'],
+            rating_count=row['rating_count'],
+            rating_avg=row['rating_sum'] / row['rating_count'],
+            bayesian_score=(prior_weight * prior_mean + row['rating_sum']) / (prior_weight + row['rating_count']),
+        )
+        for row in totals.iterator(chunk_size=10000)
+    ], batch_size=5000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movie', '0013_usergenreprofile_usergenreprofile_unique_user_genre'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MovieRatingStats',
+            fields=[
+                ('movie', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='rating_stats', serialize=False, to='movie.movie')),
+                ('rating_sum', models.FloatField(default=0)),
+                ('rating_count', models.PositiveIntegerField(default=0)),
+                ('rating_avg', models.FloatField(db_index=True, null=True)),
+                ('bayesian_score', models.FloatField(db_index=True, null=True)),
+            ],
+        ),
+        migrations.RunPython(fill_rating_stats, migrations.RunPython.noop),
+    ]
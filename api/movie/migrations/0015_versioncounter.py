@@ -0,0 +1,20 @@
+# Generated by Django 5.0.4 on 2026-10-18 20:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movie', '0014_movieratingstats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VersionCounter',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('value', models.PositiveBigIntegerField(default=0)),
+            ],
+        ),
+    ]
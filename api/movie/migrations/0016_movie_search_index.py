@@ -0,0 +1,97 @@
+from django.db import migrations
+
+# Column weights for bm25() live in movie/search.py and follow this column order
+CREATE_SEARCH_INDEX = [
+    """
+    CREATE VIRTUAL TABLE movie_movie_fts USING fts5(
+        title, description, production_companies, credit, genres,
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER movie_movie_fts_insert AFTER INSERT ON movie_movie BEGIN
+        INSERT INTO movie_movie_fts (rowid, title, description, production_companies, credit, genres)
+        VALUES (
+            new.id, new.title, new.description, new.production_companies, new.credit,
+            (SELECT group_concat(g.name, ' ') FROM movie_movie_genres mg JOIN movie_genre g ON g.id = mg.genre_id WHERE mg.movie_id = new.id)
+        );
+    END
+    """,
+    """
+    CREATE TRIGGER movie_movie_fts_update AFTER UPDATE OF title, description, production_companies, credit ON movie_movie BEGIN
+        UPDATE movie_movie_fts
+        SET title = new.title, description = new.description,
+            production_companies = new.production_companies, credit = new.credit
+        WHERE rowid = new.id;
+    END
+    """,
+    """
+    CREATE TRIGGER movie_movie_fts_delete AFTER DELETE ON movie_movie BEGIN
+        DELETE FROM movie_movie_fts WHERE rowid = old.id;
+    END
+    """,
+    """
+    CREATE TRIGGER movie_movie_genres_fts_insert AFTER INSERT ON movie_movie_genres BEGIN
+        UPDATE movie_movie_fts
+        SET genres = (SELECT group_concat(g.name, ' ') FROM movie_movie_genres mg JOIN movie_genre g ON g.id = mg.genre_id WHERE mg.movie_id = new.movie_id)
+        WHERE rowid = new.movie_id;
+    END
+    """,
+    """
+    CREATE TRIGGER movie_movie_genres_fts_delete AFTER DELETE ON movie_movie_genres BEGIN
+        UPDATE movie_movie_fts
+        SET genres = (SELECT group_concat(g.name, ' ') FROM movie_movie_genres mg JOIN movie_genre g ON g.id = mg.genre_id WHERE mg.movie_id = old.movie_id)
+        WHERE rowid = old.movie_id;
+    END
+    """,
+    """
+    CREATE TRIGGER movie_genre_fts_update AFTER UPDATE OF name ON movie_genre BEGIN
+        UPDATE movie_movie_fts
+        SET genres = (SELECT group_concat(g.name, ' ') FROM movie_movie_genres mg JOIN movie_genre g ON g.id = mg.genre_id WHERE mg.movie_id = movie_movie_fts.rowid)
+        WHERE rowid IN (SELECT movie_id FROM movie_movie_genres WHERE genre_id = new.id);
+    END
+    """,
+    """
+    INSERT INTO movie_movie_fts (rowid, title, description, production_companies, credit, genres)
+    SELECT m.id, m.title, m.description, m.production_companies, m.credit,
+        (SELECT group_concat(g.name, ' ') FROM movie_movie_genres mg JOIN movie_genre g ON g.id = mg.genre_id WHERE mg.movie_id = m.id)
+    FROM movie_movie m
+    """,
+]
+
+DROP_SEARCH_INDEX = [
+    'DROP TRIGGER IF EXISTS movie_genre_fts_update',
+    'DROP TRIGGER IF EXISTS movie_movie_genres_fts_delete',
+    'DROP TRIGGER IF EXISTS movie_movie_genres_fts_insert',
+    'DROP TRIGGER IF EXISTS movie_movie_fts_delete',
+    'DROP TRIGGER IF EXISTS movie_movie_fts_update',
+    'DROP TRIGGER IF EXISTS movie_movie_fts_insert',
+    'DROP TABLE IF EXISTS movie_movie_fts',
+]
+
+
+def create_search_index(apps, schema_editor):
+    # FTS5 is SQLite only; other databases keep the icontains search
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for statement in CREATE_SEARCH_INDEX:
+        schema_editor.execute(statement)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for statement in DROP_SEARCH_INDEX:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movie', '0015_versioncounter'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
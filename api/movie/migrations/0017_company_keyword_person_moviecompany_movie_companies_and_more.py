@@ -0,0 +1,90 @@
+# Generated by Django 5.0.4 on 2026-10-18 20:16
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movie', '0016_movie_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Company',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Keyword',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Person',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='MovieCompany',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='movie.company')),
+                ('movie', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='movie.movie')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('movie', 'company'), name='unique_movie_company')],
+            },
+        ),
+        migrations.CreateModel(
+            name='MovieKeyword',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('keyword', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='movie.keyword')),
+                ('movie', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='movie.movie')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('movie', 'keyword'), name='unique_movie_keyword')],
+            },
+        ),
+        migrations.CreateModel(
+            name='MovieCredit',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('order', models.PositiveSmallIntegerField(default=0)),
+                ('movie', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='movie.movie')),
+                ('person', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='movie.person')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('movie', 'person'), name='unique_movie_person')],
+            },
+        ),
+        # The through tables already exist; adding the fields to the movie table in the
+        # database would make SQLite rebuild it and drop the search index triggers
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddField(
+                    model_name='movie',
+                    name='companies',
+                    field=models.ManyToManyField(blank=True, related_name='movies', through='movie.MovieCompany', to='movie.company'),
+                ),
+                migrations.AddField(
+                    model_name='movie',
+                    name='keyword_terms',
+                    field=models.ManyToManyField(blank=True, related_name='movies', through='movie.MovieKeyword', to='movie.keyword'),
+                ),
+                migrations.AddField(
+                    model_name='movie',
+                    name='people',
+                    field=models.ManyToManyField(blank=True, related_name='movies', through='movie.MovieCredit', to='movie.person'),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.0.4 on 2026-10-18 21:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movie', '0020_job_job_unique_pending_job'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='watchedlist',
+            index=models.Index(fields=['user', 'watched_date'], name='watched_user_date_idx'),
+        ),
+    ]
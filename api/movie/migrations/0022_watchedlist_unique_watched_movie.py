@@ -0,0 +1,49 @@
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def drop_duplicate_entries(apps, schema_editor):
+    # Keep the first entry of each (user, movie), then recount the genre profiles of the
+    # users who had duplicates, as they counted every copy
+    WatchedList = apps.get_model('movie', 'WatchedList')
+    UserGenreProfile = apps.get_model('movie', 'UserGenreProfile')
+    duplicates = (
+        WatchedList.objects
+        .values('user_id', 'movie_id')
+        .annotate(first_id=Min('id'), entries=Count('id'))
+        .filter(entries__gt=1)
+    )
+    user_ids = set()
+    for entry in list(duplicates):
+        WatchedList.objects.filter(user_id=entry['user_id'], movie_id=entry['movie_id']).exclude(id=entry['first_id']).delete()
+        user_ids.add(entry['user_id'])
+    if not user_ids:
+        return
+
+    counts = (
+        WatchedList.objects
+        .filter(user_id__in=user_ids, movie__genres__isnull=False)
+        .values('user_id', 'movie__genres')
+        .annotate(weight=Count('id'))
+    )
+    profiles = [
+        UserGenreProfile(user_id=row['user_id'], genre_id=row['movie__genres'], weight=row['weight'])
+        for row in counts
+    ]
+    UserGenreProfile.objects.filter(user_id__in=user_ids).delete()
+    UserGenreProfile.objects.bulk_create(profiles, batch_size=5000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movie', '0021_watchedlist_watched_user_date_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_duplicate_entries, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='watchedlist',
+            constraint=models.UniqueConstraint(fields=['user', 'movie'], name='unique_watched_movie'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.0.4 on 2026-10-18 21:37
+
+from django.db import migrations, models
+
+
+def fill_normalized_names(apps, schema_editor):
+    # Lower-cased as movie.terms.normalize_name does
+    for model_name in ('Person', 'Company'):
+        model = apps.get_model('movie', model_name)
+        rows = []
+        for row in model.objects.only('id', 'name').iterator(chunk_size=5000):
+            row.normalized_name = row.name.lower()
+            rows.append(row)
+        model.objects.bulk_update(rows, ['normalized_name'], batch_size=5000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movie', '0022_watchedlist_unique_watched_movie'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='company',
+            name='normalized_name',
+            field=models.CharField(db_index=True, default='', max_length=255),
+        ),
+        migrations.AddField(
+            model_name='person',
+            name='normalized_name',
+            field=models.CharField(db_index=True, default='', max_length=255),
+        ),
+        migrations.RunPython(fill_normalized_names, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 5.0.4 on 2026-10-18 21:43
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, F, Max, Sum
+
+
+def drop_duplicate_ratings(apps, schema_editor):
+    # Keep the latest rating of each (user, movie), then recompute the aggregates of the
+    # movies that had duplicates, as they counted every copy
+    Rating = apps.get_model('movie', 'Rating')
+    MovieRatingStats = apps.get_model('movie', 'MovieRatingStats')
+    VersionCounter = apps.get_model('movie', 'VersionCounter')
+    duplicates = (
+        Rating.objects
+        .values('user_id', 'movie_id')
+        .annotate(last_id=Max('id'), entries=Count('id'))
+        .filter(entries__gt=1)
+    )
+    movie_ids = set()
+    for entry in list(duplicates):
+        Rating.objects.filter(user_id=entry['user_id'], movie_id=entry['movie_id']).exclude(id=entry['last_id']).delete()
+        movie_ids.add(entry['movie_id'])
+    if not movie_ids:
+        return
+
+    totals = {
+        row['movie_id']: (row['rating_sum'], row['rating_count'])
+        for row in (
+            Rating.objects
+            .filter(movie_id__in=movie_ids, rating__isnull=False)
+            .values('movie_id')
+            .annotate(rating_sum=Sum('rating'), rating_count=Count('id'))
+        )
+    }
+    # Scores as movie.rating_stats computes them
+    prior_weight, prior_mean = settings.RATING_PRIOR_WEIGHT, settings.RATING_PRIOR_MEAN
+    stats = list(MovieRatingStats.objects.filter(movie_id__in=movie_ids))
+    for movie_stats in stats:
+        rating_sum, rating_count = totals.get(movie_stats.movie_id, (0, 0))
+        movie_stats.rating_sum, movie_stats.rating_count = rating_sum, rating_count
+        movie_stats.rating_avg = rating_sum / rating_count if rating_count else None
+        movie_stats.bayesian_score = (prior_weight * prior_mean + rating_sum) / (prior_weight + rating_count) if rating_count else None
+    MovieRatingStats.objects.bulk_update(stats, ['rating_sum', 'rating_count', 'rating_avg', 'bayesian_score'])
+    VersionCounter.objects.get_or_create(name='ratings')
+    VersionCounter.objects.filter(name='ratings').update(value=F('value') + 1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movie', '0023_person_company_normalized_name'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_duplicate_ratings, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='rating',
+            constraint=models.UniqueConstraint(fields=('user', 'movie'), name='unique_rating'),
+        ),
+    ]
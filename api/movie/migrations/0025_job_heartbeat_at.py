@@ -0,0 +1,18 @@
+# Generated by Django 5.0.4 on 2026-10-18 21:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movie', '0024_rating_unique_rating'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='heartbeat_at',
+            field=models.DateTimeField(null=True),
+        ),
+    ]
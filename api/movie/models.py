@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 from django.contrib.auth.models import AbstractUser, Permission, Group
 
 
@@ -6,6 +7,19 @@ from django.contrib.auth.models import AbstractUser, Permission, Group
 class Genre(models.Model):
     name = models.CharField(max_length=100, unique=True)
 
+class Person(models.Model):
+    name = models.CharField(max_length=255, unique=True)
+    # Lower-cased name, so the case-insensitive ?credit= filter is an index lookup
+    normalized_name = models.CharField(max_length=255, db_index=True, default='')
+
+class Company(models.Model):
+    name = models.CharField(max_length=255, unique=True)
+    # Lower-cased name, for the ?production_companies= filter
+    normalized_name = models.CharField(max_length=255, db_index=True, default='')
+
+class Keyword(models.Model):
+    name = models.CharField(max_length=255, unique=True)
+
 class Movie(models.Model):
     title = models.CharField(max_length=255)
     description = models.TextField()
@@ -21,10 +35,57 @@ class Movie(models.Model):
     keywords = models.TextField(null=True, blank=True)
     backdrop_path = models.URLField(max_length=200, null=True, blank=True)
     youtube_path = models.URLField(max_length=200, null=True, blank=True)
+    # Normalized copies of credit, production_companies and keywords (see movie/terms.py)
+    people = models.ManyToManyField(Person, through='MovieCredit', related_name='movies', blank=True)
+    companies = models.ManyToManyField(Company, through='MovieCompany', related_name='movies', blank=True)
+    keyword_terms = models.ManyToManyField(Keyword, through='MovieKeyword', related_name='movies', blank=True)
+    # Id of the movie in the imported dataset (TMDB id); matches rows on import_data --upsert
+    source_id = models.PositiveBigIntegerField(null=True, blank=True)
+
+    class Meta:
+        # Keyset pagination seeks on (ordering field, id)
+        indexes = [
+            models.Index(fields=['title', 'id'], name='movie_title_id_idx'),
+            models.Index(fields=['release_date', 'id'], name='movie_release_date_id_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['source_id'], condition=models.Q(source_id__isnull=False), name='unique_movie_source_id'
+            )
+        ]
 
     def __str__(self):
         return self.title
 
+class MovieCredit(models.Model):
+    movie = models.ForeignKey(Movie, on_delete=models.CASCADE)
+    person = models.ForeignKey(Person, on_delete=models.CASCADE)
+    # Billing order within the movie's credit text
+    order = models.PositiveSmallIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['movie', 'person'], name='unique_movie_person')
+        ]
+
+class MovieCompany(models.Model):
+    movie = models.ForeignKey(Movie, on_delete=models.CASCADE)
+    company = models.ForeignKey(Company, on_delete=models.CASCADE)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['movie', 'company'], name='unique_movie_company')
+        ]
+
+class MovieKeyword(models.Model):
+    movie = models.ForeignKey(Movie, on_delete=models.CASCADE)
+    keyword = models.ForeignKey(Keyword, on_delete=models.CASCADE)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['movie', 'keyword'], name='unique_movie_keyword')
+        ]
+
 class User(AbstractUser):
     favorite_genres = models.ManyToManyField(Genre, related_name='users', blank=True)
     groups = models.ManyToManyField(Group, related_name='auth_user_groups')
@@ -48,6 +109,14 @@ class WatchedList(models.Model):
     movie = models.ForeignKey(Movie, on_delete=models.CASCADE)
     watched_date = models.DateField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'watched_date'], name='watched_user_date_idx')
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'movie'], name='unique_watched_movie')
+        ]
+
 class Rating(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='ratings')
     movie = models.ForeignKey(Movie, on_delete=models.CASCADE)
@@ -63,4 +132,100 @@ class Rating(models.Model):
         (4.5, '4.5 stars'),
         (5.0, '5 stars'),
     ]
-    rating = models.FloatField(choices=RATINGS_CHOICES, null=True)
\ No newline at end of file
+    rating = models.FloatField(choices=RATINGS_CHOICES, null=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'movie'], name='unique_rating')
+        ]
+
+
+class SimilarMovie(models.Model):
+    movie = models.ForeignKey(Movie, on_delete=models.CASCADE, related_name='similar_movies')
+    similar = models.ForeignKey(Movie, on_delete=models.CASCADE, related_name='+')
+    score = models.FloatField()
+    rank = models.PositiveSmallIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['movie', 'rank'], name='unique_similar_movie_rank')
+        ]
+
+class RuleSet(models.Model):
+    built_at = models.DateTimeField(auto_now_add=True)
+    transactions = models.PositiveIntegerField(default=0)
+    min_support = models.FloatField()
+    min_confidence = models.FloatField()
+    is_active = models.BooleanField(default=False, db_index=True)
+
+class AssociationRule(models.Model):
+    rule_set = models.ForeignKey(RuleSet, on_delete=models.CASCADE, related_name='rules')
+    antecedent = models.ForeignKey(Movie, on_delete=models.CASCADE, related_name='+')
+    consequent = models.ForeignKey(Movie, on_delete=models.CASCADE, related_name='+')
+    support = models.FloatField()
+    confidence = models.FloatField()
+    lift = models.FloatField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['rule_set', 'antecedent', '-confidence'], name='rule_antecedent_idx')
+        ]
+
+class UserGenreProfile(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='genre_profile')
+    genre = models.ForeignKey(Genre, on_delete=models.CASCADE, related_name='+')
+    # Number of movies in the user's watched list tagged with this genre
+    weight = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'genre'], name='unique_user_genre')
+        ]
+
+class MovieRatingStats(models.Model):
+    movie = models.OneToOneField(Movie, on_delete=models.CASCADE, primary_key=True, related_name='rating_stats')
+    rating_sum = models.FloatField(default=0)
+    rating_count = models.PositiveIntegerField(default=0)
+    rating_avg = models.FloatField(null=True, db_index=True)
+    # Average shrunk towards RATING_PRIOR_MEAN, so a single 5-star rating does not top the charts
+    bayesian_score = models.FloatField(null=True, db_index=True)
+
+class VersionCounter(models.Model):
+    # Monotonic counters bumped whenever a family of data changes (e.g. 'ratings')
+    name = models.CharField(max_length=50, primary_key=True)
+    value = models.PositiveBigIntegerField(default=0)
+
+class Job(models.Model):
+    # Background work run by the runworker command (see movie/jobs.py)
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+    name = models.CharField(max_length=100)
+    kwargs = models.JSONField(default=dict)
+    # Hash of name and kwargs; at most one identical job is pending at a time
+    key = models.CharField(max_length=32)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    run_at = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True)
+    # Renewed by the worker while the job runs; a stale one means the worker is gone
+    heartbeat_at = models.DateTimeField(null=True)
+    finished_at = models.DateTimeField(null=True)
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['key'], condition=models.Q(status='pending'), name='unique_pending_job')
+        ]
+        indexes = [
+            models.Index(fields=['status', 'run_at'], name='job_status_run_at_idx')
+        ]
@@ -0,0 +1,62 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+from .artifacts import read_arrays
+
+# Matrix mapped by each pool worker from the on-disk keyword index
+_worker_matrix = None
+
+
+def index_matrix(arrays, manifest):
+    return csr_matrix(
+        (arrays['data'], arrays['indices'], arrays['indptr']),
+        shape=(len(arrays['movie_ids']), len(manifest['meta']['terms'])),
+        copy=False,
+    )
+
+
+def block_neighbors(matrix, rows, k):
+    """Top-k most similar rows (excluding itself) for each of rows, as [(row, [(neighbor_row, score), ...]), ...]."""
+    # Only movies sharing a keyword get a non-zero score, so the product stays sparse
+    scores = (matrix[rows] @ matrix.T).tocsr()
+    results = []
+    for i, row in enumerate(rows):
+        start, end = scores.indptr[i], scores.indptr[i + 1]
+        columns = scores.indices[start:end]
+        values = scores.data[start:end]
+        keep = (columns != row) & (values > 0)
+        columns, values = columns[keep], values[keep]
+
+        if len(values) > k:
+            top = np.argpartition(-values, k - 1)[:k]
+            columns, values = columns[top], values[top]
+        order = np.argsort(-values, kind='stable')
+        results.append((row, [(int(columns[j]), float(values[j])) for j in order]))
+    return results
+
+
+def _init_worker(index_path):
+    global _worker_matrix
+    _worker_matrix = index_matrix(*read_arrays(index_path))
+
+
+def _worker_block(rows, k):
+    return block_neighbors(_worker_matrix, rows, k)
+
+
+def compute_neighbors(index_path, rows, k, block_size=256, workers=1):
+    """Yield block_neighbors results for rows, spreading blocks over a process pool when workers > 1."""
+    rows = list(rows)
+    blocks = [rows[i:i + block_size] for i in range(0, len(rows), block_size)]
+
+    if workers <= 1:
+        matrix = index_matrix(*read_arrays(index_path))
+        for block in blocks:
+            yield block_neighbors(matrix, block, k)
+        return
+
+    # Workers map the same files, so the matrix pages are shared rather than copied
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(str(index_path),)) as pool:
+        yield from pool.map(_worker_block, blocks, [k] * len(blocks))
@@ -0,0 +1,141 @@
+import base64
+import json
+
+from django.core.cache import cache
+from django.db.models import F, Q
+from rest_framework import filters
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from .catalog_cache import catalog_key, record_lookup
+from .versioning import get_version
+
+
+class StandardResultsSetPagination(PageNumberPagination):
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination keyed on (ordering field, pk), so every page is an index range scan.
+
+    The ordering comes from the view's OrderingFilter (?ordering=-release_date); NULLs sort
+    last in either direction. Unless keyset_by_default is set, clients opt in with ?cursor=
+    (empty for the first page) and other requests keep the page-number responses of
+    StandardResultsSetPagination; so do ?page= and ?search=, whose results are ranked.
+    ?count=1 adds a total count that is cached for COUNT_CACHE_SECONDS per endpoint and set
+    of filters; it is keyed by the catalog version and those named in count_versions.
+    """
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    keyset_by_default = False
+    count_versions = ()
+    COUNT_CACHE_SECONDS = 300
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.legacy = None
+        params = request.query_params
+        wants_keyset = self.keyset_by_default or self.cursor_query_param in params
+        if not wants_keyset or params.get('page') or params.get('search'):
+            self.legacy = StandardResultsSetPagination()
+            if not queryset.ordered:
+                queryset = queryset.order_by('id')
+            return self.legacy.paginate_queryset(queryset, request, view)
+
+        self.count = self.cached_count(queryset, request) if request.query_params.get(self.count_query_param) else None
+
+        ordering = filters.OrderingFilter().get_ordering(request, queryset, view) or ['pk']
+        self.field = ordering[0].lstrip('-')
+        self.descending = ordering[0].startswith('-')
+        queryset = queryset.order_by(*self.order_by())
+        if self.field not in ('id', 'pk'):
+            # Selected explicitly: with ?fields= the ordering field may be deferred by .only()
+            queryset = queryset.annotate(keyset_value=F(self.field))
+
+        cursor = self.decode_cursor(request)
+        if cursor is not None:
+            queryset = queryset.filter(self.after(*cursor))
+
+        page_size = self.get_page_size(request)
+        page = list(queryset[:page_size + 1])
+        self.has_next = len(page) > page_size
+        page = page[:page_size]
+        self.last = (getattr(page[-1], 'keyset_value', page[-1].pk), page[-1].pk) if page else None
+        return page
+
+    def get_paginated_response(self, data):
+        if self.legacy is not None:
+            return self.legacy.get_paginated_response(data)
+
+        response = {'next': self.get_next_link(), 'results': data}
+        if self.count is not None:
+            response['count'] = self.count
+        return Response(response)
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except ValueError:
+            return self.page_size
+        return max(1, min(page_size, self.max_page_size))
+
+    def order_by(self):
+        if self.field in ('id', 'pk'):
+            return ['-pk' if self.descending else 'pk']
+        if self.descending:
+            return [F(self.field).desc(nulls_last=True), '-pk']
+        return [F(self.field).asc(nulls_last=True), 'pk']
+
+    def after(self, value, last_id):
+        """Rows strictly after (value, last_id) in the current ordering."""
+        beyond, tie = ('lt', 'lt') if self.descending else ('gt', 'gt')
+        if self.field in ('id', 'pk'):
+            return Q(**{f'pk__{tie}': last_id})
+        if value is None:
+            return Q(**{f'{self.field}__isnull': True, f'pk__{tie}': last_id})
+        return (
+            Q(**{f'{self.field}__{beyond}': value})
+            | Q(**{self.field: value, f'pk__{tie}': last_id})
+            | Q(**{f'{self.field}__isnull': True})
+        )
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            cursor = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            return cursor['v'], int(cursor['id'])
+        except (TypeError, ValueError, KeyError):
+            raise NotFound('Invalid cursor')
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        value, last_id = self.last
+        if value is not None and not isinstance(value, (str, int, float)):
+            value = value.isoformat()
+        cursor = base64.urlsafe_b64encode(json.dumps({'v': value, 'id': last_id}).encode()).decode()
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, cursor)
+
+    def cached_count(self, queryset, request):
+        # Keyed by every parameter that changes the result set, not by the position in it
+        params = request.query_params.copy()
+        for param in (self.cursor_query_param, self.page_size_query_param, self.count_query_param, 'ordering', 'fields', 'view'):
+            params.pop(param, None)
+        kind = ':'.join(['count', request.path] + [f'{name}-{get_version(name)}' for name in self.count_versions])
+        key = catalog_key(kind, params)
+        count = cache.get(key)
+        record_lookup(count is not None)
+        if count is None:
+            count = queryset.order_by().count()
+            cache.set(key, count, self.COUNT_CACHE_SECONDS)
+        return count
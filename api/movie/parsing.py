@@ -0,0 +1,214 @@
+"""
+CSV parsing for import_data.
+
+Kept free of Django imports so pool workers can parse chunks without setting Django up.
+"""
+import io
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# CSV column -> Movie field, in the order of the parsed value tuples
+MOVIE_COLUMNS = {
+    'id': 'source_id',
+    'title': 'title',
+    'overview': 'description',
+    'release_date': 'release_date',
+    'poster_path': 'poster_url',
+    'original_language': 'original_language',
+    'production_companies': 'production_companies',
+    'runtime': 'runtime',
+    'status': 'status',
+    'tagline': 'tagline',
+    'credits': 'credit',
+    'keywords': 'keywords',
+    'backdrop_path': 'backdrop_path',
+}
+MOVIE_FIELDS = tuple(MOVIE_COLUMNS.values())
+SOURCE_INDEX = MOVIE_FIELDS.index('source_id')
+IMPORT_COLUMNS = set(MOVIE_COLUMNS) | {'genres'}
+
+# Required text columns are stored as '' rather than NULL
+NOT_NULL_FIELDS = {'title', 'description'}
+
+# Runtime stored for missing or unparseable values
+DEFAULT_RUNTIME = 1
+
+# File suffix -> format for the columnar outputs of the csv command
+COLUMNAR_FORMATS = {'.parquet': 'parquet', '.feather': 'feather', '.arrow': 'feather'}
+
+# Bytes read at a time when splitting a CSV into ranges for the parser workers
+SCAN_BLOCK = 1 << 20
+
+
+def load_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError as exc:
+        raise ImportError('Parquet and Feather files need pyarrow: pip install pyarrow') from exc
+    return pyarrow
+
+
+def file_format(path):
+    return COLUMNAR_FORMATS.get(Path(path).suffix.lower(), 'csv')
+
+
+def read_chunks(path, chunk_size):
+    """
+    Stream the file as DataFrames of up to chunk_size rows with only the imported columns.
+
+    CSV columns are read as str (NaN when empty). Parquet and Feather files are read batch
+    by batch without parsing any text, with the types they were written with.
+    """
+    file_type = file_format(path)
+    if file_type == 'csv':
+        yield from pd.read_csv(path, chunksize=chunk_size, dtype=str, usecols=lambda column: column in IMPORT_COLUMNS)
+        return
+
+    pyarrow = load_pyarrow()
+    if file_type == 'parquet':
+        parquet_file = pyarrow.parquet.ParquetFile(path)
+        columns = [column for column in parquet_file.schema_arrow.names if column in IMPORT_COLUMNS]
+        for batch in parquet_file.iter_batches(batch_size=chunk_size, columns=columns):
+            yield batch.to_pandas()
+    else:
+        reader = pyarrow.ipc.open_file(pyarrow.memory_map(str(path)))
+        columns = [column for column in reader.schema.names if column in IMPORT_COLUMNS]
+        for index in range(reader.num_record_batches):
+            table = pyarrow.Table.from_batches([reader.get_batch(index).select(columns)])
+            for batch in table.to_batches(max_chunksize=chunk_size):
+                yield batch.to_pandas()
+
+
+def parse_chunk(df):
+    """
+    Turn a chunk into a list of (field values tuple, genre names tuple).
+
+    The values follow MOVIE_FIELDS. Parsing is done per column, so the result is plain
+    Python data that can be pickled or written without touching pandas again.
+    """
+    columns = {}
+    for column, field in MOVIE_COLUMNS.items():
+        values = df[column] if column in df else pd.Series(np.nan, index=df.index, dtype=object)
+        if field == 'release_date':
+            dates = pd.to_datetime(values, format='%Y-%m-%d', errors='coerce')
+            values = dates.dt.date.astype(object).where(dates.notna(), None)
+        elif field == 'source_id':
+            ids = pd.to_numeric(values, errors='coerce')
+            valid = np.isfinite(ids) & (ids >= 0)
+            values = ids.where(valid, 0).astype('int64').astype(object).where(valid, None)
+        elif field == 'runtime':
+            runtime = pd.to_numeric(values, errors='coerce')
+            values = runtime.where(np.isfinite(runtime) & (runtime >= 0), DEFAULT_RUNTIME).astype('int64')
+        elif field in NOT_NULL_FIELDS:
+            values = values.fillna('')
+        else:
+            values = values.astype(object).where(values.notna(), None)
+        columns[field] = values.tolist()
+
+    genres = df['genres'] if 'genres' in df else pd.Series(np.nan, index=df.index, dtype=object)
+    genre_names = [split_genres(text) for text in genres.tolist()]
+
+    return list(zip(zip(*(columns[field] for field in MOVIE_FIELDS)), genre_names))
+
+
+def split_genres(text):
+    if not isinstance(text, str):
+        return ()
+    return tuple(dict.fromkeys(name.strip() for name in text.split('-') if name.strip()))
+
+
+def csv_ranges(path, chunk_size):
+    """
+    Yield (start, end) byte ranges covering the rows of a CSV, about chunk_size rows each.
+
+    Every range ends on a record boundary: a newline outside quotes. Quotes are counted as
+    the file is scanned ("" escapes keep the parity right), so a quoted field spanning
+    lines stays in one range. Bytes per row are estimated from the first block.
+    """
+    with open(path, 'rb') as f:
+        f.readline()
+        start = offset = f.tell()
+        sample = f.read(SCAN_BLOCK)
+        target = max(int(chunk_size * len(sample) / max(sample.count(b'\n'), 1)), 1)
+        f.seek(start)
+
+        cut = start + target
+        # Whether the scan is inside a quoted field at block[position]
+        quoted = False
+        while True:
+            block = f.read(SCAN_BLOCK)
+            if not block:
+                break
+            position = 0
+            while True:
+                at = max(cut - offset, position)
+                if at >= len(block):
+                    break
+                quoted ^= block.count(b'"', position, at) & 1
+                position = at
+                newline = block.find(b'\n', position)
+                if newline == -1:
+                    break
+                quoted ^= block.count(b'"', position, newline) & 1
+                position = newline + 1
+                if not quoted:
+                    yield start, offset + position
+                    start = offset + position
+                    cut = start + target
+            quoted ^= block.count(b'"', position) & 1
+            offset += len(block)
+
+        if offset > start:
+            yield start, offset
+
+
+def parse_csv_range(path, start, end):
+    """Read and parse the rows in bytes start:end of a CSV; returns (row count, parse_chunk result)."""
+    with open(path, 'rb') as f:
+        header = f.readline()
+        f.seek(start)
+        data = f.read(end - start)
+    df = pd.read_csv(io.BytesIO(header + data), dtype=str, usecols=lambda column: column in IMPORT_COLUMNS)
+    return len(df), parse_chunk(df)
+
+
+def _parse_batch(df):
+    return len(df), parse_chunk(df)
+
+
+def parsed_chunks(path, chunk_size, workers=1, in_flight=None):
+    """
+    Yield (row count, parse_chunk result) for chunks of about chunk_size rows of the file, in order.
+
+    With workers > 1 the chunks are parsed in a process pool while the caller writes the
+    previous ones. For a CSV the parent only splits the file into byte ranges (csv_ranges)
+    and each worker reads and tokenizes its own; Parquet and Feather batches, already typed,
+    are sent to the workers as DataFrames. At most in_flight chunks (2 per worker by
+    default) are queued or parsed but not yet consumed, so memory stays bounded however
+    fast the file is split.
+    """
+    if workers <= 1:
+        for chunk in read_chunks(path, chunk_size):
+            yield len(chunk), parse_chunk(chunk)
+        return
+
+    if file_format(path) == 'csv':
+        tasks = ((parse_csv_range, path, start, end) for start, end in csv_ranges(path, chunk_size))
+    else:
+        tasks = ((_parse_batch, chunk) for chunk in read_chunks(path, chunk_size))
+
+    in_flight = in_flight or 2 * workers
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for func, *args in tasks:
+            pending.append(pool.submit(func, *args))
+            if len(pending) >= in_flight:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
@@ -0,0 +1,90 @@
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Sum
+
+from .models import MovieRatingStats, Rating
+from .versioning import RATINGS, bump_version
+
+
+def apply_rating_changes(changes):
+    """
+    Fold rating writes into the per-movie aggregates.
+
+    changes is an iterable of (movie_id, old_rating, new_rating), with None for a missing
+    side (a new rating has no old value, a deleted one no new value). Call this inside the
+    transaction that writes the ratings so the aggregates commit or roll back with them.
+    """
+    deltas = defaultdict(lambda: [0.0, 0])
+    for movie_id, old_rating, new_rating in changes:
+        if old_rating is not None:
+            deltas[movie_id][0] -= old_rating
+            deltas[movie_id][1] -= 1
+        if new_rating is not None:
+            deltas[movie_id][0] += new_rating
+            deltas[movie_id][1] += 1
+    deltas = {movie_id: delta for movie_id, delta in deltas.items() if delta != [0.0, 0]}
+    if not deltas:
+        return
+
+    with transaction.atomic():
+        # Create the missing rows first, so concurrent first ratings of a movie both end up
+        # locking and updating the same row instead of racing to insert it
+        MovieRatingStats.objects.bulk_create(
+            [MovieRatingStats(movie_id=movie_id) for movie_id in deltas], ignore_conflicts=True,
+        )
+        stats = MovieRatingStats.objects.select_for_update().in_bulk(list(deltas))
+        for movie_id, (sum_delta, count_delta) in deltas.items():
+            movie_stats = stats[movie_id]
+            movie_stats.rating_sum += sum_delta
+            movie_stats.rating_count = max(movie_stats.rating_count + count_delta, 0)
+            _refresh_scores(movie_stats)
+
+        MovieRatingStats.objects.bulk_update(
+            list(stats.values()), ['rating_sum', 'rating_count', 'rating_avg', 'bayesian_score'],
+        )
+        bump_version(RATINGS)
+
+
+def discount_user_ratings(sender, instance, **kwargs):
+    """pre_delete receiver for User: the user's ratings are about to go with it by cascade."""
+    apply_rating_changes(
+        (movie_id, rating, None)
+        for movie_id, rating in Rating.objects.filter(user=instance, rating__isnull=False).values_list('movie_id', 'rating')
+    )
+
+
+def rebuild_rating_stats():
+    """Recompute every aggregate from the Rating table; returns the number of rated movies."""
+    totals = (
+        Rating.objects
+        .filter(rating__isnull=False)
+        .values('movie_id')
+        .annotate(rating_sum=Sum('rating'), rating_count=Count('id'))
+    )
+    stats = []
+    for row in totals.iterator(chunk_size=10000):
+        movie_stats = MovieRatingStats(movie_id=row['movie_id'], rating_sum=row['rating_sum'], rating_count=row['rating_count'])
+        _refresh_scores(movie_stats)
+        stats.append(movie_stats)
+
+    with transaction.atomic():
+        MovieRatingStats.objects.all().delete()
+        MovieRatingStats.objects.bulk_create(stats, batch_size=5000)
+        bump_version(RATINGS)
+    return len(stats)
+
+
+def _refresh_scores(movie_stats):
+    if movie_stats.rating_count:
+        prior_weight = settings.RATING_PRIOR_WEIGHT
+        movie_stats.rating_avg = movie_stats.rating_sum / movie_stats.rating_count
+        movie_stats.bayesian_score = (
+            (prior_weight * settings.RATING_PRIOR_MEAN + movie_stats.rating_sum)
+            / (prior_weight + movie_stats.rating_count)
+        )
+    else:
+        movie_stats.rating_sum = 0
+        movie_stats.rating_avg = None
+        movie_stats.bayesian_score = None
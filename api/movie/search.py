@@ -0,0 +1,109 @@
+import re
+from contextlib import contextmanager
+
+from django.db import connection, transaction
+from django.db.models import FloatField
+from django.db.models.expressions import RawSQL
+
+SEARCH_TABLE = 'movie_movie_fts'
+
+# bm25() weights for title, description, production_companies, credit, genres
+COLUMN_WEIGHTS = (10.0, 1.0, 2.0, 2.0, 3.0)
+
+# Index rows of movie_movie m, in the column order of the FTS table
+INDEX_INSERT = (
+    f'INSERT INTO {SEARCH_TABLE} (rowid, title, description, production_companies, credit, genres) '
+    'SELECT m.id, m.title, m.description, m.production_companies, m.credit, '
+    "(SELECT group_concat(g.name, ' ') FROM movie_movie_genres mg JOIN movie_genre g ON g.id = mg.genre_id WHERE mg.movie_id = m.id) "
+    'FROM movie_movie m'
+)
+
+# Keep IN (...) lists well under SQLite's bound parameter limit
+QUERY_CHUNK = 5000
+
+
+def search_available():
+    return connection.vendor == 'sqlite'
+
+
+def match_expression(text):
+    """Quote every word and match it as a prefix, so 'star wa' finds 'Star Wars'."""
+    words = re.findall(r'\w+', text)
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def search_movies(queryset, text):
+    """
+    Filter a Movie queryset to the matches of text, best match first.
+
+    The index is queried in subqueries, so result pages are counted and sliced in SQL
+    rather than from a capped list of matching ids.
+    """
+    expression = match_expression(text)
+    if not expression:
+        return queryset.none()
+    weights = ', '.join(str(weight) for weight in COLUMN_WEIGHTS)
+    matches = RawSQL(f'SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s', [expression])
+    rank = RawSQL(
+        f'SELECT bm25({SEARCH_TABLE}, {weights}) FROM {SEARCH_TABLE} '
+        f'WHERE {SEARCH_TABLE}.rowid = movie_movie.id AND {SEARCH_TABLE} MATCH %s',
+        [expression],
+        output_field=FloatField(),
+    )
+    return (
+        queryset
+        .filter(pk__in=matches)
+        .annotate(search_rank=rank)
+        .order_by('search_rank', 'id')
+    )
+
+
+def rebuild_search_index():
+    """Reindex every movie; the triggers keep the index in sync afterwards."""
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+        cursor.execute(INDEX_INSERT)
+        return cursor.rowcount
+
+
+def reindex_movies(movie_ids):
+    """Rewrite the index rows of movie_ids from the current movie and genre rows."""
+    movie_ids = list(movie_ids)
+    with connection.cursor() as cursor:
+        for start in range(0, len(movie_ids), QUERY_CHUNK):
+            chunk = movie_ids[start:start + QUERY_CHUNK]
+            placeholders = ', '.join(['%s'] * len(chunk))
+            cursor.execute(f'DELETE FROM {SEARCH_TABLE} WHERE rowid IN ({placeholders})', chunk)
+            cursor.execute(f'{INDEX_INSERT} WHERE m.id IN ({placeholders})', chunk)
+
+
+@contextmanager
+def deferred_search_index():
+    """
+    Suspend the index triggers for a bulk write.
+
+    Yields a set for the caller to fill with the ids of the movies it inserted or changed;
+    they are reindexed in one pass on exit. The triggers are dropped and restored inside a
+    savepoint, so a failed write brings them back with the rollback.
+    """
+    if not search_available():
+        yield set()
+        return
+
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND sql LIKE %s",
+                [f'%{SEARCH_TABLE}%'],
+            )
+            triggers = cursor.fetchall()
+            for name, _ in triggers:
+                cursor.execute(f'DROP TRIGGER {name}')
+
+        movie_ids = set()
+        yield movie_ids
+        reindex_movies(movie_ids)
+
+        with connection.cursor() as cursor:
+            for _, sql in triggers:
+                cursor.execute(sql)
@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import Genre, Movie, WatchedList, Rating, FavoriteMovie
+from .models import Genre, Movie, WatchedList, Rating, FavoriteMovie, MovieRatingStats
 from django.contrib.auth import get_user_model
 from rest_framework_simplejwt.serializers import TokenRefreshSerializer
 from rest_framework_simplejwt.tokens import RefreshToken
@@ -7,6 +7,8 @@ from django.contrib.auth.tokens import PasswordResetTokenGenerator
 from django.utils.http import urlsafe_base64_encode
 from django.utils.encoding import force_bytes
 from django.core.mail import send_mail
+from .genre_profiles import adjust_genre_profile
+from .jobs import WATCHED_MODELS, enqueue_rebuilds
 
 User = get_user_model()  # Get the custom user model
 
@@ -25,7 +27,16 @@ class GenreSerializer(serializers.ModelSerializer):
         model = Genre
         fields = ['id', 'name']
 
-class MovieSerializer(serializers.ModelSerializer):
+class SparseFieldsMixin:
+    # Pass fields=[...] to keep only those fields in the output (?fields=id,title)
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop('fields', None)
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for field_name in set(self.fields) - set(fields):
+                self.fields.pop(field_name)
+
+class MovieSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     genres = GenreSerializer(many=True, read_only=True)
 
     class Meta:
@@ -34,6 +45,19 @@ class MovieSerializer(serializers.ModelSerializer):
                   'original_language', 'production_companies', 'runtime', 'status',
                   'tagline', 'credit', 'keywords', 'backdrop_path', 'youtube_path']
 
+class MovieCardSerializer(serializers.ModelSerializer):
+    # Compact representation for catalog grids
+    genres = serializers.PrimaryKeyRelatedField(many=True, read_only=True)
+
+    class Meta:
+        model = Movie
+        fields = ['id', 'title', 'poster_url', 'release_date', 'genres']
+
+class MovieSummarySerializer(serializers.ModelSerializer):
+    # Just enough to render a watched list or ratings row
+    class Meta:
+        model = Movie
+        fields = ['id', 'title', 'poster_url']
 
 class UserSerializer(serializers.ModelSerializer):
     favorite_genres = GenreSerializer(many=True, read_only=True)
@@ -61,9 +85,27 @@ class WatchedListSerializer(serializers.ModelSerializer):
         fields = ['id', 'user', 'movie', 'movie_id', 'watched_date']
         read_only_fields = ['user', 'watched_date']
 
+    def validate_movie_id(self, value):
+        entries = WatchedList.objects.filter(user=self.context['request'].user, movie=value)
+        if self.instance is not None:
+            entries = entries.exclude(pk=self.instance.pk)
+        if entries.exists():
+            raise serializers.ValidationError("This movie is already in your watched list.")
+        return value
+
     def create(self, validated_data):
         validated_data['user'] = self.context['request'].user
-        return super().create(validated_data)
+        watched_movie = super().create(validated_data)
+        adjust_genre_profile(watched_movie.user, [watched_movie.movie_id], 1)
+        enqueue_rebuilds(WATCHED_MODELS)
+        return watched_movie
+
+class CompactWatchedListSerializer(serializers.ModelSerializer):
+    movie = MovieSummarySerializer(read_only=True)
+
+    class Meta:
+        model = WatchedList
+        fields = ['id', 'movie', 'watched_date']
 
 class AddWatchedListSerializer(serializers.ModelSerializer):
     class Meta:
@@ -74,6 +116,9 @@ class AddWatchedListSerializer(serializers.ModelSerializer):
         user = self.context['request'].user
         movie = validated_data.get('movie')
         watched_movie, created = WatchedList.objects.get_or_create(user=user, movie=movie)
+        if created:
+            adjust_genre_profile(user, [movie.id], 1)
+            enqueue_rebuilds(WATCHED_MODELS)
         return watched_movie
 
 class RatingSerializer(serializers.ModelSerializer):
@@ -87,10 +132,32 @@ class RatingSerializer(serializers.ModelSerializer):
         fields = ['id', 'user', 'movie', 'movie_id', 'rating']
         read_only_fields = ['user']
 
+    def validate_movie_id(self, value):
+        ratings = Rating.objects.filter(user=self.context['request'].user, movie=value)
+        if self.instance is not None:
+            ratings = ratings.exclude(pk=self.instance.pk)
+        if ratings.exists():
+            raise serializers.ValidationError("You have already rated this movie.")
+        return value
+
     def create(self, validated_data):
         validated_data['user'] = self.context['request'].user
         return super().create(validated_data)
 
+class CompactRatingSerializer(serializers.ModelSerializer):
+    movie = MovieSummarySerializer(read_only=True)
+
+    class Meta:
+        model = Rating
+        fields = ['id', 'movie', 'rating']
+
+class AverageRatingSerializer(serializers.ModelSerializer):
+    avg_rating = serializers.FloatField(source='rating_avg')
+
+    class Meta:
+        model = MovieRatingStats
+        fields = ['movie', 'avg_rating', 'rating_count']
+
 class CustomTokenRefreshSerializer(TokenRefreshSerializer):
     def validate(self, attrs):
         data = super().validate(attrs)
@@ -0,0 +1,92 @@
+from django.db import transaction
+from django.db.models import Count, Min
+
+from .artifacts import artifact_dir
+from .keyword_index import INDEX_NAME, load_keyword_index
+from .models import SimilarMovie
+from .neighbors import compute_neighbors
+
+DEFAULT_TOP_K = 20
+
+# Keep IN (...) lists well under SQLite's bound parameter limit
+QUERY_CHUNK = 5000
+
+
+def refresh_similar_movies(movie_ids=None, top_k=DEFAULT_TOP_K, block_size=256, workers=1):
+    """
+    Recompute the stored neighbor lists from the current keyword index.
+
+    With movie_ids=None every row is rebuilt. Otherwise only the given movies and the
+    movies whose top-k they can enter or leave are recomputed. Returns the number of
+    movies whose neighbor lists were written.
+    """
+    index = load_keyword_index()
+    if index is None:
+        raise RuntimeError('Keyword index has not been built yet')
+
+    if movie_ids is None:
+        rows = range(len(index.movie_ids))
+    else:
+        rows = _affected_rows(index, movie_ids, top_k)
+
+    written = 0
+    for block in compute_neighbors(artifact_dir(INDEX_NAME), rows, top_k, block_size, workers):
+        _write_block(index, block)
+        written += len(block)
+    return written
+
+
+def _affected_rows(index, movie_ids, top_k):
+    changed_rows = [row for row in map(index.row_for, movie_ids) if row is not None]
+    affected = set(changed_rows)
+
+    # Movies currently listing a changed movie may need to drop or re-score it
+    changed_ids = list(movie_ids)
+    for chunk in _chunks(changed_ids):
+        for movie_id in SimilarMovie.objects.filter(similar_id__in=chunk).values_list('movie_id', flat=True).distinct():
+            row = index.row_for(movie_id)
+            if row is not None:
+                affected.add(row)
+
+    if not changed_rows:
+        return sorted(affected)
+
+    # The similarity is symmetric, so the changed rows' products give every other movie's
+    # score against them; a movie needs refreshing if that score beats its current k-th best
+    scores = (index.matrix[changed_rows] @ index.matrix.T).tocsc()
+    best = scores.max(axis=0).toarray().ravel()
+    candidates = [row for row in best.nonzero()[0] if row not in affected]
+    candidate_ids = [int(index.movie_ids[row]) for row in candidates]
+
+    thresholds = {}
+    for chunk in _chunks(candidate_ids):
+        stored = (
+            SimilarMovie.objects.filter(movie_id__in=chunk)
+            .values('movie_id')
+            .annotate(lowest=Min('score'), stored=Count('id'))
+        )
+        for entry in stored:
+            if entry['stored'] >= top_k:
+                thresholds[entry['movie_id']] = entry['lowest']
+
+    for row, movie_id in zip(candidates, candidate_ids):
+        if best[row] > thresholds.get(movie_id, 0):
+            affected.add(row)
+    return sorted(affected)
+
+
+def _write_block(index, block):
+    movie_ids = [int(index.movie_ids[row]) for row, _ in block]
+    similar_movies = [
+        SimilarMovie(movie_id=movie_id, similar_id=int(index.movie_ids[neighbor]), score=score, rank=rank)
+        for movie_id, (_, neighbors) in zip(movie_ids, block)
+        for rank, (neighbor, score) in enumerate(neighbors)
+    ]
+    with transaction.atomic():
+        SimilarMovie.objects.filter(movie_id__in=movie_ids).delete()
+        SimilarMovie.objects.bulk_create(similar_movies, batch_size=5000)
+
+
+def _chunks(items, size=QUERY_CHUNK):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
@@ -0,0 +1,193 @@
+from itertools import chain
+
+import numpy as np
+from django.db import transaction
+from django.db.models.functions import ExtractYear
+
+from .artifacts import load_arrays, save_arrays
+from .models import Genre, Movie, MovieKeyword, MovieRatingStats, Rating, WatchedList
+from .versioning import CATALOG, RATINGS, get_version
+
+SNAPSHOT_NAME = 'catalog_snapshot'
+
+# (manifest, CatalogSnapshot) for the most recently loaded build
+_current = None
+
+
+class CatalogSnapshot:
+    """
+    Columnar, memory-mapped export of the catalog and the interaction logs.
+
+    Per-movie columns are aligned with movie_ids (sorted). Genres and keywords are CSR
+    lists: the ids of row i are ids[indptr[i]:indptr[i + 1]]. Interactions are parallel
+    user / movie / value columns.
+    """
+
+    def __init__(self, arrays, manifest):
+        self.arrays = arrays
+        self.manifest = manifest
+        self.meta = manifest['meta']
+
+    def __getitem__(self, name):
+        return self.arrays[name]
+
+    @property
+    def movie_ids(self):
+        return self.arrays['movie_ids']
+
+    def is_current(self, ratings=True):
+        """True when no catalog change, nor with ratings a rating change, happened since the snapshot was taken."""
+        if ratings:
+            return self.meta['versions'] == _versions()
+        return self.meta['versions'][CATALOG] == get_version(CATALOG)
+
+    def rank_by_genres(self, affinity, exclude=(), limit=20):
+        """
+        Return up to limit movie ids ranked by the summed affinity of their genres, then by Bayesian score.
+
+        affinity is {genre id: weight}; movies without a positive affinity and the movie ids
+        in exclude are left out.
+        """
+        genre_ids = self.arrays['genre_ids']
+        weights = np.zeros(int(genre_ids.max(initial=0)) + 1)
+        for genre_id, weight in affinity.items():
+            if genre_id < len(weights):
+                weights[genre_id] = weight
+        rows = np.repeat(np.arange(len(self.movie_ids)), np.diff(self.arrays['genre_indptr']))
+        scores = np.bincount(rows, weights=weights[genre_ids], minlength=len(self.movie_ids))
+        scores[np.isin(self.movie_ids, np.fromiter(exclude, dtype=np.int64))] = 0
+
+        candidates = np.flatnonzero(scores > 0)
+        # Unrated movies (NaN score) after the rated ones
+        bayesian_score = np.nan_to_num(self.arrays['bayesian_score'][candidates], nan=-np.inf)
+        order = np.lexsort((self.movie_ids[candidates], -bayesian_score, -scores[candidates]))[:limit]
+        return self.movie_ids[candidates[order]].tolist()
+
+    def links(self, kind):
+        """Return (movie ids, linked ids) with one entry per genre or keyword link."""
+        indptr = self.arrays[f'{kind}_indptr']
+        return np.repeat(self.movie_ids, np.diff(indptr)), self.arrays[f'{kind}_ids']
+
+
+def _versions():
+    return {CATALOG: get_version(CATALOG), RATINGS: get_version(RATINGS)}
+
+
+def _columns(queryset, fields, dtype):
+    """Return one array per field; with a float dtype NULLs become NaN."""
+    # Flatten straight into a typed buffer rather than holding a list of tuples
+    values = chain.from_iterable(queryset.values_list(*fields).iterator(chunk_size=10000))
+    if np.dtype(dtype).kind == 'f':
+        values = (np.nan if value is None else value for value in values)
+    return np.fromiter(values, dtype=dtype).reshape(-1, len(fields)).T
+
+
+def _csr(movie_ids, link_movies, link_ids):
+    rows = np.searchsorted(movie_ids, link_movies)
+    order = np.lexsort((link_ids, rows))
+    indptr = np.zeros(len(movie_ids) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=len(movie_ids)), out=indptr[1:])
+    return indptr, link_ids[order].astype(np.int32)
+
+
+def build_catalog_snapshot():
+    """Export the catalog and the interactions to a new snapshot; returns its manifest meta."""
+    # One transaction, so every column sees the same state of the database
+    with transaction.atomic():
+        versions = _versions()
+        movie_ids, release_years = _columns(
+            Movie.objects.order_by('id').annotate(year=ExtractYear('release_date')), ('id', 'year'), np.float64,
+        )
+        movie_ids = movie_ids.astype(np.int64)
+        languages = Movie.objects.order_by('id').values_list('original_language', flat=True)
+        language_codes = {}
+        language = np.fromiter(
+            (language_codes.setdefault(code, len(language_codes)) if code else -1 for code in languages.iterator(chunk_size=10000)),
+            dtype=np.int32, count=len(movie_ids),
+        )
+        genre_movies, genre_ids = _columns(Movie.genres.through.objects.all(), ('movie_id', 'genre_id'), np.int64)
+        keyword_movies, keyword_ids = _columns(MovieKeyword.objects.all(), ('movie_id', 'keyword_id'), np.int64)
+        stats_movies, rating_counts, rating_sums, bayesian_scores = _columns(
+            MovieRatingStats.objects.all(), ('movie_id', 'rating_count', 'rating_sum', 'bayesian_score'), np.float64,
+        )
+        watched_users, watched_movies = _columns(WatchedList.objects.all(), ('user_id', 'movie_id'), np.int64)
+        rating_users, rating_movies, rating_values = _columns(
+            Rating.objects.filter(rating__isnull=False), ('user_id', 'movie_id', 'rating'), np.float64,
+        )
+        genre_names = dict(Genre.objects.values_list('id', 'name'))
+
+    genre_indptr, genre_ids = _csr(movie_ids, genre_movies, genre_ids)
+    keyword_indptr, keyword_ids = _csr(movie_ids, keyword_movies, keyword_ids)
+
+    # Rating aggregates aligned with movie_ids; unrated movies have count 0 and a NaN score
+    stats_rows = np.searchsorted(movie_ids, stats_movies.astype(np.int64))
+    rating_count = np.zeros(len(movie_ids), dtype=np.int32)
+    rating_sum = np.zeros(len(movie_ids), dtype=np.float64)
+    bayesian_score = np.full(len(movie_ids), np.nan, dtype=np.float64)
+    rating_count[stats_rows] = rating_counts
+    rating_sum[stats_rows] = rating_sums
+    bayesian_score[stats_rows] = bayesian_scores  # NULL scores arrive as NaN already
+
+    meta = {
+        'versions': versions,
+        'movies': len(movie_ids),
+        'watched': len(watched_users),
+        'ratings': len(rating_users),
+        'languages': list(language_codes),
+        'genres': {str(genre_id): name for genre_id, name in genre_names.items()},
+    }
+    save_arrays(SNAPSHOT_NAME, {
+        'movie_ids': movie_ids,
+        'release_year': np.nan_to_num(release_years, nan=-1).astype(np.int16),
+        'language': language,
+        'genre_indptr': genre_indptr,
+        'genre_ids': genre_ids,
+        'keyword_indptr': keyword_indptr,
+        'keyword_ids': keyword_ids,
+        'rating_count': rating_count,
+        'rating_sum': rating_sum,
+        'bayesian_score': bayesian_score,
+        'watched_users': watched_users,
+        'watched_movies': watched_movies,
+        'rating_users': rating_users.astype(np.int64),
+        'rating_movies': rating_movies.astype(np.int64),
+        'rating_values': rating_values.astype(np.float32),
+    }, meta=meta)
+    return meta
+
+
+def load_catalog_snapshot():
+    """Return the memory-mapped CatalogSnapshot, or None if build_catalog_snapshot has not run."""
+    global _current
+    arrays, manifest = load_arrays(SNAPSHOT_NAME)
+    if arrays is None:
+        return None
+    if _current and _current[0] is manifest:
+        return _current[1]
+
+    _current = (manifest, CatalogSnapshot(arrays, manifest))
+    return _current[1]
+
+
+def keyword_links(snapshot=None):
+    """Return (sorted movie ids, link movie ids, link keyword ids) from snapshot or the database."""
+    if snapshot is not None:
+        return (snapshot.movie_ids, *snapshot.links('keyword'))
+    movie_ids = np.fromiter(Movie.objects.order_by('id').values_list('id', flat=True).iterator(chunk_size=10000), dtype=np.int64)
+    link_movies, keyword_ids = _columns(MovieKeyword.objects.all(), ('movie_id', 'keyword_id'), np.int64)
+    return movie_ids, link_movies, keyword_ids
+
+
+def watched_pairs(snapshot=None):
+    """Return (user ids, movie ids) of the watched lists from snapshot or the database."""
+    if snapshot is not None:
+        return snapshot['watched_users'], snapshot['watched_movies']
+    return tuple(_columns(WatchedList.objects.all(), ('user_id', 'movie_id'), np.int64))
+
+
+def rating_triples(snapshot=None):
+    """Return (user ids, movie ids, ratings) of the non-null ratings from snapshot or the database."""
+    if snapshot is not None:
+        return snapshot['rating_users'], snapshot['rating_movies'], snapshot['rating_values']
+    users, movies, values = _columns(Rating.objects.filter(rating__isnull=False), ('user_id', 'movie_id', 'rating'), np.float64)
+    return users.astype(np.int64), movies.astype(np.int64), values
@@ -0,0 +1,81 @@
+from django.db import transaction
+
+from .bulk import insert_rows
+from .models import Company, Keyword, MovieCompany, MovieCredit, MovieKeyword, Person
+
+# Movie text column -> (term model, through model, through field pointing at the term)
+TERM_FIELDS = {
+    'credit': (Person, MovieCredit, 'person'),
+    'production_companies': (Company, MovieCompany, 'company'),
+    'keywords': (Keyword, MovieKeyword, 'keyword'),
+}
+
+# Term models with a normalized_name column for case-insensitive filters
+NORMALIZED_TERMS = (Person, Company)
+
+# Keep IN (...) lists well under SQLite's bound parameter limit
+QUERY_CHUNK = 5000
+
+
+def split_terms(text):
+    """Split a dash-joined column into unique, stripped names in their original order."""
+    if not isinstance(text, str):
+        return []
+    names = {}
+    for name in text.split('-'):
+        name = name.strip()[:255]
+        if name:
+            names.setdefault(name, None)
+    return list(names)
+
+
+def normalize_name(name):
+    """The normalized_name of a Person or Company; filters normalize their input the same way."""
+    return name.lower()
+
+
+def term_ids(model, names):
+    """Return {name: id} for names, creating the missing rows."""
+    names = list(set(names))
+    ids = {}
+    for start in range(0, len(names), QUERY_CHUNK):
+        chunk = names[start:start + QUERY_CHUNK]
+        if model in NORMALIZED_TERMS:
+            rows = [model(name=name, normalized_name=normalize_name(name)) for name in chunk]
+        else:
+            rows = [model(name=name) for name in chunk]
+        model.objects.bulk_create(rows, ignore_conflicts=True)
+        ids.update(model.objects.filter(name__in=chunk).values_list('name', 'id'))
+    return ids
+
+
+def link_movie_terms(movies, replace=False):
+    """
+    Populate the Person/Company/Keyword links of movies.
+
+    movies is an iterable of objects with id, credit, production_companies and keywords.
+    With replace=True the existing links of those movies are dropped first (re-import).
+    """
+    movies = list(movies)
+    with transaction.atomic():
+        for column, (model, through, field) in TERM_FIELDS.items():
+            names_by_movie = [(movie.id, split_terms(getattr(movie, column))) for movie in movies]
+            ids = term_ids(model, [name for _, names in names_by_movie for name in names])
+
+            if replace:
+                movie_ids = [movie.id for movie in movies]
+                for start in range(0, len(movie_ids), QUERY_CHUNK):
+                    through.objects.filter(movie_id__in=movie_ids[start:start + QUERY_CHUNK]).delete()
+
+            if through is MovieCredit:
+                insert_rows(through, ('movie', field, 'order'), [
+                    (movie_id, ids[name], position)
+                    for movie_id, names in names_by_movie
+                    for position, name in enumerate(names)
+                ], ignore_conflicts=True)
+            else:
+                insert_rows(through, ('movie', field), [
+                    (movie_id, ids[name])
+                    for movie_id, names in names_by_movie
+                    for name in names
+                ], ignore_conflicts=True)
@@ -1,3 +1,1186 @@
-from django.test import TestCase
+import asyncio
+import os
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from io import StringIO
+from itertools import combinations
+from operator import attrgetter
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from scipy.sparse import csr_matrix
+
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+from rest_framework.test import APIClient
+from rest_framework.views import APIView
+
+from .rating_stats import apply_rating_changes, rebuild_rating_stats
+from .genre_profiles import adjust_genre_profile, genre_weights, rebuild_genre_profiles
+from .association_rules import active_rule_set, mine_association_rules
+from .item_cf import build_item_cf, recommend_for_user
+from .itemsets import frequent_itemsets, single_consequent_rules, user_movie_matrix
+from .keyword_index import build_keyword_index, load_keyword_index
+from .als import _solve_rows, recommend_for_user as recommend_personal, train_als
+from . import catalog_cache
+from .catalog_cache import bump_catalog
+from .artifacts import load_arrays
+from .async_views import async_recommendation_view
+from .charts import get_chart, save_charts
+from . import jobs
+from .jobs import claim_jobs, enqueue, prune_jobs, requeue_stale_jobs, run_jobs
+from . import parsing
+from .models import AssociationRule, Company, Genre, Job, Movie, MovieRatingStats, Rating, SimilarMovie, User, WatchedList
+from .similar_movies import refresh_similar_movies
+from .snapshot import build_catalog_snapshot, load_catalog_snapshot
+from .terms import link_movie_terms
+
+
+class RecommenderDataMixin:
+    # Artifacts (indexes, factors, snapshots) go to a directory dropped after each test
+
+    def setUp(self):
+        super().setUp()
+        data_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(data_dir.cleanup)
+        data_settings = override_settings(RECOMMENDER_DATA_DIR=data_dir.name)
+        data_settings.enable()
+        self.addCleanup(data_settings.disable)
+
+
+class CatalogCacheMixin:
+    # Cached pages are keyed by the catalog version, which every test's rollback reuses
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        catalog_cache._version = None
+
+
+def make_movie(title, genres=(), **fields):
+    """Create a movie with its genre and term links, as import_data would."""
+    movie = Movie.objects.create(title=title, **fields)
+    movie.genres.set([Genre.objects.get_or_create(name=name)[0] for name in genres])
+    link_movie_terms([movie])
+    return movie
+
+
+def make_user(username='alice'):
+    # No password: the API tests authenticate with force_authenticate
+    return User.objects.create(username=username)
+
+
+def authenticated_client(user):
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
+
+
+class KeywordIndexTests(RecommenderDataMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.space = make_movie('Space', keywords='space-alien-robot')
+        self.aliens = make_movie('Aliens', keywords='space-alien')
+        self.robots = make_movie('Robots', keywords='robot')
+        self.romance = make_movie('Romance', keywords='love')
+
+    def test_similar_ranks_by_shared_keywords(self):
+        build_keyword_index()
+        similar = load_keyword_index().similar(self.space.id, limit=3)
+        # Romance shares no keyword, so it is no neighbor at any score
+        self.assertEqual([movie_id for movie_id, _ in similar], [self.aliens.id, self.robots.id])
+
+    def test_unknown_movie(self):
+        build_keyword_index()
+        self.assertIsNone(load_keyword_index().similar(0))
+
+    def test_similar_to_keywords_matches_an_indexed_movie(self):
+        build_keyword_index()
+        index = load_keyword_index()
+        keyword_ids = list(self.space.keyword_terms.values_list('id', flat=True))
+        by_keywords = index.similar_to_keywords(keyword_ids, limit=4)
+        # The movie itself scores 1, then the same neighbors with the same scores
+        self.assertEqual(by_keywords[0][0], self.space.id)
+        self.assertAlmostEqual(by_keywords[0][1], 1.0, places=5)
+        for (movie_id, score), (expected_id, expected_score) in zip(by_keywords[1:], index.similar(self.space.id)):
+            self.assertEqual(movie_id, expected_id)
+            self.assertAlmostEqual(score, expected_score, places=5)
+
+    def test_view_scores_only_movies_added_since_the_build(self):
+        response = APIClient().get(f'/recommendations/similarity/{self.space.id}/')
+        self.assertEqual(response.status_code, 503)
+
+        build_keyword_index()
+        # Indexed without stored neighbors: the build found none
+        response = APIClient().get(f'/recommendations/similarity/{self.romance.id}/')
+        self.assertEqual((response.status_code, response.json()), (200, []))
+
+        sequel = make_movie('Space 2', keywords='space-alien-laser')
+        response = APIClient().get(f'/recommendations/similarity/{sequel.id}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([movie['id'] for movie in response.json()], [self.aliens.id, self.space.id])
+        self.assertEqual(APIClient().get('/recommendations/similarity/0/').status_code, 404)
+
+
+class SimilarMoviesTests(RecommenderDataMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.space = make_movie('Space', keywords='space-alien-robot')
+        self.aliens = make_movie('Aliens', keywords='space-alien')
+        self.robots = make_movie('Robots', keywords='robot')
+        build_keyword_index()
+
+    def neighbors(self, movie):
+        return list(SimilarMovie.objects.filter(movie=movie).order_by('rank').values_list('similar_id', flat=True))
+
+    def test_full_refresh_stores_ranked_neighbors(self):
+        self.assertEqual(refresh_similar_movies(top_k=2), 3)
+        self.assertEqual(self.neighbors(self.space), [self.aliens.id, self.robots.id])
+        # Movies sharing no keyword are not stored as neighbors
+        self.assertEqual(self.neighbors(self.aliens), [self.space.id])
+
+    def test_incremental_refresh_updates_affected_movies(self):
+        refresh_similar_movies(top_k=2)
+        twin = make_movie('Aliens 2', keywords='space-alien')
+        build_keyword_index()
+
+        refresh_similar_movies(movie_ids=[twin.id], top_k=2)
+        self.assertEqual(self.neighbors(twin)[0], self.aliens.id)
+        self.assertEqual(self.neighbors(self.aliens), [twin.id, self.space.id])
+
+    def test_view_serves_stored_neighbors(self):
+        refresh_similar_movies(top_k=2)
+        response = APIClient().get(f'/recommendations/similarity/{self.space.id}/')
+        self.assertEqual([movie['id'] for movie in response.json()], [self.aliens.id, self.robots.id])
+
+
+class AssociationRulesTests(TestCase):
+    def setUp(self):
+        self.a, self.b, self.c = (make_movie(title) for title in 'ABC')
+        # Everyone who watched A also watched B; C is watched alone
+        for username, movies in [('u1', [self.a, self.b]), ('u2', [self.a, self.b]), ('u3', [self.b]), ('u4', [self.c])]:
+            user = make_user(username)
+            WatchedList.objects.bulk_create([WatchedList(user=user, movie=movie) for movie in movies])
+
+    def test_mined_rules(self):
+        rule_set, count = mine_association_rules(min_support=0.5, min_confidence=0.5)
+        self.assertEqual((rule_set.transactions, count), (4, 2))
+        rule = AssociationRule.objects.get(antecedent=self.a)
+        self.assertEqual(rule.consequent_id, self.b.id)
+        self.assertEqual((rule.support, rule.confidence), (0.5, 1.0))
+        self.assertAlmostEqual(rule.lift, 4 / 3)
+
+    def test_new_rule_set_replaces_the_previous_one(self):
+        first, _ = mine_association_rules(min_support=0.5)
+        second, _ = mine_association_rules(min_support=0.5)
+        self.assertEqual(active_rule_set(), second)
+        self.assertFalse(AssociationRule.objects.filter(rule_set=first).exists())
+
+    def test_view(self):
+        self.assertEqual(APIClient().get('/recommendations/apriori/').status_code, 503)
+
+        rule_set, _ = mine_association_rules(min_support=0.5, min_confidence=0.5)
+        response = APIClient().get(f'/recommendations/apriori/{self.a.id}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['version'], rule_set.pk)
+        self.assertEqual([rule['movie_id'] for rule in response.json()['recommendations']], [self.b.id])
+        self.assertEqual(APIClient().get(f'/recommendations/apriori/{self.c.id}/').json()['recommendations'], [])
+
+    def test_view_limits_rules_per_movie(self):
+        d = make_movie('D')
+        rule_set, _ = mine_association_rules(min_support=0.5, min_confidence=0.5)
+        AssociationRule.objects.bulk_create([
+            AssociationRule(rule_set=rule_set, antecedent=self.a, consequent=consequent, support=0.25, confidence=confidence, lift=1.0)
+            for consequent, confidence in [(self.c, 0.9), (d, 0.8)]
+        ])
+        recommendations = APIClient().get('/recommendations/apriori/?limit=2').json()['recommendations']
+        self.assertEqual([rule['movie_id'] for rule in recommendations[str(self.a.id)]], [self.b.id, self.c.id])
+        self.assertEqual([rule['movie_id'] for rule in recommendations[str(self.b.id)]], [self.a.id])
+        response = APIClient().get(f'/recommendations/apriori/{self.a.id}/?limit=1')
+        self.assertEqual([rule['movie_id'] for rule in response.json()['recommendations']], [self.b.id])
+        self.assertEqual(APIClient().get('/recommendations/apriori/?limit=all').status_code, 400)
+
+
+class ItemsetTests(SimpleTestCase):
+    TRANSACTIONS = {1: [10, 20, 30], 2: [10, 20, 30], 3: [10, 20], 4: [20, 30], 5: [40]}
+
+    def brute_force(self, min_count):
+        # Every itemset counted directly from the transactions
+        counts = {}
+        for movies in self.TRANSACTIONS.values():
+            for size in range(1, len(movies) + 1):
+                for itemset in combinations(sorted(movies), size):
+                    counts[itemset] = counts.get(itemset, 0) + 1
+        return {itemset: count for itemset, count in counts.items() if count >= min_count}
+
+    def mine(self, min_support, **kwargs):
+        pairs = [(user, movie) for user, movies in self.TRANSACTIONS.items() for movie in movies]
+        # A duplicate watched entry must not count twice
+        pairs.append((1, 10))
+        matrix, _, movie_ids = user_movie_matrix(pairs)
+        itemsets = frequent_itemsets(matrix, min_support, chunk_size=2, **kwargs)
+        return {tuple(int(movie_ids[i]) for i in itemset): count for itemset, count in itemsets.items()}
+
+    def test_matches_brute_force(self):
+        for min_support in (0.2, 0.4, 0.6):
+            self.assertEqual(self.mine(min_support), self.brute_force(np.ceil(min_support * 5)))
+
+    def test_max_len(self):
+        self.assertEqual(max(map(len, self.mine(0.4, max_len=2))), 2)
+
+    def test_rules(self):
+        itemsets = self.brute_force(2)
+        rules = {(antecedent, consequent): (confidence, lift) for antecedent, consequent, _, confidence, lift in single_consequent_rules(itemsets, 5)}
+        confidence, lift = rules[((10,), 20)]
+        self.assertEqual(confidence, 1.0)
+        self.assertAlmostEqual(lift, 1 / (4 / 5))
+        self.assertEqual(rules[((20, 30), 10)][0], 2 / 3)
+
+
+def rate(user, ratings):
+    Rating.objects.bulk_create([Rating(user=user, movie=movie, rating=value) for movie, value in ratings])
+
+
+class ItemCFTests(RecommenderDataMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.a, self.b, self.c = (make_movie(title) for title in 'ABC')
+        # A and B are rated alike, C the opposite way
+        rate(make_user('u1'), [(self.a, 5.0), (self.b, 5.0), (self.c, 1.0)])
+        rate(make_user('u2'), [(self.a, 4.0), (self.b, 4.5), (self.c, 2.0)])
+        rate(make_user('u3'), [(self.a, 1.0), (self.b, 1.5), (self.c, 5.0)])
+
+    def test_neighborhoods_use_adjusted_cosine(self):
+        self.assertEqual(build_item_cf(top_k=2), (3, 9))
+        arrays, _ = load_arrays('item_cf')
+        row_a = list(arrays['movie_ids']).index(self.a.id)
+        # Only positive neighbors are kept: A's single neighbor is B
+        self.assertEqual(list(arrays['movie_ids'][arrays['neighbors'][row_a][arrays['neighbors'][row_a] >= 0]]), [self.b.id])
+
+        ratings = np.array([[5, 5, 1], [4, 4.5, 2], [1, 1.5, 5]])
+        centred = ratings - ratings.mean(axis=1, keepdims=True)
+        expected = centred[:, 0] @ centred[:, 1] / np.linalg.norm(centred[:, 0]) / np.linalg.norm(centred[:, 1])
+        self.assertAlmostEqual(float(arrays['similarities'][row_a][0]), expected, places=5)
+
+    def test_recommend_for_user(self):
+        user = make_user('target')
+        self.assertIsNone(recommend_for_user(user))
+
+        build_item_cf(top_k=2)
+        self.assertEqual(recommend_for_user(user), [])
+        rate(user, [(self.a, 5.0), (self.c, 1.0)])
+        [(movie_id, predicted)] = recommend_for_user(user)
+        self.assertEqual(movie_id, self.b.id)
+        self.assertAlmostEqual(predicted, 5.0)
+
+    def test_view(self):
+        user = make_user('target')
+        client = authenticated_client(user)
+        self.assertEqual(client.get('/recommendations/item-cf/').status_code, 503)
+
+        build_item_cf(top_k=2)
+        rate(user, [(self.a, 5.0)])
+        self.assertEqual([movie['id'] for movie in client.get('/recommendations/item-cf/').json()], [self.b.id])
+
+
+class ALSTests(RecommenderDataMixin, TestCase):
+    def test_solve_matches_dense_weighted_least_squares(self):
+        rng = np.random.default_rng(1)
+        confidence = csr_matrix(np.array([[3.0, 0, 2.0], [0, 5.0, 0]]))
+        fixed = rng.normal(size=(3, 2))
+        solved = _solve_rows(confidence, fixed, fixed.T @ fixed, 0.1, [0, 1])
+
+        for row in range(2):
+            weights = np.diag(np.maximum(confidence[row].toarray().ravel(), 1))
+            preference = (confidence[row].toarray().ravel() > 0).astype(float)
+            expected = np.linalg.solve(fixed.T @ weights @ fixed + 0.1 * np.eye(2), fixed.T @ weights @ preference)
+            np.testing.assert_allclose(solved[row], expected)
+
+    def test_recommends_what_similar_users_watched(self):
+        action = [make_movie(f'Action {i}') for i in range(3)]
+        drama = [make_movie(f'Drama {i}') for i in range(3)]
+        for i in range(8):
+            user, movies = make_user(f'user{i}'), action if i < 4 else drama
+            WatchedList.objects.bulk_create([WatchedList(user=user, movie=movie) for movie in movies])
+        fan = make_user('fan')
+        WatchedList.objects.bulk_create([WatchedList(user=fan, movie=movie) for movie in action[:2]])
+        newcomer = make_user('newcomer')
+
+        self.assertIsNone(recommend_personal(fan))
+        self.assertEqual(train_als(factors=4, iterations=10, workers=1), (9, 6, 26))
+        scored = recommend_personal(fan, limit=6)
+        # Watched movies are excluded and the unseen action movie comes first
+        self.assertEqual(len(scored), 4)
+        self.assertEqual(scored[0][0], action[2].id)
+        self.assertEqual(recommend_personal(newcomer), [])
+
+
+class GenreProfileTests(TestCase):
+    def setUp(self):
+        self.user = make_user()
+        self.action = make_movie('Action', genres=['Action'])
+        self.buddy = make_movie('Buddy', genres=['Action', 'Comedy'])
+        self.drama = make_movie('Drama', genres=['Drama'])
+        self.ids = dict(Genre.objects.values_list('name', 'id'))
+
+    def watch(self, *movies):
+        WatchedList.objects.bulk_create([WatchedList(user=self.user, movie=movie) for movie in movies])
+        adjust_genre_profile(self.user, [movie.id for movie in movies], 1)
+
+    def test_adjust_matches_rebuild(self):
+        self.watch(self.action, self.buddy)
+        self.assertEqual(genre_weights(self.user), {self.ids['Action']: 2, self.ids['Comedy']: 1})
+
+        WatchedList.objects.filter(movie=self.buddy).delete()
+        adjust_genre_profile(self.user, [self.buddy.id], -1)
+        adjusted = genre_weights(self.user)
+        rebuild_genre_profiles([self.user.id])
+        self.assertEqual(genre_weights(self.user), adjusted)
+
+    def test_genre_change_rebuilds_watchers(self):
+        self.watch(self.action)
+        self.action.genres.set([Genre.objects.get(name='Drama')])
+        enqueue('rebuild_genre_profiles', movie_ids=[self.action.id])
+        run_jobs()
+        self.assertEqual(genre_weights(self.user), {self.ids['Drama']: 1})
+
+    def test_admin_genre_edit_enqueues_rebuild(self):
+        admin = User.objects.create_superuser(username='admin', password='pw12345!x')
+        client = APIClient()
+        client.force_login(admin)
+        response = client.post(f'/admin/movie/movie/{self.action.id}/change/', {
+            'title': 'Action', 'description': 'An action movie', 'release_date': '2020-01-01', 'genres': [self.ids['Drama']],
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Job.objects.get(name='rebuild_genre_profiles').kwargs, {'movie_ids': [self.action.id]})
+
+    def test_view_ranks_by_profile_and_favorites(self):
+        self.watch(self.action)
+        client = authenticated_client(self.user)
+        self.assertEqual([movie['id'] for movie in client.get('/recommendations/genre/').json()], [self.buddy.id])
+
+        # A favorite genre outranks one that is only watched
+        self.user.favorite_genres.add(self.ids['Comedy'])
+        self.watch(self.drama)
+        self.assertEqual([movie['id'] for movie in client.get('/recommendations/genre/').json()], [self.buddy.id])
+
+
+class GenreRecommendationTests(RecommenderDataMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = make_user()
+        self.client = authenticated_client(self.user)
+        movies = {}
+        for i, genres in enumerate([['Drama'], ['Drama', 'Comedy'], ['Comedy'], ['Horror'], ['Drama'], ['Comedy'], ['Drama', 'Horror']]):
+            movies[i] = make_movie(f'Movie {i}', genres=genres)
+        apply_rating_changes([(movies[i].id, None, score) for i, score in [(1, 2.0), (2, 5.0), (4, 4.0), (6, 1.0)]])
+        WatchedList.objects.create(user=self.user, movie=movies[0])
+        WatchedList.objects.create(user=self.user, movie=movies[3])
+        rebuild_genre_profiles()
+        self.user.favorite_genres.add(Genre.objects.get(name='Comedy'))
+
+    def recommended(self):
+        return [movie['id'] for movie in self.client.get('/recommendations/genre/').data]
+
+    def test_snapshot_ranking_matches_the_database(self):
+        expected = self.recommended()
+        self.assertEqual(len(expected), 5)
+        build_catalog_snapshot()
+        with mock.patch.object(Movie.objects, 'filter', side_effect=AssertionError('ranked in SQL')):
+            self.assertEqual(self.recommended(), expected)
+
+    def test_catalog_changes_fall_back_and_rebuild_the_snapshot(self):
+        build_catalog_snapshot()
+        bump_catalog()
+        self.assertFalse(load_catalog_snapshot().is_current(ratings=False))
+        self.assertTrue(Job.objects.filter(name='build_catalog_snapshot').exists())
+        self.assertEqual(len(self.recommended()), 5)
+
+@override_settings(RATING_PRIOR_MEAN=3.0, RATING_PRIOR_WEIGHT=2)
+class RatingStatsTests(TestCase):
+    def setUp(self):
+        self.movie = make_movie('Rated')
+        self.other = make_movie('Other')
+
+    def stats(self, movie):
+        return MovieRatingStats.objects.values_list('rating_sum', 'rating_count', 'rating_avg', 'bayesian_score').get(movie=movie)
+
+    def test_deltas(self):
+        apply_rating_changes([(self.movie.id, None, 5.0), (self.movie.id, None, 4.0), (self.other.id, None, 1.0)])
+        self.assertEqual(self.stats(self.movie), (9.0, 2, 4.5, (2 * 3.0 + 9.0) / 4))
+
+        # An update is an old value out and a new one in; removing the last rating clears the scores
+        apply_rating_changes([(self.movie.id, 4.0, 2.0), (self.other.id, 1.0, None)])
+        self.assertEqual(self.stats(self.movie), (7.0, 2, 3.5, (2 * 3.0 + 7.0) / 4))
+        self.assertEqual(self.stats(self.other), (0, 0, None, None))
+
+    def test_rate_movie_keeps_aggregates_in_sync(self):
+        client = authenticated_client(make_user())
+        self.assertEqual(client.post(f'/ratings/rate-movie/{self.movie.id}/', {'rating': 4.0}).status_code, 201)
+        self.assertEqual(client.post(f'/ratings/rate-movie/{self.movie.id}/', {'rating': 2.0}).status_code, 200)
+        self.assertEqual(client.post(f'/ratings/rate-movie/{self.movie.id}/', {'rating': 2.2}).status_code, 400)
+        self.assertEqual(self.stats(self.movie)[:2], (2.0, 1))
+
+    def test_deleting_a_user_discounts_their_ratings(self):
+        alice, bob = make_user('alice'), make_user('bob')
+        rate(alice, [(self.movie, 5.0)])
+        rate(bob, [(self.movie, 3.0)])
+        rebuild_rating_stats()
+
+        alice.delete()
+        self.assertEqual(self.stats(self.movie)[:2], (3.0, 1))
+        incremental = self.stats(self.movie)
+        rebuild_rating_stats()
+        self.assertEqual(self.stats(self.movie), incremental)
+
+
+class AverageRatingListTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        movies = [make_movie(f'Movie {i}') for i in range(7)]
+        apply_rating_changes([(movie.id, None, score) for movie, score in zip(movies, [4, 4, 4, 3, 3, 5, 1])])
+
+    def pages(self, url):
+        seen = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            seen += [(row['avg_rating'], row['movie']) for row in response.data['results']]
+            url = response.data['next']
+        return seen
+
+    def test_pages_cover_ties_exactly_once(self):
+        seen = self.pages('/average-ratings/?page_size=2')
+        self.assertEqual(seen, sorted(seen, reverse=True))
+        self.assertEqual(len(set(seen)), 7)
+
+    def test_new_ties_between_pages_do_not_shift_rows(self):
+        first = self.client.get('/average-ratings/?page_size=3').data
+        # A new movie tying the last served one sorts before it, which shifted an offset cursor
+        tie = make_movie('Newcomer')
+        apply_rating_changes([(tie.id, None, first['results'][-1]['avg_rating'])])
+        rest = self.pages(first['next'])
+        served = [row['movie'] for row in first['results']] + [movie for _, movie in rest]
+        self.assertEqual(sorted(served), sorted(set(served)))
+        self.assertEqual(len(served), 7)
+
+    def test_malformed_cursor_is_not_found(self):
+        self.assertEqual(self.client.get('/average-ratings/?cursor=bogus').status_code, 404)
+
+    def test_etag_follows_ratings_and_catalog(self):
+        etag = self.client.get('/average-ratings/?genre=drama')['ETag']
+        self.assertEqual(self.client.get('/average-ratings/?genre=drama', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        # Retagging a movie's genres changes the ?genre= results
+        bump_catalog()
+        response = self.client.get('/average-ratings/?genre=drama', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        apply_rating_changes([(Movie.objects.first().id, None, 2.0)])
+        self.assertEqual(self.client.get('/average-ratings/?genre=drama', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_invalid_min_count(self):
+        response = self.client.get('/average-ratings/?min_count=many')
+        self.assertEqual((response.status_code, response.data), (400, {'error': 'min_count must be an integer'}))
+        self.assertEqual(len(self.client.get('/average-ratings/?min_count=2').data['results']), 0)
+
+
+@override_settings(RATING_PRIOR_WEIGHT=0)
+class ChartTests(RecommenderDataMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.drama = make_movie('Drama', genres=['Drama'], release_date='1994-01-01')
+        self.comedy = make_movie('Comedy', genres=['Comedy'], release_date='2003-01-01')
+        apply_rating_changes([(self.drama.id, None, 5.0), (self.comedy.id, None, 4.0)])
+        self.client = authenticated_client(make_user())
+
+    def test_charts_by_kind(self):
+        save_charts()
+        self.assertEqual(get_chart('overall'), (self.drama.id, self.comedy.id))
+        self.assertEqual(get_chart('genre:comedy'), (self.comedy.id,))
+        self.assertEqual(get_chart('decade:1990'), (self.drama.id,))
+        self.assertIsNone(get_chart('genre:western'))
+
+    def test_requests_serve_the_last_build_until_the_job_runs(self):
+        self.assertEqual(get_chart('overall'), (self.drama.id, self.comedy.id))
+        response = self.client.post(f'/movies/{self.drama.id}/rate/', {'rating': 1.0})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(get_chart('overall'), (self.drama.id, self.comedy.id))
+        self.assertTrue(Job.objects.filter(name='build_charts', status=Job.PENDING).exists())
+
+        Job.objects.update(run_at=timezone.now())
+        run_jobs(batch_size=10)
+        self.assertEqual(get_chart('overall'), (self.comedy.id, self.drama.id))
+
+    def test_limit(self):
+        def ids(response):
+            return [movie['id'] for movie in response.data]
+
+        self.assertEqual(ids(self.client.get('/recommendations/rating/?limit=-5')), [self.drama.id])
+        self.assertEqual(ids(self.client.get('/recommendations/rating/?limit=0')), [self.drama.id])
+        self.assertEqual(self.client.get('/recommendations/rating/?limit=many').status_code, 400)
+
+
+class MovieSearchTests(CatalogCacheMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.in_title = make_movie('Harbor Lights', description='A quiet film.')
+        self.in_description = [make_movie(f'Film {i}', description='Set around an old harbor.') for i in range(5)]
+        make_movie('Unrelated', description='Nothing to see.')
+
+    def test_ranked_pages_are_counted_and_sliced_in_sql(self):
+        first = self.client.get('/movies/?search=harb&page_size=4').data
+        self.assertEqual(first['count'], 6)
+        self.assertEqual(first['results'][0]['id'], self.in_title.id)
+        second = self.client.get(first['next']).data
+        served = [movie['id'] for movie in first['results'] + second['results']]
+        self.assertEqual(sorted(served), sorted([self.in_title.id] + [movie.id for movie in self.in_description]))
+
+    def test_ordering_overrides_rank(self):
+        results = self.client.get('/movies/?search=harbor&ordering=-title&page_size=10').data['results']
+        self.assertEqual([movie['title'] for movie in results], ['Harbor Lights'] + [f'Film {i}' for i in range(4, -1, -1)])
+
+    def test_empty_expression(self):
+        self.assertEqual(self.client.get('/movies/?search=%20!').data['count'], 0)
+
+
+class MovieFilterTests(CatalogCacheMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.pixar = make_movie('Toy Story', production_companies='Pixar-Disney', credit='Tom Hanks-Tim Allen')
+        self.ghibli = make_movie('Totoro', production_companies='Studio Ghibli', credit='Noriko Hidaka')
+        make_movie('Other', production_companies='Pixar Animation', credit='Tom Hanks Jr')
+
+    def ids(self, query):
+        return sorted(movie['id'] for movie in self.client.get(f'/movies/?{query}').data['results'])
+
+    def test_names_match_whole_and_case_insensitively(self):
+        self.assertEqual(self.ids('production_companies=pixar'), [self.pixar.id])
+        self.assertEqual(self.ids('credit=TOM HANKS'), [self.pixar.id])
+        self.assertEqual(self.ids('production_companies=disney-studio ghibli'), [self.pixar.id, self.ghibli.id])
+        self.assertEqual(self.ids('credit=tom hanks-tim allen'), [self.pixar.id])
+
+    def test_filters_use_the_name_indexes(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get('/movies/?credit=Tom Hanks&production_companies=Pixar')
+        query = next(query['sql'] for query in queries if 'movie_moviecredit' in query['sql'])
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {query}')
+            plan = ' '.join(row[-1] for row in cursor.fetchall())
+        self.assertNotIn('SCAN movie_moviecredit', plan)
+        self.assertNotIn('SCAN movie_moviecompany', plan)
+
+
+class MovieRepresentationTests(CatalogCacheMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        for i in range(6):
+            make_movie(f'Movie {i}', genres=['Drama', 'Comedy'], description='Long text.', release_date='2000-01-01')
+
+    def queries(self, url):
+        catalog_cache._version = None
+        with CaptureQueriesContext(connection) as context:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        return len(context)
+
+    def test_genres_are_prefetched(self):
+        self.assertEqual(self.queries('/movies/?page_size=2'), self.queries('/movies/?page_size=6'))
+
+    def test_sparse_fields(self):
+        with CaptureQueriesContext(connection) as context:
+            results = self.client.get('/movies/?fields=title,nonsense').data['results']
+        self.assertEqual(set(results[0]), {'title'})
+        self.assertNotIn('description', context.captured_queries[-1]['sql'])
+
+    def test_card_view(self):
+        card = self.client.get('/movies/?view=card&fields=description').data['results'][0]
+        self.assertEqual(set(card), {'id', 'title', 'poster_url', 'release_date', 'genres'})
+        self.assertEqual(len(card['genres']), 2)
+
+
+class KeysetPaginationTests(CatalogCacheMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        dates = ['2001-01-01', '1999-05-01', '2001-01-01', None, '2010-03-03', None, '2001-01-01']
+        self.movies = [make_movie(f'Movie {i}', description='Text.', release_date=date) for i, date in enumerate(dates)]
+
+    def walk(self, url):
+        pages, served = 0, []
+        while url:
+            data = self.client.get(url).data
+            self.assertNotIn('previous', data)
+            served += [movie['id'] for movie in data['results']]
+            url, pages = data['next'], pages + 1
+        return pages, served
+
+    def expected(self, descending):
+        dated = [movie for movie in self.movies if movie.release_date]
+        ordered = sorted(dated, key=attrgetter('release_date', 'id'), reverse=descending)
+        return [movie.id for movie in ordered] + sorted((movie.id for movie in self.movies if not movie.release_date), reverse=descending)
+
+    def test_ties_and_nulls_across_page_boundaries(self):
+        for ordering in ('release_date', '-release_date'):
+            with self.subTest(ordering=ordering):
+                # ?fields= defers release_date, which the cursor still needs
+                pages, served = self.walk(f'/movies/?cursor=&ordering={ordering}&fields=id,title&page_size=2')
+                self.assertEqual(served, self.expected(ordering.startswith('-')))
+                self.assertEqual(pages, 4)
+
+    def test_exact_last_page_has_no_next(self):
+        pages, served = self.walk('/movies/?cursor=&page_size=7')
+        self.assertEqual((pages, served), (1, [movie.id for movie in self.movies]))
+
+    def test_default_keeps_page_numbers(self):
+        data = self.client.get('/movies/?page_size=3').data
+        self.assertEqual(set(data), {'count', 'next', 'previous', 'results'})
+        self.assertEqual(data['count'], 7)
+
+    def test_count_and_invalid_cursor(self):
+        self.assertEqual(self.client.get('/movies/?cursor=&count=1').data['count'], 7)
+        self.assertEqual(self.client.get('/movies/?cursor=e30=').status_code, 404)
+
+    def test_counts_are_cached_per_endpoint(self):
+        apply_rating_changes([(self.movies[0].id, None, 4.0), (self.movies[1].id, None, 3.0)])
+        self.assertEqual(self.client.get('/average-ratings/?cursor=&count=1').data['count'], 2)
+        self.assertEqual(self.client.get('/movies/?cursor=&count=1').data['count'], 7)
+        # A new rating changes the average-ratings count, not the catalog version
+        apply_rating_changes([(self.movies[2].id, None, 5.0)])
+        self.assertEqual(self.client.get('/average-ratings/?cursor=&count=1').data['count'], 3)
+        self.assertEqual(self.client.get('/movies/?cursor=&count=1').data['count'], 7)
+
+
+class MovieDetailCacheTests(CatalogCacheMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.movie = make_movie('Cached', genres=['Drama'], description='Text.')
+
+    def test_representations_are_cached_apart(self):
+        full = self.client.get(f'/movies/{self.movie.id}/')
+        self.assertEqual(full['X-Cache'], 'MISS')
+        self.assertIn('description', full.data)
+
+        # The viewset's full representation is the detail view's entry
+        self.assertEqual(self.client.get(f'/movies/{self.movie.id}.json')['X-Cache'], 'HIT')
+
+        card = self.client.get(f'/movies/{self.movie.id}.json?view=card')
+        self.assertEqual((card['X-Cache'], set(card.data)), ('MISS', {'id', 'title', 'poster_url', 'release_date', 'genres'}))
+        sparse = self.client.get(f'/movies/{self.movie.id}.json?fields=title')
+        self.assertEqual((sparse['X-Cache'], sparse.data), ('MISS', {'title': 'Cached'}))
+        self.assertEqual(self.client.get(f'/movies/{self.movie.id}.json?fields=title')['X-Cache'], 'HIT')
+
+    def test_stats_count_hits_and_misses(self):
+        staff = authenticated_client(User.objects.create(username='staff', is_staff=True))
+        self.assertEqual(staff.get('/catalog-cache/stats/').data, {'hits': 0, 'misses': 0, 'hit_rate': None})
+
+        for _ in range(3):
+            self.client.get(f'/movies/{self.movie.id}/')
+        # The page and its count are two more misses
+        self.client.get('/movies/?cursor=&count=1')
+        self.assertEqual(staff.get('/catalog-cache/stats/').data, {'hits': 2, 'misses': 3, 'hit_rate': 0.4})
+        self.assertEqual(authenticated_client(make_user()).get('/catalog-cache/stats/').status_code, 403)
+
+
+CSV_HEADER = 'id,title,genres,original_language,overview,production_companies,release_date,runtime,status,credits,keywords,poster_path\n'
+
+
+class ImportTests(CatalogCacheMixin, TestCase):
+    def write_csv(self, rows):
+        csv_file = tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False)
+        self.addCleanup(os.unlink, csv_file.name)
+        with csv_file:
+            csv_file.write(CSV_HEADER + ''.join(row + '\n' for row in rows))
+        return csv_file.name
+
+    def import_file(self, path, *args):
+        out = StringIO()
+        call_command('import_data', '--file', path, '--chunk-size', '2', *args, stdout=out)
+        self.assertNotIn('An error occurred', out.getvalue())
+        return out.getvalue()
+
+    def test_import(self):
+        path = self.write_csv([
+            '11,Star Wars,Adventure-Action,en,Rebels fight.,Lucasfilm,1977-05-25,121,Released,Mark Hamill-Harrison Ford,space,/sw.jpg',
+            '12,Finding Nemo,Animation,en,A fish is lost.,Pixar,2003-05-30,,Released,Albert Brooks,ocean,',
+            '13,Undated,Drama-Action,fr,,,not a date,-5,,,,',
+        ])
+        self.import_file(path)
+
+        movies = {movie.source_id: movie for movie in Movie.objects.prefetch_related('genres')}
+        self.assertEqual(sorted(movies), [11, 12, 13])
+        star_wars = movies[11]
+        self.assertEqual((star_wars.release_date.isoformat(), star_wars.runtime, star_wars.poster_url), ('1977-05-25', 121, '/sw.jpg'))
+        self.assertEqual(sorted(genre.name for genre in star_wars.genres.all()), ['Action', 'Adventure'])
+        self.assertEqual((movies[13].release_date, movies[13].runtime, movies[13].description), (None, 1, ''))
+        self.assertEqual(Genre.objects.filter(name='Action').count(), 1)
+        self.assertEqual(sorted(star_wars.people.values_list('name', flat=True)), ['Harrison Ford', 'Mark Hamill'])
+        self.assertTrue(Company.objects.filter(name='Pixar').exists())
+
+        # The search index is written once after the rows
+        self.assertEqual([movie['title'] for movie in APIClient().get('/movies/?search=nemo').data['results']], ['Finding Nemo'])
+        self.assertTrue(Job.objects.filter(name='refresh_similar_movies').exists())
+
+    def test_reimport_skips_known_source_ids(self):
+        rows = ['21,First,Drama,en,One.,,2001-01-01,90,,,,', '22,Second,Drama,en,Two.,,2002-01-01,90,,,,']
+        self.import_file(self.write_csv(rows))
+        # Repeated within the file, across chunks, and already stored
+        output = self.import_file(self.write_csv(rows + ['23,Third,,en,Three.,,,,,,,', '23,Third again,,en,,,,,,,,', ',No id,,en,,,,,,,,']))
+        self.assertIn('2 movies inserted, 0 updated, 3 skipped', output)
+        self.assertEqual(list(Movie.objects.order_by('id').values_list('source_id', 'title')), [
+            (21, 'First'), (22, 'Second'), (23, 'Third'), (None, 'No id'),
+        ])
+
+    def test_upsert(self):
+        self.import_file(self.write_csv([
+            '31,Kept,Drama,en,Same.,,2001-01-01,90,,Ann Actor,,',
+            '32,Old title,Drama-Comedy,en,Old.,,2002-01-01,90,,Ann Actor,,',
+        ]))
+        kept, changed = Movie.objects.order_by('source_id')
+        user = make_user()
+        WatchedList.objects.create(user=user, movie=changed)
+        Job.objects.all().delete()
+
+        output = self.import_file(self.write_csv([
+            '31,Kept,Drama,en,Same.,,2001-01-01,90,,Ann Actor,,',
+            '32,New title,Comedy-Horror,en,New.,,2002-01-01,95,,Bob Actor,,',
+            '33,Added,,en,Added.,,,,,,,',
+        ]), '--upsert')
+        self.assertIn('1 movies inserted, 1 updated', output)
+
+        changed.refresh_from_db()
+        self.assertEqual((changed.title, changed.runtime), ('New title', 95))
+        self.assertEqual(sorted(changed.genres.values_list('name', flat=True)), ['Comedy', 'Horror'])
+        self.assertEqual(list(changed.people.values_list('name', flat=True)), ['Bob Actor'])
+        self.assertEqual(Movie.objects.get(pk=kept.pk).title, 'Kept')
+        # Ids and user data survive; the watcher's genre profile is rebuilt
+        self.assertEqual(list(user.watched.values_list('movie_id', flat=True)), [changed.id])
+        self.assertEqual(Job.objects.get(name='rebuild_genre_profiles').kwargs, {'movie_ids': [changed.id]})
+        # New movies are found by id range rather than listed
+        self.assertEqual(Job.objects.get(name='refresh_similar_movies').kwargs, {'after_id': changed.id, 'movie_ids': [changed.id]})
+
+    def test_upsert_matches_movies_imported_without_source_id(self):
+        legacy = make_movie('Legacy', description='Old.', release_date='2001-01-01')
+        remake = make_movie('Legacy', description='Old.', release_date='1960-01-01')
+        output = self.import_file(self.write_csv([
+            '51,Legacy,Drama,en,New.,,2001-01-01,90,,,,',
+            '52,Legacy,Drama,en,Remade.,,2021-01-01,90,,,,',
+        ]), '--upsert')
+        self.assertIn('1 movies inserted, 1 updated', output)
+        legacy.refresh_from_db()
+        self.assertEqual((legacy.source_id, legacy.description), (51, 'New.'))
+        self.assertIsNone(Movie.objects.get(pk=remake.pk).source_id)
+        self.assertEqual(Movie.objects.filter(title='Legacy').count(), 3)
+
+    def test_columnar_output_is_typed_and_imports_like_the_csv(self):
+        import pyarrow.parquet
+
+        path = self.write_csv([
+            '41,Typed,Drama,en,Text.,Studio,1999-12-31,101,Released,Ann Actor,word,/p.jpg',
+            '42,Untyped,,en,,,someday,,,,,/q.jpg',
+            'x,Bad id,,en,,,,abc,,,,/r.jpg',
+        ])
+        parsed_csv = [row for chunk in parsing.read_chunks(path, 10) for row in parsing.parse_chunk(chunk)]
+        for suffix in ('.parquet', '.feather'):
+            with self.subTest(suffix=suffix):
+                output = path + suffix
+                self.addCleanup(os.unlink, output)
+                call_command('csv', '--file_path', path, '--output', output, '--chunk-size', '2', stdout=StringIO())
+                if suffix == '.parquet':
+                    schema = pyarrow.parquet.read_schema(output)
+                    self.assertEqual(
+                        [str(schema.field(column).type) for column in ('id', 'release_date', 'runtime', 'title')],
+                        ['int64', 'date32[day]', 'int64', 'string'],
+                    )
+                parsed = [row for chunk in parsing.read_chunks(output, 10) for row in parsing.parse_chunk(chunk)]
+                self.assertEqual(parsed, parsed_csv)
+
+    def test_csv_command_rejects_an_empty_file(self):
+        empty = tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False)
+        empty.close()
+        self.addCleanup(os.unlink, empty.name)
+        with self.assertRaisesMessage(CommandError, 'is empty'):
+            call_command('csv', '--file_path', empty.name, '--output', empty.name + '.out.csv', stdout=StringIO())
+
+
+class CsvRangeTests(SimpleTestCase):
+    def setUp(self):
+        rows = []
+        for i in range(40):
+            # Quoted commas, escaped quotes and newlines inside fields must not split a record
+            overview = f'"Line one of {i},\nline ""two""\n"' if i % 3 == 0 else f'Plain {i}'
+            rows.append(f'{i},Movie {i},Drama-Comedy,{overview},2000-01-{i % 28 + 1:02d},{i}')
+        csv_file = tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False)
+        self.addCleanup(os.unlink, csv_file.name)
+        with csv_file:
+            csv_file.write('id,title,genres,overview,release_date,runtime\n' + '\n'.join(rows))
+        self.path = csv_file.name
+        self.expected = parsing.parse_chunk(next(parsing.read_chunks(self.path, 1000)))
+
+    def test_ranges_end_on_record_boundaries(self):
+        # A tiny scan block makes boundaries fall inside quoted fields and across blocks
+        with mock.patch.object(parsing, 'SCAN_BLOCK', 16):
+            ranges = list(parsing.csv_ranges(self.path, 3))
+        self.assertGreater(len(ranges), 5)
+        self.assertEqual([end for _, end in ranges[:-1]], [start for start, _ in ranges[1:]])
+        self.assertEqual(ranges[-1][1], os.path.getsize(self.path))
+
+        parsed = []
+        for start, end in ranges:
+            parsed += parsing.parse_csv_range(self.path, start, end)[1]
+        self.assertEqual(parsed, self.expected)
+
+    def test_workers_parse_their_own_ranges(self):
+        chunks = list(parsing.parsed_chunks(self.path, 7, workers=2))
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual(sum(rows for rows, _ in chunks), 40)
+        self.assertEqual([row for _, parsed in chunks for row in parsed], self.expected)
+
+
+class DeleteMoviesTests(TestCase):
+    def setUp(self):
+        self.rumored = make_movie('Rumored', genres=['Drama'], status='Rumored', credit='Ann Actor', description='Text.')
+        self.kept = make_movie('Kept', genres=['Comedy'], status='Released', description='Text.')
+        self.user = make_user()
+        rate(self.user, [(self.rumored, 4.0), (self.kept, 3.0)])
+        WatchedList.objects.create(user=self.user, movie=self.rumored)
+        WatchedList.objects.create(user=self.user, movie=self.kept)
+        apply_rating_changes([(self.rumored.id, None, 4.0), (self.kept.id, None, 3.0)])
+        SimilarMovie.objects.create(movie=self.kept, similar=self.rumored, score=1.0, rank=1)
+        SimilarMovie.objects.create(movie=self.rumored, similar=self.kept, score=1.0, rank=1)
+
+    def delete(self, *filters):
+        out = StringIO()
+        call_command('delete_movies', *[f'--filter={movie_filter}' for movie_filter in filters], stdout=out)
+        return out.getvalue()
+
+    def test_deletes_movies_and_their_dependents(self):
+        output = self.delete('status=Rumored')
+        self.assertIn('Successfully deleted 1 movies', output)
+        self.assertEqual(list(Movie.objects.values_list('id', flat=True)), [self.kept.id])
+        self.assertEqual(list(Rating.objects.values_list('movie_id', flat=True)), [self.kept.id])
+        self.assertEqual(list(WatchedList.objects.values_list('movie_id', flat=True)), [self.kept.id])
+        self.assertEqual(list(MovieRatingStats.objects.values_list('movie_id', flat=True)), [self.kept.id])
+        self.assertFalse(SimilarMovie.objects.exists())
+        # The genre left without movies goes too; the user's profile only counts what is left
+        self.assertEqual(list(Genre.objects.values_list('name', flat=True)), ['Comedy'])
+        self.assertEqual(set(self.user.genre_profile.values_list('genre__name', flat=True)), {'Comedy'})
+
+    def test_invalid_filters(self):
+        for movie_filter in ('genres=Drama', 'runtime=long', 'colour=red', 'missing-everything'):
+            with self.subTest(movie_filter=movie_filter), self.assertRaises(CommandError):
+                self.delete(movie_filter)
+        self.assertEqual(Movie.objects.count(), 2)
+
+
+class AsyncRecommendationViewTests(SimpleTestCase):
+    class SlowView(APIView):
+        permission_classes = [AllowAny]
+        release = threading.Event()
+
+        def get(self, request):
+            self.release.wait(5)
+            return Response({'done': True})
+
+    def setUp(self):
+        self.SlowView.release.clear()
+        self.addCleanup(self.SlowView.release.set)
+        with override_settings(RECOMMENDATION_LIMITS={'slow': (1, 0.2)}):
+            self.view = async_recommendation_view(self.SlowView, 'slow')
+
+    def get(self):
+        return asyncio.run(self.view(RequestFactory().get('/recommendations/async/slow/')))
+
+    def test_result(self):
+        self.SlowView.release.set()
+        response = self.get()
+        self.assertEqual((response.status_code, response.data), (200, {'done': True}))
+
+    def test_timeout_keeps_the_slot_until_the_view_finishes(self):
+        self.assertEqual(self.get().status_code, 504)
+        # The timed-out view still runs in the pool, so its slot is taken
+        busy = self.get()
+        self.assertEqual((busy.status_code, busy['Retry-After']), (503, '1'))
+
+        self.SlowView.release.set()
+        for _ in range(50):
+            response = self.get()
+            if response.status_code != 503:
+                break
+            time.sleep(0.02)
+        self.assertEqual(response.status_code, 200)
+
+
+@override_settings(JOB_RETRY_DELAY=30, JOB_MAX_ATTEMPTS=2, JOB_LEASE=600)
+class JobTests(TestCase):
+    def setUp(self):
+        self.calls = []
+        registry = {'record': lambda **kwargs: self.calls.append(kwargs), 'fail': self.fail_job}
+        patcher = mock.patch.dict(jobs.registry, registry)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def fail_job(self):
+        raise RuntimeError('boom')
+
+    def test_identical_pending_jobs_collapse(self):
+        enqueue('record', x=1)
+        enqueue('record', x=1)
+        enqueue('record', x=2)
+        self.assertEqual(Job.objects.count(), 2)
+        with self.assertRaises(ValueError):
+            enqueue('missing')
+
+    def test_claim_only_due_pending_jobs_once(self):
+        enqueue('record', x=1)
+        enqueue('record', delay=60, x=2)
+        claimed = claim_jobs(10)
+        self.assertEqual([(job.kwargs, job.status, job.attempts) for job in claimed], [({'x': 1}, Job.RUNNING, 1)])
+        self.assertEqual(claim_jobs(10), [])
+
+    def test_run_and_retry_with_backoff(self):
+        enqueue('record', x=1)
+        enqueue('fail')
+        self.assertEqual(run_jobs(), (2, 1))
+        self.assertEqual(self.calls, [{'x': 1}])
+
+        failed = Job.objects.get(name='fail')
+        self.assertEqual((failed.status, failed.attempts), (Job.PENDING, 1))
+        self.assertIn('boom', failed.last_error)
+        self.assertAlmostEqual((failed.run_at - failed.finished_at).total_seconds(), 30)
+
+        Job.objects.filter(id=failed.id).update(run_at=timezone.now())
+        self.assertEqual(run_jobs(), (1, 0))
+        self.assertEqual(Job.objects.get(id=failed.id).status, Job.FAILED)
+
+    def test_stale_running_jobs_are_requeued(self):
+        long_ago = timezone.now() - timedelta(seconds=601)
+        enqueue('record', x=1)
+        enqueue('record', x=2)
+        enqueue('record', x=3)
+        claim_jobs(10)
+        Job.objects.update(started_at=long_ago, heartbeat_at=long_ago)
+        # Out of attempts, and superseded by an identical pending job
+        Job.objects.filter(kwargs={'x': 2}).update(attempts=2)
+        enqueue('record', x=3)
+
+        self.assertEqual(requeue_stale_jobs(), 1)
+        self.assertEqual(sorted(Job.objects.values_list('kwargs__x', 'status')), [
+            (1, Job.PENDING), (2, Job.FAILED), (3, Job.FAILED), (3, Job.PENDING),
+        ])
+        self.assertEqual(run_jobs(), (2, 2))
+
+    def test_long_running_jobs_with_a_heartbeat_are_left_alone(self):
+        enqueue('record', x=1)
+        job, = claim_jobs(10)
+        Job.objects.update(started_at=timezone.now() - timedelta(hours=5), heartbeat_at=timezone.now() - timedelta(seconds=601))
+        jobs.Heartbeat(job).beat()
+        self.assertEqual(requeue_stale_jobs(), 0)
+        self.assertEqual(Job.objects.get().status, Job.RUNNING)
+
+    @override_settings(JOB_HEARTBEAT_INTERVAL=0.01)
+    def test_heartbeat_runs_while_the_job_does(self):
+        enqueue('record', x=1)
+        job, = claim_jobs(10)
+        with mock.patch.object(jobs.Heartbeat, 'beat') as beat, jobs.Heartbeat(job) as heartbeat:
+            time.sleep(0.1)
+        self.assertGreater(beat.call_count, 1)
+        self.assertFalse(heartbeat.thread.is_alive())
+
+    def test_runworker_prunes_while_busy(self):
+        enqueue('record', x=1)
+        old = Job.objects.create(name='record', key='old', status=Job.DONE, finished_at=timezone.now() - timedelta(days=8))
+        call_command('runworker', '--once', stdout=StringIO())
+        self.assertFalse(Job.objects.filter(id=old.id).exists())
+        self.assertEqual(self.calls, [{'x': 1}])
+        self.assertEqual(prune_jobs(days=0), 1)
+
+    def test_refresh_similar_movies_by_marker(self):
+        old, new = make_movie('Old', keywords='space'), make_movie('New', keywords='space')
+        with mock.patch.object(jobs, 'build_keyword_index'), mock.patch.object(jobs, 'refresh_similar_movies') as refresh:
+            jobs.registry['refresh_similar_movies'](after_id=old.id, movie_ids=[old.id])
+        refresh.assert_called_once_with(movie_ids=[old.id, new.id])
+
+
+class WatchedListTests(TestCase):
+    def setUp(self):
+        self.user = make_user()
+        self.client = authenticated_client(self.user)
+        self.watched = make_movie('Watched', genres=['Drama'])
+        self.new = make_movie('New', genres=['Drama'])
+        WatchedList.objects.create(user=self.user, movie=self.watched)
+
+    def test_bulk_add_statuses(self):
+        missing = self.new.id + 1
+        response = self.client.post('/watched-list/bulk-add/', {'movie_ids': [self.new.id, self.new.id, self.watched.id, self.watched.id, missing, 'x']}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['added'], 1)
+        self.assertEqual(
+            [result['status'] for result in response.data['results']],
+            ['added', 'duplicate', 'already_watched', 'duplicate', 'not_found', 'invalid'],
+        )
+        self.assertEqual(self.user.watched.filter(movie=self.new).count(), 1)
+        # The new movie counts once in the genre profile
+        self.assertEqual(self.user.genre_profile.get(genre__name='Drama').weight, 1)
+
+    def test_adding_a_watched_movie_again_is_rejected(self):
+        response = self.client.post('/watched-list/', {'movie_id': self.watched.id}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('movie_id', response.data)
+        self.assertEqual(self.user.watched.count(), 1)
+
+    def test_bulk_remove_statuses(self):
+        response = self.client.post('/watched-list/bulk-remove/', {'movie_ids': [self.watched.id, self.watched.id, self.new.id, None]}, format='json')
+        self.assertEqual(response.data['removed'], 1)
+        self.assertEqual([result['status'] for result in response.data['results']], ['removed', 'duplicate', 'not_in_list', 'invalid'])
+        self.assertFalse(self.user.watched.exists())
+
+
+class BulkRateTests(TestCase):
+    def setUp(self):
+        self.user = make_user()
+        self.client = authenticated_client(self.user)
+        self.rated, self.new, self.other = make_movie('Rated'), make_movie('New'), make_movie('Other')
+        self.client.post(f'/movies/{self.rated.id}/rate/', {'rating': 3.0}, format='json')
+
+    def bulk_rate(self, ratings):
+        response = self.client.post('/ratings/bulk-rate/', {'ratings': ratings}, format='json')
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_statuses(self):
+        data = self.bulk_rate([
+            {'movie_id': self.new.id, 'rating': 4.0},
+            {'movie_id': self.new.id, 'rating': 2.0},
+            {'movie_id': self.rated.id, 'rating': 5.0},
+            {'movie_id': self.other.id, 'rating': 7},
+            {'movie_id': self.other.id + 1, 'rating': 4.0},
+            {'movie_id': 'x', 'rating': 4.0},
+        ])
+        self.assertEqual((data['created'], data['updated']), (1, 1))
+        self.assertEqual(
+            [result['status'] for result in data['results']],
+            ['created', 'duplicate', 'updated', 'invalid', 'not_found', 'invalid'],
+        )
+        # The first rating of a repeated movie is the one stored, and counted once
+        self.assertEqual(list(Rating.objects.filter(user=self.user, movie=self.new).values_list('rating', flat=True)), [4.0])
+        stats = MovieRatingStats.objects.get(movie=self.new)
+        self.assertEqual((stats.rating_count, stats.rating_sum), (1, 4.0))
+        self.assertEqual(MovieRatingStats.objects.get(movie=self.rated).rating_avg, 5.0)
+        # A 5-star rating makes the movie a favorite
+        self.assertTrue(self.user.favorite_movies.filter(movie=self.rated).exists())
+
+    def test_unchanged_and_rerated(self):
+        self.assertEqual([result['status'] for result in self.bulk_rate([{'movie_id': self.rated.id, 'rating': 3.0}])['results']], ['unchanged'])
+        self.bulk_rate([{'movie_id': self.new.id, 'rating': 4.0}])
+        self.bulk_rate([{'movie_id': self.new.id, 'rating': 1.0}])
+        self.assertEqual(Rating.objects.filter(user=self.user, movie=self.new).count(), 1)
+        stats = MovieRatingStats.objects.get(movie=self.new)
+        self.assertEqual((stats.rating_count, stats.rating_sum), (1, 1.0))
+
+    def test_rejects_a_second_rating_of_a_movie(self):
+        response = self.client.post('/ratings/', {'movie_id': self.rated.id, 'rating': 4.0}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('movie_id', response.data)
+
+    def test_not_a_list(self):
+        response = self.client.post('/ratings/bulk-rate/', {'ratings': {'movie_id': self.new.id}}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+class FavoriteGenreTests(TestCase):
+    def setUp(self):
+        self.user = make_user()
+        self.client = authenticated_client(self.user)
+        self.drama, self.comedy, self.horror = (Genre.objects.create(name=name) for name in ('Drama', 'Comedy', 'Horror'))
+        self.user.favorite_genres.add(self.drama)
+
+    def post(self, action, genre_ids):
+        return self.client.post(f'/users/{self.user.id}/{action}/', {'genre_ids': genre_ids}, format='json')
+
+    def test_add_statuses(self):
+        missing = self.horror.id + 1
+        response = self.post('add-favorite-genre', [self.comedy.id, self.comedy.id, self.drama.id, missing, 'x'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [result['status'] for result in response.data['results']],
+            ['added', 'duplicate', 'already_favorite', 'not_found', 'invalid'],
+        )
+        self.assertEqual(set(self.user.favorite_genres.values_list('name', flat=True)), {'Drama', 'Comedy'})
+
+    def test_remove_statuses(self):
+        response = self.post('remove-favorite-genre', [self.drama.id, self.drama.id, self.horror.id])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([result['status'] for result in response.data['results']], ['removed', 'duplicate', 'not_favorite'])
+        self.assertFalse(self.user.favorite_genres.exists())
+
+    def test_no_valid_genre(self):
+        response = self.post('add-favorite-genre', ['x', 0])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([result['status'] for result in response.data['results']], ['invalid', 'not_found'])
+        self.assertEqual(self.post('add-favorite-genre', 'x').status_code, 400)
+
+
+class ListingTests(TestCase):
+    def setUp(self):
+        self.user = make_user()
+        self.client = authenticated_client(self.user)
+        self.old, self.recent = make_movie('Old', genres=['Drama'], poster_url='old.jpg'), make_movie('Recent', genres=['Drama'])
+        WatchedList.objects.create(user=self.user, movie=self.old)
+        WatchedList.objects.create(user=self.user, movie=self.recent)
+        WatchedList.objects.filter(movie=self.old).update(watched_date=timezone.localdate() - timedelta(days=30))
+        rate(self.user, [(self.old, 3.0), (self.recent, 4.5)])
+        # Someone else's entries never show up
+        other = make_user('bob')
+        WatchedList.objects.create(user=other, movie=self.old)
+        rate(other, [(self.old, 1.0)])
+
+    def test_watched_list_newest_first(self):
+        response = self.client.get('/watched-list/')
+        self.assertEqual(response.data['count'], 2)
+        self.assertEqual([entry['movie']['title'] for entry in response.data['results']], ['Recent', 'Old'])
+        self.assertIn('genres', response.data['results'][0]['movie'])
+
+    def test_watched_list_since(self):
+        since = (timezone.localdate() - timedelta(days=7)).isoformat()
+        response = self.client.get('/watched-list/', {'since': since})
+        self.assertEqual([entry['movie']['title'] for entry in response.data['results']], ['Recent'])
+        for since in ('last-week', '2024-02-30'):
+            with self.subTest(since=since):
+                response = self.client.get('/watched-list/', {'since': since})
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('since', response.data)
+
+    def test_compact_watched_list(self):
+        response = self.client.get('/watched-list/', {'compact': '1'})
+        self.assertEqual(response.data['results'][1], {
+            'id': WatchedList.objects.get(user=self.user, movie=self.old).id,
+            'movie': {'id': self.old.id, 'title': 'Old', 'poster_url': 'old.jpg'},
+            'watched_date': (timezone.localdate() - timedelta(days=30)).isoformat(),
+        })
+
+    def test_compact_ratings(self):
+        response = self.client.get('/ratings/', {'compact': 'true'})
+        self.assertEqual(response.data['count'], 2)
+        self.assertEqual(
+            [(rating['movie']['title'], rating['rating']) for rating in response.data['results']],
+            [('Recent', 4.5), ('Old', 3.0)],
+        )
+        self.assertEqual(set(response.data['results'][0]['movie']), {'id', 'title', 'poster_url'})
+
+    def test_compact_listings_skip_the_genres(self):
+        # One query for the count and one for the page, however many movies are listed
+        for path in ('/watched-list/', '/ratings/'):
+            with self.subTest(path=path), CaptureQueriesContext(connection) as queries:
+                self.client.get(path, {'compact': '1'})
+            self.assertEqual(len(queries), 2)
@@ -0,0 +1,17 @@
+from django.db.models import F
+
+from .models import VersionCounter
+
+RATINGS = 'ratings'
+# Movies, genres and their links; namespaces the cached catalog responses
+CATALOG = 'catalog'
+
+
+def get_version(name):
+    return VersionCounter.objects.filter(name=name).values_list('value', flat=True).first() or 0
+
+
+def bump_version(name):
+    """Increment the counter; call inside the transaction that makes the change."""
+    VersionCounter.objects.get_or_create(name=name)
+    VersionCounter.objects.filter(name=name).update(value=F('value') + 1)
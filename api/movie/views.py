@@ -1,30 +1,96 @@
+import hashlib
+from urllib.parse import urlencode
+
 from rest_framework import viewsets, permissions, status, filters, generics
 from rest_framework.response import Response
 from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from rest_framework_simplejwt.authentication import JWTAuthentication
 from rest_framework_simplejwt.tokens import RefreshToken
-from rest_framework.pagination import PageNumberPagination
 from rest_framework.permissions import AllowAny
 from rest_framework.views import APIView
+from rest_framework.exceptions import APIException, ValidationError
 from django.contrib.auth import get_user_model
 from django.db import transaction
-from django.db.models import Avg, Q
+from django.db.models import Q
 from django.shortcuts import get_object_or_404
-from .models import Genre, Movie, WatchedList, Rating, FavoriteMovie
+from django.utils.dateparse import parse_date
+from .models import Genre, Movie, WatchedList, Rating, FavoriteMovie, MovieRatingStats
 from .serializers import (
     GenreSerializer, MovieSerializer, UserRegistrationSerializer, 
     UserSerializer, WatchedListSerializer, RatingSerializer, 
     AddWatchedListSerializer, CustomTokenRefreshSerializer, 
-    PasswordResetSerializer, FavoriteMovieSerializer
+    PasswordResetSerializer, FavoriteMovieSerializer, AverageRatingSerializer,
+    MovieCardSerializer, CompactWatchedListSerializer, CompactRatingSerializer
 )
+from .genre_profiles import adjust_genre_profile
+from .jobs import RATING_MODELS, WATCHED_MODELS, enqueue_rebuilds
+from .rating_stats import apply_rating_changes
+from .versioning import CATALOG, RATINGS, get_version
+from .search import search_available, search_movies
+from .pagination import KeysetPagination, StandardResultsSetPagination
+from .catalog_cache import cache_stats, cached_response, catalog_key
+from .bulk import update_rows
+from .terms import normalize_name
 
 User = get_user_model()
 
+# Most items a bulk endpoint accepts; validating them stays a single IN (...) query
+BULK_MAX_ITEMS = 5000
+
+RATING_VALUES = {value for value, _ in Rating.RATINGS_CHOICES}
+
+
+def _bulk_id(value):
+    # None for anything that is not an integer id
+    if isinstance(value, bool):
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _bulk_ids(values):
+    """Return (ids with None for the unparseable ones, error) for a list of ids from a bulk request."""
+    if not isinstance(values, list):
+        return None, 'Expected a list of ids'
+    if len(values) > BULK_MAX_ITEMS:
+        return None, f'At most {BULK_MAX_ITEMS} items per request'
+    return [_bulk_id(value) for value in values], None
+
+
+def _mark_duplicates(results, key):
+    """Report every valid item repeating an earlier one's id as a duplicate; returns results."""
+    seen = set()
+    for result in results:
+        if result['status'] == 'invalid':
+            continue
+        if result[key] in seen:
+            result['status'] = 'duplicate'
+        seen.add(result[key])
+    return results
+
+
+def _lock_user(user):
+    # Serializes a user's concurrent rating writes, so each reads the ratings the other wrote
+    User.objects.select_for_update().values_list('pk', flat=True).get(pk=user.pk)
+
+class CatalogCacheStatsView(APIView):
+    # Hit and miss counts of the cached catalog responses and counts, for staff
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response(cache_stats())
+
 class MovieDetailView(APIView):
     def get(self, request, pk):
+        return cached_response(catalog_key('detail', pk), lambda: self.build(pk))
+
+    def build(self, pk):
         try:
-            movie = Movie.objects.get(pk=pk)
+            movie = Movie.objects.prefetch_related('genres').get(pk=pk)
         except Movie.DoesNotExist:
             return Response(status=status.HTTP_404_NOT_FOUND)
         
@@ -77,44 +143,49 @@ class UserViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=['post'], url_path='add-favorite-genre')
     def add_favorite_genre(self, request, pk=None):
         user = self.get_object()
-        genre_ids = request.data.get('genre_ids', [])
-        added_genres = []
-
-        for genre_id in genre_ids:
-            try:
-                genre = Genre.objects.get(pk=genre_id)
-                user.favorite_genres.add(genre)
-                added_genres.append(genre.name)
-            except Genre.DoesNotExist:
-                continue
-
-        user.save()
-
-        if added_genres:
-            return Response({'status': f'Genres {", ".join(added_genres)} added to favorites'})
+        genre_ids, error = _bulk_ids(request.data.get('genre_ids', []))
+        if error:
+            return Response({'error': error}, status=status.HTTP_400_BAD_REQUEST)
+
+        genres = dict(Genre.objects.filter(pk__in=[genre_id for genre_id in genre_ids if genre_id is not None]).values_list('id', 'name'))
+        favorites = set(user.favorite_genres.filter(pk__in=list(genres)).values_list('id', flat=True))
+        new_ids = [genre_id for genre_id in dict.fromkeys(genres) if genre_id not in favorites]
+        # Only the link rows change, so there is nothing to save on the user itself
+        User.favorite_genres.through.objects.bulk_create(
+            [User.favorite_genres.through(user_id=user.id, genre_id=genre_id) for genre_id in new_ids],
+            ignore_conflicts=True,
+        )
+
+        results = _mark_duplicates([
+            {'genre_id': genre_id, 'status': 'invalid' if genre_id is None else 'not_found' if genre_id not in genres else 'already_favorite' if genre_id in favorites else 'added'}
+            for genre_id in genre_ids
+        ], 'genre_id')
+        if genres:
+            added_genres = [genres[genre_id] for genre_id in dict.fromkeys(genres)]
+            return Response({'status': f'Genres {", ".join(added_genres)} added to favorites', 'results': results})
         else:
-            return Response({'error': 'No valid genre IDs provided'}, status=status.HTTP_400_BAD_REQUEST)
+            return Response({'error': 'No valid genre IDs provided', 'results': results}, status=status.HTTP_400_BAD_REQUEST)
 
     @action(detail=True, methods=['post'], url_path='remove-favorite-genre')
     def remove_favorite_genre(self, request, pk=None):
         user = self.get_object()
-        genre_ids = request.data.get('genre_ids', [])
-        removed_genres = []
-
-        for genre_id in genre_ids:
-            try:
-                genre = Genre.objects.get(pk=genre_id)
-                user.favorite_genres.remove(genre)
-                removed_genres.append(genre.name)
-            except Genre.DoesNotExist:
-                continue
-
-        user.save()
-
-        if removed_genres:
-            return Response({'status': f'Genres {", ".join(removed_genres)} removed from favorites'})
+        genre_ids, error = _bulk_ids(request.data.get('genre_ids', []))
+        if error:
+            return Response({'error': error}, status=status.HTTP_400_BAD_REQUEST)
+
+        genres = dict(Genre.objects.filter(pk__in=[genre_id for genre_id in genre_ids if genre_id is not None]).values_list('id', 'name'))
+        favorites = set(user.favorite_genres.filter(pk__in=list(genres)).values_list('id', flat=True))
+        User.favorite_genres.through.objects.filter(user_id=user.id, genre_id__in=favorites).delete()
+
+        results = _mark_duplicates([
+            {'genre_id': genre_id, 'status': 'invalid' if genre_id is None else 'not_found' if genre_id not in genres else 'removed' if genre_id in favorites else 'not_favorite'}
+            for genre_id in genre_ids
+        ], 'genre_id')
+        if genres:
+            removed_genres = [genres[genre_id] for genre_id in dict.fromkeys(genres)]
+            return Response({'status': f'Genres {", ".join(removed_genres)} removed from favorites', 'results': results})
         else:
-            return Response({'error': 'No valid genre IDs provided'}, status=status.HTTP_400_BAD_REQUEST)
+            return Response({'error': 'No valid genre IDs provided', 'results': results}, status=status.HTTP_400_BAD_REQUEST)
 
 class GenreViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = Genre.objects.all()
@@ -122,47 +193,93 @@ class GenreViewSet(viewsets.ReadOnlyModelViewSet):
     authentication_classes = [JWTAuthentication]
     permission_classes = [permissions.IsAuthenticated]
 
-class StandardResultsSetPagination(PageNumberPagination):
-    page_size = 10
-    page_size_query_param = 'page_size'
-    max_page_size = 100
+def _any_name(relation, names):
+    # Whole names, matched case-insensitively as the former icontains filters were,
+    # through the indexed normalized_name column
+    return Q(**{f'{relation}__normalized_name__in': [normalize_name(name) for name in names]})
 
 
 class MovieViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = Movie.objects.all()
     serializer_class = MovieSerializer
-    filter_backends = [filters.OrderingFilter, filters.SearchFilter]
+    # ?search= is handled in get_queryset by the full-text index
+    filter_backends = [filters.OrderingFilter]
     ordering_fields = ['title', 'release_date']
-    search_fields = ['title', 'description', 'production_companies', 'credit', 'genres__name']
-    pagination_class = StandardResultsSetPagination
+    # Page numbers by default; ?cursor= switches to keyset pages
+    pagination_class = KeysetPagination
     permission_classes = [AllowAny]
 
+    def list(self, request, *args, **kwargs):
+        # Whole pages are cached per query string until the catalog version changes
+        return cached_response(
+            catalog_key(f'list:{request.get_host()}', request.query_params),
+            lambda: super(MovieViewSet, self).list(request, *args, **kwargs),
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        # The full representation shares MovieDetailView's entry; ?view= and ?fields= get their own.
+        # The cached data is pre-render, so every ?format= can share it
+        key = kwargs['pk']
+        if self.get_serializer_class() is not MovieSerializer or self.requested_fields():
+            key = f"{key}:{self.get_serializer_class().__name__}:{','.join(self.requested_fields())}"
+        return cached_response(
+            catalog_key('detail', key),
+            lambda: super(MovieViewSet, self).retrieve(request, *args, **kwargs),
+        )
+
+    def get_serializer_class(self):
+        if self.request.query_params.get('view') == 'card':
+            return MovieCardSerializer
+        return MovieSerializer
+
+    def get_serializer(self, *args, **kwargs):
+        fields = self.requested_fields()
+        if fields and self.get_serializer_class() is MovieSerializer:
+            kwargs['fields'] = fields
+        return super().get_serializer(*args, **kwargs)
+
+    def requested_fields(self):
+        # ?fields=id,title,poster_url limits the columns loaded and serialized
+        fields = self.request.query_params.get('fields')
+        if self.get_serializer_class() is MovieCardSerializer:
+            return MovieCardSerializer.Meta.fields
+        if not fields:
+            return None
+        return [field for field in MovieSerializer.Meta.fields if field in fields.split(',')] or ['id']
+
     def get_queryset(self):
         queryset = super().get_queryset()
+        fields = self.requested_fields()
+        if fields is None or 'genres' in fields:
+            queryset = queryset.prefetch_related('genres')
+        if fields is not None:
+            queryset = queryset.only(*['id'] + [field for field in fields if field != 'genres'])
+
+        # Only joins that can match a movie more than once need DISTINCT
+        needs_distinct = False
+
         genre = self.request.query_params.get('genre')
         if genre:
             queryset = queryset.filter(genres__name__iexact=genre.strip())
         
         production_companies = self.request.query_params.get('production_companies')
         if production_companies:
-            company_names = production_companies.split('-')
-            queries = [Q(production_companies__icontains=company.strip()) for company in company_names]
-            query = queries.pop()
-            for item in queries:
-                query |= item
-            queryset = queryset.filter(query)
+            company_names = [company.strip() for company in production_companies.split('-')]
+            queryset = queryset.filter(_any_name('companies', company_names))
+            needs_distinct |= len(company_names) > 1
         
         credit = self.request.query_params.get('credit')
         if credit:
-            credit_names = credit.split('-')
-            queries = [Q(credit__icontains=name.strip()) for name in credit_names]
-            query = queries.pop()
-            for item in queries:
-                query |= item
-            queryset = queryset.filter(query)
+            credit_names = [name.strip() for name in credit.split('-')]
+            queryset = queryset.filter(_any_name('people', credit_names))
+            needs_distinct |= len(credit_names) > 1
 
         search = self.request.query_params.get('search')
-        if search:
+        if search and search_available():
+            # Ranked full-text lookup instead of LIKE scans over the text columns
+            # (?ordering= still takes precedence over the rank)
+            queryset = search_movies(queryset, search)
+        elif search:
             search_queries = [
                 Q(title__icontains=search),
                 Q(description__icontains=search),
@@ -174,8 +291,9 @@ class MovieViewSet(viewsets.ReadOnlyModelViewSet):
             for item in search_queries:
                 search_query |= item
             queryset = queryset.filter(search_query)
+            needs_distinct = True
 
-        return queryset.distinct()
+        return queryset.distinct() if needs_distinct else queryset
 
 class FavoriteMovieViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = FavoriteMovieSerializer
@@ -185,16 +303,56 @@ class FavoriteMovieViewSet(viewsets.ReadOnlyModelViewSet):
     def get_queryset(self):
         return FavoriteMovie.objects.filter(user=self.request.user)
 
+def _compact(request):
+    return request.query_params.get('compact') in ('1', 'true')
+
+
 class WatchedListViewSet(viewsets.ModelViewSet):
     queryset = WatchedList.objects.all()
     serializer_class = WatchedListSerializer
     authentication_classes = [JWTAuthentication]
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = StandardResultsSetPagination
 
     def get_queryset(self):
         user = self.request.user
-        return WatchedList.objects.filter(user=user)
-    
+        # Movies are joined up front; their genres only matter for the full serializer
+        queryset = WatchedList.objects.filter(user=user).select_related('movie').order_by('-watched_date', '-id')
+        if _compact(self.request):
+            queryset = queryset.only('watched_date', 'movie__title', 'movie__poster_url')
+        else:
+            queryset = queryset.prefetch_related('movie__genres')
+
+        # ?since=YYYY-MM-DD returns only the entries watched on or after that day, for incremental sync
+        since = self.request.query_params.get('since')
+        if since:
+            try:
+                since_date = parse_date(since)
+            except ValueError:
+                since_date = None
+            if since_date is None:
+                raise ValidationError({'since': 'Expected a YYYY-MM-DD date'})
+            queryset = queryset.filter(watched_date__gte=since_date)
+        return queryset
+
+    def get_serializer_class(self):
+        if self.request.method == 'GET' and _compact(self.request):
+            return CompactWatchedListSerializer
+        return WatchedListSerializer
+
+    def perform_update(self, serializer):
+        previous_movie_id = serializer.instance.movie_id
+        watched_movie = serializer.save()
+        if watched_movie.movie_id != previous_movie_id:
+            adjust_genre_profile(watched_movie.user, [previous_movie_id], -1)
+            adjust_genre_profile(watched_movie.user, [watched_movie.movie_id], 1)
+            enqueue_rebuilds(WATCHED_MODELS)
+
+    def perform_destroy(self, instance):
+        instance.delete()
+        adjust_genre_profile(instance.user, [instance.movie_id], -1)
+        enqueue_rebuilds(WATCHED_MODELS)
+
 class AddToWatchedListView(APIView):
     authentication_classes = [JWTAuthentication]
     permission_classes = [permissions.IsAuthenticated]
@@ -219,19 +377,102 @@ class RemoveFromWatchedListView(APIView):
         try:
             watched_list_entry = WatchedList.objects.get(user=user, movie_id=movie_id)
             watched_list_entry.delete()
+            adjust_genre_profile(user, [watched_list_entry.movie_id], -1)
+            enqueue_rebuilds(WATCHED_MODELS)
             return Response({"message": "Movie removed from watched list successfully."}, status=status.HTTP_200_OK)
         except WatchedList.DoesNotExist:
             return Response({"error": "Movie not found in your watched list"}, status=status.HTTP_404_NOT_FOUND)
 
+class BulkAddToWatchedListView(APIView):
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        movie_ids, error = _bulk_ids(request.data.get('movie_ids'))
+        if error:
+            return Response({"error": error}, status=status.HTTP_400_BAD_REQUEST)
+
+        user = request.user
+        valid_ids = [movie_id for movie_id in movie_ids if movie_id is not None]
+        with transaction.atomic():
+            found = set(Movie.objects.filter(id__in=valid_ids).values_list('id', flat=True))
+            watched = set(WatchedList.objects.filter(user=user, movie_id__in=found).values_list('movie_id', flat=True))
+            new_ids = [movie_id for movie_id in dict.fromkeys(valid_ids) if movie_id in found and movie_id not in watched]
+            # The (user, movie) constraint skips a row a concurrent request added meanwhile
+            WatchedList.objects.bulk_create([WatchedList(user=user, movie_id=movie_id) for movie_id in new_ids], ignore_conflicts=True)
+            if new_ids:
+                adjust_genre_profile(user, new_ids, 1)
+                enqueue_rebuilds(WATCHED_MODELS)
+
+        results = _mark_duplicates([
+            {'movie_id': movie_id, 'status': 'invalid' if movie_id is None else 'not_found' if movie_id not in found else 'already_watched' if movie_id in watched else 'added'}
+            for movie_id in movie_ids
+        ], 'movie_id')
+        return Response({"added": len(new_ids), "results": results}, status=status.HTTP_200_OK)
+
+class BulkRemoveFromWatchedListView(APIView):
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        movie_ids, error = _bulk_ids(request.data.get('movie_ids'))
+        if error:
+            return Response({"error": error}, status=status.HTTP_400_BAD_REQUEST)
+
+        user = request.user
+        with transaction.atomic():
+            entries = WatchedList.objects.filter(user=user, movie_id__in=[movie_id for movie_id in movie_ids if movie_id is not None])
+            watched = set(entries.values_list('movie_id', flat=True))
+            entries.delete()
+            if watched:
+                adjust_genre_profile(user, list(watched), -1)
+                enqueue_rebuilds(WATCHED_MODELS)
+
+        results = _mark_duplicates([
+            {'movie_id': movie_id, 'status': 'invalid' if movie_id is None else 'removed' if movie_id in watched else 'not_in_list'}
+            for movie_id in movie_ids
+        ], 'movie_id')
+        return Response({"removed": len(watched), "results": results}, status=status.HTTP_200_OK)
+
 class RatingViewSet(viewsets.ModelViewSet):
     queryset = Rating.objects.all()
     serializer_class = RatingSerializer
     authentication_classes = [JWTAuthentication]
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = StandardResultsSetPagination
 
     def get_queryset(self):
         user = self.request.user
-        return Rating.objects.filter(user=user)
+        queryset = Rating.objects.filter(user=user).select_related('movie').order_by('-id')
+        if _compact(self.request):
+            queryset = queryset.only('rating', 'movie__title', 'movie__poster_url')
+        else:
+            queryset = queryset.prefetch_related('movie__genres')
+        return queryset
+
+    def get_serializer_class(self):
+        if self.request.method == 'GET' and _compact(self.request):
+            return CompactRatingSerializer
+        return RatingSerializer
+
+    def perform_create(self, serializer):
+        with transaction.atomic():
+            rating = serializer.save()
+            apply_rating_changes([(rating.movie_id, None, rating.rating)])
+            enqueue_rebuilds(RATING_MODELS)
+
+    def perform_update(self, serializer):
+        previous = serializer.instance.movie_id, serializer.instance.rating
+        with transaction.atomic():
+            rating = serializer.save()
+            apply_rating_changes([(previous[0], previous[1], None), (rating.movie_id, None, rating.rating)])
+            enqueue_rebuilds(RATING_MODELS)
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            instance.delete()
+            apply_rating_changes([(instance.movie_id, instance.rating, None)])
+            enqueue_rebuilds(RATING_MODELS)
 
     @action(detail=False, methods=['post'], url_path='rate-movie/(?P<movie_id>[^/.]+)')
     def rate_movie(self, request, movie_id=None):
@@ -250,11 +491,20 @@ class RatingViewSet(viewsets.ModelViewSet):
         movie = get_object_or_404(Movie, id=movie_id)
 
         with transaction.atomic():
+            _lock_user(request.user)
+            previous_rating = (
+                Rating.objects.select_for_update()
+                .filter(user=request.user, movie=movie)
+                .values_list('rating', flat=True)
+                .first()
+            )
             rating, created = Rating.objects.update_or_create(
                 user=request.user,
                 movie=movie,
                 defaults={'rating': rating_value}
             )
+            apply_rating_changes([(movie.id, previous_rating, rating_value)])
+            enqueue_rebuilds(RATING_MODELS)
 
             if rating_value == 5.0:
                 FavoriteMovie.objects.get_or_create(user=request.user, movie=movie)
@@ -264,6 +514,67 @@ class RatingViewSet(viewsets.ModelViewSet):
         else:
             return Response({"message": "Movie rating updated successfully.", "rating": RatingSerializer(rating).data}, status=status.HTTP_200_OK)
         
+    @action(detail=False, methods=['post'], url_path='bulk-rate')
+    def bulk_rate(self, request):
+        """Rate many movies at once: {"ratings": [{"movie_id": 1, "rating": 4.5}, ...]}."""
+        items = request.data.get('ratings')
+        if not isinstance(items, list):
+            return Response({"error": "ratings must be a list of {movie_id, rating}"}, status=status.HTTP_400_BAD_REQUEST)
+        if len(items) > BULK_MAX_ITEMS:
+            return Response({"error": f"At most {BULK_MAX_ITEMS} items per request"}, status=status.HTTP_400_BAD_REQUEST)
+
+        # (movie_id, rating or None when invalid) per item; the first valid rating of a movie wins
+        parsed = []
+        for item in items:
+            if not isinstance(item, dict):
+                item = {}
+            try:
+                rating_value = float(item['rating'])
+            except (KeyError, TypeError, ValueError):
+                rating_value = None
+            parsed.append((_bulk_id(item.get('movie_id')), rating_value if rating_value in RATING_VALUES else None))
+        wanted = {}
+        for movie_id, rating_value in parsed:
+            if movie_id is not None and rating_value is not None:
+                wanted.setdefault(movie_id, rating_value)
+
+        user = request.user
+        with transaction.atomic():
+            _lock_user(user)
+            found = set(Movie.objects.filter(id__in=list(wanted)).values_list('id', flat=True))
+            existing = {
+                movie_id: (rating_id, previous)
+                for rating_id, movie_id, previous in Rating.objects.select_for_update().filter(user=user, movie_id__in=found).values_list('id', 'movie_id', 'rating')
+            }
+            created = [movie_id for movie_id in found if movie_id not in existing]
+            updated = [movie_id for movie_id in found if movie_id in existing and existing[movie_id][1] != wanted[movie_id]]
+
+            # The (user, movie) constraint is the backstop should a write slip past the lock
+            Rating.objects.bulk_create([Rating(user=user, movie_id=movie_id, rating=wanted[movie_id]) for movie_id in created], ignore_conflicts=True)
+            update_rows(Rating, ['rating'], [(existing[movie_id][0], wanted[movie_id]) for movie_id in updated])
+            changes = [(movie_id, None, wanted[movie_id]) for movie_id in created]
+            changes += [(movie_id, existing[movie_id][1], wanted[movie_id]) for movie_id in updated]
+            if changes:
+                apply_rating_changes(changes)
+                enqueue_rebuilds(RATING_MODELS)
+            FavoriteMovie.objects.bulk_create(
+                [FavoriteMovie(user=user, movie_id=movie_id) for movie_id in found if wanted[movie_id] == 5.0],
+                ignore_conflicts=True,
+            )
+
+        created, updated = set(created), set(updated)
+        results = []
+        for movie_id, rating_value in parsed:
+            if movie_id is None or rating_value is None:
+                item_status = 'invalid'
+            elif movie_id not in found:
+                item_status = 'not_found'
+            else:
+                item_status = 'created' if movie_id in created else 'updated' if movie_id in updated else 'unchanged'
+            results.append({'movie_id': movie_id, 'rating': rating_value, 'status': item_status})
+        _mark_duplicates(results, 'movie_id')
+        return Response({"created": len(created), "updated": len(updated), "results": results}, status=status.HTTP_200_OK)
+
     @action(detail=True, methods=['get'], url_path='user-rating')
     def user_rating(self, request, movie_id=None):
         """Get the rating for a specific movie by the authenticated user."""
@@ -276,13 +587,51 @@ class RatingViewSet(viewsets.ModelViewSet):
         except Rating.DoesNotExist:
             return Response({"error": "Rating not found for the specified movie and user"}, status=status.HTTP_404_NOT_FOUND)
         
+class AverageRatingPagination(KeysetPagination):
+    # Keyed on (rating_avg, movie_id): averages change with every rating, so an offset
+    # within equal values (CursorPagination) would skip or repeat rows between pages
+    page_size = 50
+    max_page_size = 500
+    keyset_by_default = True
+    # The counts change with the ratings too
+    count_versions = (RATINGS,)
+
 class AverageRatingView(APIView):
     permission_classes = [permissions.AllowAny]
+    ordering = ['-rating_avg']
+    ordering_fields = ['rating_avg']
 
     def get(self, request):
+        min_count = request.query_params.get('min_count')
+        if min_count:
+            try:
+                min_count = int(min_count)
+            except ValueError:
+                return Response({'error': 'min_count must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+
         try:
-            average_ratings = Rating.objects.values('movie').annotate(avg_rating=Avg('rating')).order_by('-avg_rating')
-            return Response(average_ratings, status=status.HTTP_200_OK)
+            # The ETag only changes when a rating or the catalog (titles, genres) does, so
+            # repeat polls skip the query entirely
+            query = urlencode(sorted(request.query_params.lists()), doseq=True)
+            etag = f'"ratings-{get_version(RATINGS)}-{get_version(CATALOG)}-{hashlib.md5(query.encode()).hexdigest()}"'
+            if etag in [tag.strip() for tag in request.headers.get('If-None-Match', '').split(',')]:
+                return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+
+            average_ratings = MovieRatingStats.objects.filter(rating_count__gt=0)
+            if min_count:
+                average_ratings = average_ratings.filter(rating_count__gte=min_count)
+            genre = request.query_params.get('genre')
+            if genre:
+                average_ratings = average_ratings.filter(movie__genres__name__iexact=genre.strip())
+
+            paginator = AverageRatingPagination()
+            page = paginator.paginate_queryset(average_ratings, request, view=self)
+            response = paginator.get_paginated_response(AverageRatingSerializer(page, many=True).data)
+            response['ETag'] = etag
+            return response
+        except APIException:
+            # e.g. NotFound for a malformed cursor
+            raise
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
         